@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Мікро-бенчмарк TFLite інференсу: p50/p99 latency invoke та алокації на виклик.
+Порівнює старий шлях (reshape/astype/set_tensor/get_tensor) з InferenceEngine.
+
+    python bench_inference.py --model model.tflite --iterations 5000 --threads 1
+"""
+
+import sys
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+import tflite_runtime.interpreter as tflite
+
+from inference import InferenceEngine
+
+
+def legacy_predict(interpreter, input_details, output_details, observation):
+    """Шлях до InferenceEngine (для порівняння)"""
+    obs = observation.reshape(1, -1).astype(np.float32)
+    interpreter.set_tensor(input_details[0]['index'], obs)
+    interpreter.invoke()
+    return interpreter.get_tensor(output_details[0]['index'])[0]
+
+
+def measure(fn, iterations: int) -> dict:
+    """Латентність виклику та пам'ять, яку виклик виділяє"""
+    for _ in range(min(100, iterations)):
+        fn()
+
+    latencies = np.empty(iterations, dtype=np.float64)
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        latencies[i] = time.perf_counter() - t0
+
+    # Алокації: кількість блоків (net) і піковий обсяг, що виділяє один виклик
+    samples = min(1000, iterations)
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    peaks = np.empty(samples, dtype=np.int64)
+    for i in range(samples):
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        peaks[i] = peak - base
+    blocks_after = sys.getallocatedblocks()
+    tracemalloc.stop()
+
+    return {
+        "p50_us": float(np.percentile(latencies, 50) * 1e6),
+        "p99_us": float(np.percentile(latencies, 99) * 1e6),
+        "mean_us": float(latencies.mean() * 1e6),
+        "peak_bytes_per_call": float(peaks.mean()),
+        "net_blocks_per_call": (blocks_after - blocks_before) / samples,
+    }
+
+
+def print_result(name: str, r: dict):
+    print(f"{name:<10} p50 {r['p50_us']:8.1f} µs | p99 {r['p99_us']:8.1f} µs | "
+          f"mean {r['mean_us']:8.1f} µs | alloc {r['peak_bytes_per_call']:7.0f} B/call | "
+          f"net blocks {r['net_blocks_per_call']:+.3f}/call")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="model.tflite")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--no-xnnpack", action="store_true")
+    parser.add_argument("--delegate", default=None)
+    args = parser.parse_args()
+
+    engine = InferenceEngine(
+        args.model,
+        num_threads=args.threads,
+        use_xnnpack=not args.no_xnnpack,
+        delegate_path=args.delegate
+    )
+    engine.load()
+    observation = np.random.uniform(-1, 1, 9).astype(np.float32)
+
+    interpreter = tflite.Interpreter(model_path=args.model, num_threads=args.threads)
+    interpreter.allocate_tensors()
+    input_details = interpreter.get_input_details()
+    output_details = interpreter.get_output_details()
+    legacy_obs = np.zeros(int(np.prod(input_details[0]['shape'])), dtype=np.float32)
+    legacy_obs[:min(len(legacy_obs), len(observation))] = observation[:len(legacy_obs)]
+
+    print(f"📊 {args.model} | {args.iterations} ітерацій | threads={args.threads} "
+          f"xnnpack={not args.no_xnnpack}")
+    print_result("legacy", measure(
+        lambda: legacy_predict(interpreter, input_details, output_details, legacy_obs),
+        args.iterations
+    ))
+    print_result("invoke", measure(engine._invoke, args.iterations))
+    print_result("engine", measure(lambda: engine.predict(observation), args.iterations))
+
+
+if __name__ == "__main__":
+    main()
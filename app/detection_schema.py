@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Бінарний формат повідомлень arm/vision/objects (декодер на стороні app).
+
+Повідомлення: заголовок `<BBHdf` (16 байт) + count записів фіксованого
+розміру. Перший байт - MAGIC (0xD7), JSON завжди починається з `{`,
+тож формат визначається без окремого топіка.
+
+    magic u8 | version u8 | count u16 | timestamp f64 | inference_ms f32
+    записи v1: x, y, w, h, confidence (f32, нормовані 0..1), class_id u16, reserved u16
+    записи v2: як v1, але reserved → track_id u16 (0 - без треку), далі
+               vx, vy (f32, частки кадру за секунду), age (f32, с від появи треку)
+    записи v3: як v2, далі wx, wy (f32, м на столі в системі бази) і
+               wvx, wvy (f32, м/с) - детектор з калібруванням камери
+
+Розкладка має збігатися з енкодером у yolo-detection/sinks.py.
+"""
+
+import json
+import struct
+from typing import NamedTuple
+
+import numpy as np
+
+MAGIC = 0xD7
+HEADER = struct.Struct("<BBHdf")
+
+RECORD_V1 = np.dtype([
+    ("x", "<f4"),
+    ("y", "<f4"),
+    ("w", "<f4"),
+    ("h", "<f4"),
+    ("confidence", "<f4"),
+    ("class_id", "<u2"),
+    ("reserved", "<u2"),
+])
+
+RECORD_V2 = np.dtype([
+    ("x", "<f4"),
+    ("y", "<f4"),
+    ("w", "<f4"),
+    ("h", "<f4"),
+    ("confidence", "<f4"),
+    ("class_id", "<u2"),
+    ("track_id", "<u2"),
+    ("vx", "<f4"),
+    ("vy", "<f4"),
+    ("age", "<f4"),
+])
+
+RECORD_V3 = np.dtype(RECORD_V2.descr + [
+    ("wx", "<f4"),
+    ("wy", "<f4"),
+    ("wvx", "<f4"),
+    ("wvy", "<f4"),
+])
+
+RECORDS = {1: RECORD_V1, 2: RECORD_V2, 3: RECORD_V3}
+
+
+class DetectionMessage(NamedTuple):
+    """Розібране повідомлення; objects - структурований масив (read-only)"""
+    version: int  # 0 - JSON
+    timestamp: float
+    inference_ms: float
+    objects: np.ndarray
+
+
+def is_binary(payload: bytes) -> bool:
+    return len(payload) > 0 and payload[0] == MAGIC
+
+
+def decode_binary(payload: bytes) -> DetectionMessage:
+    """Записи - view на payload без копіювання"""
+    if len(payload) < HEADER.size:
+        raise ValueError(f"коротке повідомлення: {len(payload)} байт")
+    magic, version, count, timestamp, inference_ms = HEADER.unpack_from(payload)
+    record = RECORDS.get(version)
+    if magic != MAGIC or record is None:
+        raise ValueError(f"невідома версія схеми: {version}")
+    expected = HEADER.size + count * record.itemsize
+    if len(payload) < expected:
+        raise ValueError(f"обрізане повідомлення: {len(payload)} < {expected} байт")
+    objects = np.frombuffer(payload, dtype=record, count=count, offset=HEADER.size)
+    return DetectionMessage(version, timestamp, inference_ms, objects)
+
+
+def decode_json(payload: bytes) -> DetectionMessage:
+    """Старий JSON-формат (сумісність) у тій самій формі, що й бінарний v3 (wx, wy - NaN, якщо немає)"""
+    data = json.loads(payload)
+    items = data.get("objects") or []
+    objects = np.zeros(len(items), dtype=RECORD_V3)
+    for record, obj in zip(objects, items):
+        record["x"] = obj.get("x", 0.0)
+        record["y"] = obj.get("y", 0.0)
+        record["w"] = obj.get("w", 0.0)
+        record["h"] = obj.get("h", 0.0)
+        record["confidence"] = obj.get("confidence", 0.0)
+        record["track_id"] = obj.get("track_id", 0)
+        record["vx"] = obj.get("vx", 0.0)
+        record["vy"] = obj.get("vy", 0.0)
+        record["age"] = obj.get("age", 0.0)
+        record["wx"] = obj.get("wx", np.nan)
+        record["wy"] = obj.get("wy", np.nan)
+        record["wvx"] = obj.get("wvx", 0.0)
+        record["wvy"] = obj.get("wvy", 0.0)
+    return DetectionMessage(0, data.get("timestamp", 0.0), data.get("inference_time_ms", 0.0), objects)
+
+
+def decode(payload: bytes) -> DetectionMessage:
+    return decode_binary(payload) if is_binary(payload) else decode_json(payload)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Бортовий самописець control loop: кільцевий файл фіксованого розміру,
+відображений у пам'ять (np.memmap).
+
+Запис тіку - кілька присвоєнь у сторінки page cache, без write()/fsync:
+ядро скидає брудні сторінки пакетно, а після падіння процесу дані лишаються
+у файлі. Фоновий потік раз на flush_interval робить msync (на випадок
+втрати живлення); 0 - покластися лише на writeback ядра.
+"""
+
+import os
+import time
+import logging
+from threading import Thread, Event
+from typing import Optional
+
+import numpy as np
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"FREC"
+VERSION = 1
+HEADER_SIZE = 64
+
+STAGES = ("observe", "infer", "send", "read")
+
+# Джерело дії
+SOURCE_POLICY = 0
+SOURCE_COMMAND = 1  # ручна команда /predict
+
+# Результат відправки на Arduino
+ACK_PENDING = 0   # відповідь ще не прийшла
+ACK_OK = 1
+ACK_ERROR = 2
+ACK_TIMEOUT = 3
+ACK_LOST = 4      # втрачена / скинута перезавантаженням плати
+ACK_DROPPED = 5   # вікно команд заповнене, не відправлялась
+ACK_NO_LINK = 6   # serial недоступний
+
+HEADER = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("record_size", "<u2"),
+    ("capacity", "<u4"),
+    ("written", "<u8"),       # усього записів (індекс запису = written % capacity)
+    ("created", "<f8"),       # time.time() створення файлу
+    ("reserved", "V36"),
+])
+
+RECORD = np.dtype([
+    ("tick", "<u8"),
+    ("t", "<f8"),             # time.monotonic() старту тіку
+    ("wall", "<f8"),          # time.time() запису (порівняння між перезапусками)
+    ("obs", "<f4", (9,)),
+    ("action", "<f4", (6,)),
+    ("stages", "<f4", (len(STAGES),)),  # секунди
+    ("tick_s", "<f4"),
+    ("telemetry_age", "<f4"), # с, NaN - телеметрії немає
+    ("ack_rtt", "<f4"),       # с
+    ("ack", "u1"),
+    ("source", "u1"),
+    ("reserved", "V6"),
+])
+
+assert HEADER.itemsize == HEADER_SIZE
+
+
+def _ack_code(ack) -> int:
+    if ack.ok:
+        return ACK_OK
+    if ack.reply == "timeout":
+        return ACK_TIMEOUT
+    if ack.reply in ("lost", "reset", "closed", "read_error"):
+        return ACK_LOST
+    return ACK_ERROR
+
+
+class FlightRecorder:
+    """
+    Пише лише control loop (record), ACK дописує потік читання serial
+    у той самий слот (ack_callback). Існуючий файл з тією самою розкладкою
+    продовжується, інакше створюється заново.
+    """
+
+    def __init__(self, path: str, capacity: int = 72000, flush_interval: float = 30.0):
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+
+        size = HEADER_SIZE + capacity * RECORD.itemsize
+        self._mm = self._open(path, size)
+        self.header = self._mm[:HEADER_SIZE].view(HEADER)[0:1]
+        self.records = self._mm[HEADER_SIZE:size].view(RECORD)
+
+        # View по полях: присвоєння рядка без створення np.void
+        self._tick = self.records["tick"]
+        self._t = self.records["t"]
+        self._wall = self.records["wall"]
+        self._obs = self.records["obs"]
+        self._action = self.records["action"]
+        self._stages = self.records["stages"]
+        self._tick_s = self.records["tick_s"]
+        self._telemetry_age = self.records["telemetry_age"]
+        self._ack = self.records["ack"]
+        self._ack_rtt = self.records["ack_rtt"]
+        self._source = self.records["source"]
+
+        self.written = int(self.header["written"][0])
+        self.flushes = 0
+
+        REGISTRY.counter("robot_flight_records_total", "Тіки, записані у самописець") \
+            .set_function(lambda: self.written)
+
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        if flush_interval > 0:
+            self._thread = Thread(target=self._flush_loop, name="flight-recorder", daemon=True)
+            self._thread.start()
+
+        logger.info(f"✅ Flight recorder: {path} ({capacity} записів, "
+                    f"{size / 1e6:.1f} MB, вже записано {self.written})")
+
+    def _open(self, path: str, size: int) -> np.memmap:
+        if os.path.exists(path) and os.path.getsize(path) == size:
+            mm = np.memmap(path, dtype=np.uint8, mode="r+", shape=(size,))
+            header = mm[:HEADER_SIZE].view(HEADER)[0]
+            if (header["magic"] == MAGIC and header["version"] == VERSION
+                    and header["record_size"] == RECORD.itemsize
+                    and header["capacity"] == self.capacity):
+                return mm
+            del mm
+            logger.warning(f"⚠️ {path}: інша розкладка, файл перестворено")
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.truncate(size)  # розріджений файл - місце виділяється при записі
+        mm = np.memmap(path, dtype=np.uint8, mode="r+", shape=(size,))
+        header = mm[:HEADER_SIZE].view(HEADER)
+        header["magic"] = MAGIC
+        header["version"] = VERSION
+        header["record_size"] = RECORD.itemsize
+        header["capacity"] = self.capacity
+        header["written"] = 0
+        header["created"] = time.time()
+        return mm
+
+    # ---- Control loop ----
+
+    def record(self, tick: int, t: float, obs: np.ndarray, action: np.ndarray,
+               stages, tick_s: float, telemetry_age: float,
+               source: int = SOURCE_POLICY, ack: int = ACK_PENDING) -> int:
+        """Записати тік; повертає слот (для ack_callback)"""
+        slot = self.written % self.capacity
+        self._tick[slot] = tick
+        self._t[slot] = t
+        self._wall[slot] = time.time()
+        n = min(len(obs), 9)
+        self._obs[slot, :n] = obs[:n]
+        self._obs[slot, n:] = 0.0
+        self._action[slot] = action[:6]
+        self._stages[slot] = stages
+        self._tick_s[slot] = tick_s
+        self._telemetry_age[slot] = telemetry_age
+        self._ack[slot] = ack
+        self._ack_rtt[slot] = np.nan
+        self._source[slot] = source
+        self.written += 1
+        self.header["written"] = self.written
+        return slot
+
+    def ack_callback(self, slot: int, tick: int):
+        """Callback для Future[Ack]: дописати результат у слот тіку"""
+        def on_done(future):
+            ack = future.result()
+            if self._tick[slot] != tick:
+                return  # слот уже перезаписано новим колом
+            self._ack_rtt[slot] = ack.rtt
+            self._ack[slot] = _ack_code(ack)
+        return on_done
+
+    # ---- Обслуговування ----
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        try:
+            self._mm.flush()
+            self.flushes += 1
+        except Exception as e:
+            logger.error(f"❌ Flight recorder flush error: {e}")
+
+    def close(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "capacity": self.capacity,
+            "written": self.written,
+            "flushes": self.flushes,
+        }
+
+
+def load(path: str) -> tuple[np.ndarray, dict]:
+    """
+    Прочитати файл самописця: записи у хронологічному порядку (копія)
+    і заголовок. Для ще не заповненого кільця - лише записані слоти.
+    """
+    mm = np.memmap(path, dtype=np.uint8, mode="r")
+    header = mm[:HEADER_SIZE].view(HEADER)[0]
+    if header["magic"] != MAGIC or header["version"] != VERSION:
+        raise ValueError(f"{path}: не файл самописця v{VERSION}")
+    if header["record_size"] != RECORD.itemsize:
+        raise ValueError(f"{path}: розмір запису {header['record_size']}, очікується {RECORD.itemsize}")
+
+    capacity = int(header["capacity"])
+    written = int(header["written"])
+    records = mm[HEADER_SIZE:HEADER_SIZE + capacity * RECORD.itemsize].view(RECORD)
+    if written <= capacity:
+        ordered = records[:written].copy()
+    else:
+        start = written % capacity
+        ordered = np.concatenate([records[start:], records[:start]])
+
+    info = {
+        "capacity": capacity,
+        "written": written,
+        "created": float(header["created"]),
+        "stages": STAGES,
+    }
+    return ordered, info
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+TFLite інференс без алокацій на виклик: спостереження пишеться прямо
+у вхідний буфер інтерпретатора через tensor()-view, дія копіюється
+у заздалегідь виділений масив
+"""
+
+import time
+import logging
+from threading import Lock
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_tflite = None
+
+
+def tflite_module():
+    """
+    tflite_runtime імпортується при першому завантаженні моделі: на холодному
+    старті імпорт іде в потоці завантаження паралельно з serial і MQTT
+    """
+    global _tflite
+    if _tflite is None:
+        import tflite_runtime.interpreter as tflite
+        _tflite = tflite
+    return _tflite
+
+
+class InferenceEngine:
+    """
+    Обгортка над tflite Interpreter для control loop.
+
+    - num_threads: потоки інтерпретатора;
+    - use_xnnpack: XNNPACK (делегат за замовчуванням у tflite-runtime);
+      False - лише вбудовані ядра;
+    - delegate_path: зовнішній делегат (.so), напр. для NPU/GPU;
+    - warmup: кількість «холостих» invoke при завантаженні.
+
+    `predict` повертає той самий буфер дії на кожному виклику - хто
+    зберігає результат довше за тік, має його скопіювати.
+
+    Views вхідного/вихідного тензорів тримаються постійно, тому invoke
+    викликається напряму (Interpreter.invoke() відмовляє, поки існують
+    views). Це безпечно, доки на інтерпретаторі не викликають
+    allocate_tensors()/resize_tensor_input(): заміна моделі = новий рушій.
+    """
+
+    def __init__(self, model_path: Optional[str], num_threads: int = 1,
+                 use_xnnpack: bool = True, delegate_path: Optional[str] = None,
+                 warmup: int = 10, action_size: int = 6):
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self.use_xnnpack = use_xnnpack
+        self.delegate_path = delegate_path
+        self.warmup = warmup
+
+        self.interpreter = None
+        self.input_shape: tuple = ()
+        self.output_shape: tuple = ()
+        self._in_view = None   # плаский view вхідного тензора
+        self._out_view = None  # плаский view вихідного тензора
+        self._invoke = None
+        self._in_size = 0
+        self._out_size = 0
+        self._in_quant = (0.0, 0)
+        self._out_quant = (0.0, 0)
+        self._in_range = None  # (min, max) цілочисельного входу; None - float
+        self._scratch = None  # для квантизованого входу
+
+        # Буфер дії фіксованого розміру (актуатори), неважливо що видає модель
+        self.action = np.zeros(action_size, dtype=np.float32)
+        self.invocations = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self.interpreter is not None
+
+    def load(self):
+        """Завантажити модель, виділити тензори та прогріти"""
+        tflite = tflite_module()
+        delegates = []
+        if self.delegate_path:
+            delegates.append(tflite.load_delegate(self.delegate_path))
+
+        resolver = (tflite.OpResolverType.AUTO if self.use_xnnpack
+                    else tflite.OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES)
+
+        interpreter = tflite.Interpreter(
+            model_path=self.model_path,
+            num_threads=self.num_threads,
+            experimental_delegates=delegates or None,
+            experimental_op_resolver_type=resolver
+        )
+        interpreter.allocate_tensors()
+
+        input_details = interpreter.get_input_details()[0]
+        output_details = interpreter.get_output_details()[0]
+        self.input_shape = tuple(input_details["shape"])
+        self.output_shape = tuple(output_details["shape"])
+        self._in_size = int(np.prod(self.input_shape[1:]))
+        self._out_size = int(np.prod(self.output_shape[1:]))
+        self._in_quant = input_details["quantization"]
+        self._out_quant = output_details["quantization"]
+        # Межі цілочисельного входу: поза калібрувальним діапазоном - насичення, а не переповнення
+        in_dtype = np.dtype(input_details["dtype"])
+        self._in_range = (np.iinfo(in_dtype).min, np.iinfo(in_dtype).max) if in_dtype.kind in "iu" else None
+
+        self._scratch = np.zeros(self._in_size, dtype=np.float32)
+
+        # Невикористані входи лишаються нулями
+        interpreter.tensor(input_details["index"])().fill(0)
+        warmup_start = time.perf_counter()
+        for _ in range(self.warmup):
+            interpreter.invoke()
+        warmup_ms = (time.perf_counter() - warmup_start) * 1000
+
+        self._in_view = interpreter.tensor(input_details["index"])().reshape(-1)
+        self._out_view = interpreter.tensor(output_details["index"])().reshape(-1)
+        self._invoke = interpreter._interpreter.Invoke
+        self._bind(len(self.action) + 3)
+        self.interpreter = interpreter
+
+        if self._out_size != len(self.action):
+            logger.warning(
+                f"⚠️ Модель видає {self._out_size} значень, актуаторів {len(self.action)} - "
+                f"решта дії буде нулями"
+            )
+
+        logger.info(
+            f"✅ Модель завантажена: {self.model_path} | in {self.input_shape} out {self.output_shape} | "
+            f"threads={self.num_threads} xnnpack={self.use_xnnpack} | warmup {warmup_ms:.1f} ms"
+        )
+
+    def _bind(self, obs_size: int):
+        """Підготувати views під довжину спостереження (без зрізів на кожен виклик)"""
+        n = min(obs_size, self._in_size)
+        m = min(self._out_size, len(self.action))
+        self._obs_size = obs_size
+        self._obs_n = n
+        self._in_dst = self._in_view[:n]
+        self._scratch_n = self._scratch[:n]
+        self._out_src = self._out_view[:m]
+        self._action_dst = self.action[:m]
+
+    def predict(self, observation: np.ndarray) -> np.ndarray:
+        """Один інференс; результат - у спільному буфері self.action"""
+        if len(observation) != self._obs_size:
+            self._bind(len(observation))
+        if self._obs_n != self._obs_size:
+            observation = observation[:self._obs_n]
+
+        scale, zero_point = self._in_quant
+        if scale:
+            np.divide(observation, scale, out=self._scratch_n)
+            np.add(self._scratch_n, zero_point, out=self._scratch_n)
+            np.rint(self._scratch_n, out=self._scratch_n)
+            if self._in_range is not None:
+                np.clip(self._scratch_n, *self._in_range, out=self._scratch_n)
+            np.copyto(self._in_dst, self._scratch_n, casting="unsafe")
+        else:
+            np.copyto(self._in_dst, observation, casting="unsafe")
+
+        self._invoke()
+        self.invocations += 1
+
+        scale, zero_point = self._out_quant
+        if scale:
+            # Спершу у float32: віднімання в int8/uint8 переповнилось би біля меж типу
+            np.copyto(self._action_dst, self._out_src, casting="unsafe")
+            self._action_dst -= zero_point
+            self._action_dst *= scale
+        else:
+            np.copyto(self._action_dst, self._out_src, casting="unsafe")
+        return self.action
+
+
+class DummyEngine:
+    """DUMMY_MODEL=1: дія = суглоби зі спостереження (тестування без моделі)"""
+
+    loaded = False
+    model_path = None
+    input_shape = (1, 9)
+    output_shape = (1, 6)
+
+    def __init__(self, action_size: int = 6):
+        self.action = np.zeros(action_size, dtype=np.float32)
+        self.invocations = 0
+
+    def load(self):
+        logger.info("🔧 DUMMY_MODEL=1 - модель не завантажується")
+
+    def predict(self, observation: np.ndarray) -> np.ndarray:
+        self.action[:] = observation[:len(self.action)]
+        self.invocations += 1
+        return self.action
+
+
+class BatchInferenceEngine:
+    """
+    Окремий інтерпретатор для пакетної оцінки (/predict_batch), щоб не чіпати
+    інтерпретатор control loop. Вхід змінює розмір під батч; розмір батчу
+    округлюється вгору до степеня двійки, щоб не перевиділяти тензори на
+    кожен запит. Якщо модель не підтримує змінний батч - інференс по рядках.
+    """
+
+    def __init__(self, model_path: Optional[str], num_threads: int = 1,
+                 use_xnnpack: bool = True, action_size: int = 6, dummy: bool = False):
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self.use_xnnpack = use_xnnpack
+        self.action_size = action_size
+        self.dummy = dummy
+
+        self.interpreter = None
+        self._lock = Lock()
+        self._capacity = 0
+        self._resizable = True
+
+    def _ensure_loaded(self):
+        if self.interpreter is not None:
+            return
+        tflite = tflite_module()
+        resolver = (tflite.OpResolverType.AUTO if self.use_xnnpack
+                    else tflite.OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES)
+        self.interpreter = tflite.Interpreter(
+            model_path=self.model_path,
+            num_threads=self.num_threads,
+            experimental_op_resolver_type=resolver
+        )
+        self.interpreter.allocate_tensors()
+        self._in = self.interpreter.get_input_details()[0]
+        self._out = self.interpreter.get_output_details()[0]
+        self._in_size = int(np.prod(self._in["shape"][1:]))
+        self._out_size = int(np.prod(self._out["shape"][1:]))
+        self._capacity = int(self._in["shape"][0])
+        logger.info(f"✅ Batch-інтерпретатор завантажено: {self.model_path}")
+
+    def _reserve(self, n: int) -> int:
+        """Ємність батчу ≥ n (степінь двійки); 1 якщо модель не змінює батч"""
+        if not self._resizable:
+            return 1
+        capacity = 1 << max(0, (n - 1).bit_length())
+        if capacity != self._capacity:
+            try:
+                self.interpreter.resize_tensor_input(self._in["index"], [capacity, self._in_size])
+                self.interpreter.allocate_tensors()
+                self._capacity = capacity
+            except Exception as e:
+                logger.warning(f"⚠️ Модель не підтримує змінний батч ({e}) - інференс по рядках")
+                self._resizable = False
+                self.interpreter.resize_tensor_input(self._in["index"], [1, self._in_size])
+                self.interpreter.allocate_tensors()
+                self._capacity = 1
+        return self._capacity
+
+    def predict(self, observations: np.ndarray) -> tuple[np.ndarray, dict]:
+        """N×obs → N×action та розбивка часу (мс)"""
+        t0 = time.perf_counter()
+        n = len(observations)
+        actions = np.zeros((n, self.action_size), dtype=np.float32)
+
+        if self.dummy:
+            actions[:] = observations[:, :self.action_size]
+            return actions, {"prepare_ms": 0.0, "invoke_ms": 0.0, "invokes": 0}
+
+        with self._lock:
+            self._ensure_loaded()
+            capacity = self._reserve(n)
+            k = min(observations.shape[1], self._in_size)
+            m = min(self._out_size, self.action_size)
+            batch = np.zeros((capacity, self._in_size), dtype=self._in["dtype"])
+            in_scale, in_zero = self._in["quantization"]
+            out_scale, out_zero = self._out["quantization"]
+            if in_scale:
+                observations = np.rint(observations / in_scale + in_zero)
+                if batch.dtype.kind in "iu":
+                    # Насичення до меж типу входу, а не переповнення при приведенні
+                    info = np.iinfo(batch.dtype)
+                    np.clip(observations, info.min, info.max, out=observations)
+            t1 = time.perf_counter()
+
+            invokes = 0
+            invoke_s = 0.0
+            for start in range(0, n, capacity):
+                rows = min(capacity, n - start)
+                batch[:rows, :k] = observations[start:start + rows, :k]
+                batch[rows:] = 0
+                self.interpreter.set_tensor(self._in["index"], batch)
+                ti = time.perf_counter()
+                self.interpreter.invoke()
+                invoke_s += time.perf_counter() - ti
+                invokes += 1
+                out = self.interpreter.get_tensor(self._out["index"]).reshape(capacity, -1)[:rows, :m]
+                if out_scale:
+                    out = (out.astype(np.float32) - out_zero) * out_scale
+                actions[start:start + rows, :m] = out
+
+        return actions, {
+            "prepare_ms": (t1 - t0) * 1000,
+            "invoke_ms": invoke_s * 1000,
+            "invokes": invokes,
+        }
@@ -3,19 +3,43 @@
 Orange Pi Zero: RL Inference + YOLO Integration
 """
 
+import time
+_STARTED = time.monotonic()  # початок імпорту - для таймінгу холодного старту
+
 import os
 import json
-import time
+import signal
 import asyncio
 import logging
-import tflite_runtime.interpreter as tflite
 import serial
 import paho.mqtt.client as mqtt
 import numpy as np
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional
-from threading import Thread, Lock
+from threading import Thread, Event, Timer
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+
+from serial_link import SerialLink, Ack
+from telemetry import TelemetryCache
+from target import TargetEstimator, TargetSelector
+from trajectory import TrajectoryGenerator, SetpointStreamer
+from stream import StreamHub
+import detection_schema
+from workspace import world_to_workspace, velocity_to_workspace
+from inference import InferenceEngine, DummyEngine, BatchInferenceEngine
+from model_manager import ModelManager, MODES
+from metrics import REGISTRY, CONTENT_TYPE as PROMETHEUS_CONTENT_TYPE
+from scheduler import RealtimeScheduler
+import flight_recorder
+from flight_recorder import FlightRecorder
+from shared_state import (
+    StateSnapshotBuffer, CommandQueue, Command,
+    SNAP_SIZE, SNAP_JOINTS, SNAP_TARGET, SNAP_ACTION,
+    SNAP_ARMED, SNAP_STATE_TIME, SNAP_ACK_OK, SNAP_TICK, SNAP_TICK_TIME
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,9 +50,64 @@ SERIAL_DEV = os.getenv("SERIAL_DEV", "/dev/ttyACM0")
 MQTT_HOST = os.getenv("MQTT_HOST", "mqtt")
 MQTT_PORT = int(os.getenv("MQTT_PORT", 1883))
 DUMMY_MODEL = os.getenv("DUMMY_MODEL", "0") == "1"
+INFER_THREADS = int(os.getenv("INFER_THREADS", 1))  # потоки TFLite інтерпретатора
+INFER_XNNPACK = os.getenv("INFER_XNNPACK", "1") == "1"
+INFER_DELEGATE = os.getenv("INFER_DELEGATE") or None  # шлях до зовнішнього делегата (.so)
+INFER_WARMUP = int(os.getenv("INFER_WARMUP", 10))  # холостих invoke при завантаженні
+SERIAL_WINDOW = int(os.getenv("SERIAL_WINDOW", 2))  # рядків у польоті (додатково обмежено SERIAL_RX_BUFFER)
+SERIAL_RX_BUFFER = int(os.getenv("SERIAL_RX_BUFFER", 64))  # байт у польоті: RX-буфер Mega
+SERIAL_ACK_TIMEOUT = float(os.getenv("SERIAL_ACK_TIMEOUT", 0.75))
+SERIAL_READY_TIMEOUT = float(os.getenv("SERIAL_READY_TIMEOUT", 3.0))  # с, очікування банера READY
+TELEMETRY_HZ = int(os.getenv("TELEMETRY_HZ", 50))  # частота телеметрії від Arduino
+TELEMETRY_RETRY_MAX = float(os.getenv("TELEMETRY_RETRY_MAX", 5.0))  # с, найбільша пауза між спробами після READY
+TELEMETRY_HISTORY = int(os.getenv("TELEMETRY_HISTORY", 512))  # записів у кільцевому буфері
+CONTROL_RATE_HZ = float(os.getenv("CONTROL_RATE_HZ", 20))
+OVERRUN_POLICY = os.getenv("OVERRUN_POLICY", "skip")  # skip | catchup
+STATUS_LOG_S = float(os.getenv("STATUS_LOG_S", 10))  # період рядка статусу в лозі
+COMMAND_QUEUE_SIZE = int(os.getenv("COMMAND_QUEUE_SIZE", 8))  # ручних команд /predict в черзі
+PREDICT_TIMEOUT = float(os.getenv("PREDICT_TIMEOUT", 2.0))  # с, очікування результату /predict
+PREDICT_BATCH_MAX = int(os.getenv("PREDICT_BATCH_MAX", 4096))  # рядків у /predict_batch
+TARGET_MAX_AGE = float(os.getenv("TARGET_MAX_AGE", 0.5))  # с, після цього ціль втрачена
+TARGET_PROCESS_NOISE = float(os.getenv("TARGET_PROCESS_NOISE", 4.0))  # шум прискорення Калмана
+TARGET_MEAS_NOISE = float(os.getenv("TARGET_MEAS_NOISE", 1e-4))  # дисперсія вимірювання YOLO
+TARGET_PREDICT = os.getenv("TARGET_PREDICT", "1") == "1"  # екстраполяція між кадрами
+TARGET_POLICY = os.getenv("TARGET_POLICY", "locked")  # locked (тримати трек) | confidence | nearest
+TARGET_LOCK_TIMEOUT = float(os.getenv("TARGET_LOCK_TIMEOUT", 0.5))  # с, очікування зниклого треку
+TARGET_FRAME = os.getenv("TARGET_FRAME", "workspace")  # workspace (wx, wy каліброваного детектора, як у симуляції) | image
+FLIGHT_RECORDER_PATH = os.getenv("FLIGHT_RECORDER_PATH", "/app/data/flight_recorder.bin")  # "" - вимкнено
+FLIGHT_RECORDER_SIZE = int(os.getenv("FLIGHT_RECORDER_SIZE", 72000))  # записів (1 год при 20 Hz)
+FLIGHT_RECORDER_FLUSH_S = float(os.getenv("FLIGHT_RECORDER_FLUSH_S", 30))  # період msync, 0 - лише ядро
+MOTION_MODE = os.getenv("MOTION_MODE", "trajectory")  # trajectory (потокові уставки sp) | cmd (блокуючий рух прошивки)
+TRAJ_PROFILE = os.getenv("TRAJ_PROFILE", "trapezoid")  # trapezoid | minjerk
+TRAJ_RATE_HZ = float(os.getenv("TRAJ_RATE_HZ", 50))  # частота уставок sp
+TRAJ_V_MAX = float(os.getenv("TRAJ_V_MAX", 1.0))  # рад/с
+TRAJ_A_MAX = float(os.getenv("TRAJ_A_MAX", 4.0))  # рад/с²
+STREAM_MAX_HZ = float(os.getenv("STREAM_MAX_HZ", 50))  # верхня межа частоти /stream
+STREAM_DEFAULT_HZ = float(os.getenv("STREAM_DEFAULT_HZ", 10))  # частота, якщо клієнт не вказав rate
+STREAM_MAX_CLIENTS = int(os.getenv("STREAM_MAX_CLIENTS", 16))
+STREAM_SEND_TIMEOUT = float(os.getenv("STREAM_SEND_TIMEOUT", 5.0))  # с, далі WebSocket клієнт відключається
+STREAM_KEEPALIVE_S = float(os.getenv("STREAM_KEEPALIVE_S", 15))  # коментар SSE, поки немає кадрів
 
 app = FastAPI(title="Robot Arm RL Controller")
 
+INFERENCE_SECONDS = REGISTRY.histogram(
+    "robot_inference_seconds", "Латентність RL інференсу живої моделі")
+MQTT_MESSAGES = REGISTRY.counter(
+    "robot_mqtt_messages_total", "Прийняті MQTT повідомлення", ("topic", "format"))
+MQTT_DECODE_SECONDS = REGISTRY.histogram(
+    "robot_mqtt_decode_seconds", "Час розбору повідомлення детекцій")
+MQTT_ERRORS = REGISTRY.counter(
+    "robot_mqtt_parse_errors_total", "MQTT повідомлення, які не вдалося розібрати")
+MQTT_MESSAGE_AGE = REGISTRY.histogram(
+    "robot_mqtt_message_age_seconds",
+    "Вік детекції при прийомі (годинники Orange Pi PC і Zero мають бути синхронізовані)",
+    buckets=(0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0)
+)
+STARTUP_SECONDS = REGISTRY.gauge(
+    "robot_startup_seconds", "Тривалість етапів холодного старту", ("stage",))
+
+_IMPORTS_DONE = time.monotonic()
+
 class YOLODetection(BaseModel):
     objects: list
     timestamp: float
@@ -39,55 +118,185 @@ class RobotState(BaseModel):
     target_object: Optional[dict] = None
     action: Optional[list[float]] = None
     serial_ack: Optional[str] = None
+    armed: Optional[bool] = None
+    state_age_ms: Optional[float] = None
 
 class RobotController:
     def __init__(self):
-        # TFLite інтерпретатор
-        self.interpreter = None
-        self.input_details = None
-        self.output_details = None
-        self.load_model()
+        """
+        Лише стан без вводу-виводу: модель, serial і MQTT піднімає start()
+        у фоні, щоб HTTP сервер відповідав на /healthz і /readyz одразу
+        """
+        # TFLite інтерпретатор (живу модель тримає ModelManager)
+        self.models: Optional[ModelManager] = None
+        self.batch_engine: Optional[BatchInferenceEngine] = None
         
         # Serial комунікація
         self.serial_port = None
-        self.serial_lock = Lock()
-        self.init_serial()
+        self.link = None
+        self.last_ack: Optional[Ack] = None
+        self.telemetry = TelemetryCache(history=TELEMETRY_HISTORY)
+        self.streamer: Optional[SetpointStreamer] = None
+        self.serial_ready = Event()
+        self.serial_ready_reason: Optional[str] = None
+        self._telemetry_generation = 0  # новий READY скасовує повтори попереднього
         
         # MQTT
-        self.mqtt_client = mqtt.Client()
-        self.mqtt_client.on_message = self.on_mqtt_message
-        self.mqtt_client.connect(MQTT_HOST, MQTT_PORT, 60)
-        self.mqtt_client.subscribe("arm/vision/objects")
+        self.mqtt_client = None
+        self.mqtt_connected = False
+        self._mqtt_objects = {
+            fmt: MQTT_MESSAGES.labels("arm/vision/objects", fmt) for fmt in ("binary", "json")
+        }
         
         # Стан
         self.current_state = np.zeros(9, dtype=np.float32)  # [joints(6), yolo(3)]
         self.joint_angles = np.zeros(6, dtype=np.float32)
-        self.yolo_target = np.zeros(3, dtype=np.float32)
+        self.yolo_target = np.zeros(3, dtype=np.float32)  # оцінка на поточний тік
         self.last_detection_time = 0
+        self.target = TargetEstimator(
+            max_age=TARGET_MAX_AGE,
+            process_noise=TARGET_PROCESS_NOISE,
+            measurement_noise=TARGET_MEAS_NOISE,
+            predict=TARGET_PREDICT
+        )
+        self.selector = TargetSelector(TARGET_POLICY, lock_timeout=TARGET_LOCK_TIMEOUT)
+        self.target_frame = None  # система координат останньої цілі: workspace | image
         
-        # MQTT loop в окремому потоці
-        mqtt_thread = Thread(target=self.mqtt_client.loop_forever, daemon=True)
-        mqtt_thread.start()
+        # Обмін з HTTP API: знімок стану (читання без локів) і черга команд
+        self.snapshot = StateSnapshotBuffer()
+        self._snapshot_values = np.full(SNAP_SIZE, np.nan, dtype=np.float64)
+        self.commands = CommandQueue(maxsize=COMMAND_QUEUE_SIZE)
+        
+        REGISTRY.gauge("robot_command_queue_depth", "Ручні команди /predict у черзі") \
+            .set_function(lambda: self.commands.depth)
+        REGISTRY.gauge("robot_detection_age_seconds", "Час від останньої YOLO детекції") \
+            .set_function(lambda: time.time() - self.last_detection_time)
+        
+        # Бортовий самописець тіків
+        self.recorder: Optional[FlightRecorder] = None
+        if FLIGHT_RECORDER_PATH:
+            try:
+                self.recorder = FlightRecorder(
+                    FLIGHT_RECORDER_PATH,
+                    capacity=FLIGHT_RECORDER_SIZE,
+                    flush_interval=FLIGHT_RECORDER_FLUSH_S
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Flight recorder вимкнено: {e}")
+        
+        # Планувальник control loop
+        self.scheduler = RealtimeScheduler(
+            rate_hz=CONTROL_RATE_HZ,
+            overrun_policy=OVERRUN_POLICY
+        )
+        
+        # Холодний старт
+        self.startup_timings: dict[str, float] = {}
+        self.startup_error: Optional[str] = None
+        self.control_thread: Optional[Thread] = None
         
         logger.info("✅ RobotController ініціалізовано")
     
-    def load_model(self):
-        """Завантажити TFLite модель"""
-        if DUMMY_MODEL:
-            logger.info("🔧 DUMMY_MODEL=1 - модель не завантажується")
+    def start(self):
+        """
+        Холодний старт: модель, serial і MQTT паралельно. Control loop
+        стартує, щойно готові модель і serial; MQTT може під'єднатися пізніше
+        (до того ціль просто вважається втраченою).
+        """
+        started = time.monotonic()
+        
+        def timed(stage, fn):
+            t0 = time.monotonic()
+            fn()
+            self.startup_timings[stage] = time.monotonic() - t0
+            STARTUP_SECONDS.labels(stage).set(self.startup_timings[stage])
+        
+        pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup")
+        model = pool.submit(timed, "model", self.load_model)
+        link = pool.submit(timed, "serial", self.init_serial)
+        broker = pool.submit(timed, "mqtt", self.init_mqtt)
+        pool.shutdown(wait=False)
+        
+        try:
+            model.result()
+            link.result()
+        except Exception as e:
+            # Як і раніше - процес завершується, restart: unless-stopped перезапускає
+            self.startup_error = str(e)
+            logger.error(f"❌ Старт не вдався: {e}")
+            os.kill(os.getpid(), signal.SIGTERM)
             return
         
+        self.control_thread = Thread(target=self.control_loop, name="control-loop", daemon=True)
+        self.control_thread.start()
+        self.startup_timings["control"] = time.monotonic() - started
+        
         try:
-            self.interpreter = tflite.Interpreter(model_path=MODEL_PATH)
-            self.interpreter.allocate_tensors()
-            
-            self.input_details = self.interpreter.get_input_details()
-            self.output_details = self.interpreter.get_output_details()
-            
-            logger.info(f"✅ Модель завантажена: {MODEL_PATH}")
+            broker.result()
         except Exception as e:
-            logger.error(f"❌ Помилка завантаження моделі: {e}")
-            raise
+            logger.error(f"❌ MQTT помилка: {e}")
+        
+        self.startup_timings["imports"] = _IMPORTS_DONE - _STARTED
+        self.startup_timings["total"] = time.monotonic() - _STARTED
+        for stage in ("imports", "control", "total"):
+            STARTUP_SECONDS.labels(stage).set(self.startup_timings[stage])
+        logger.info(
+            "⏱️ Холодний старт: " +
+            " | ".join(f"{stage} {self.startup_timings[stage] * 1000:.0f} ms"
+                       for stage in ("imports", "model", "serial", "mqtt", "control", "total")
+                       if stage in self.startup_timings) +
+            f" | serial: {self.serial_ready_reason}"
+        )
+    
+    def readiness(self) -> dict:
+        """Стан компонентів для /readyz"""
+        return {
+            "model": self.models is not None,
+            "serial": self.serial_ready.is_set(),
+            "mqtt": self.mqtt_connected,
+            "control_loop": self.control_thread is not None and self.scheduler.ticks > 0,
+        }
+    
+    @property
+    def ready(self) -> bool:
+        """Готовий керувати рукою (MQTT не обов'язковий)"""
+        state = self.readiness()
+        return state["model"] and state["serial"] and state["control_loop"]
+    
+    def make_engine(self, path: str) -> InferenceEngine:
+        return InferenceEngine(
+            path,
+            num_threads=INFER_THREADS,
+            use_xnnpack=INFER_XNNPACK,
+            delegate_path=INFER_DELEGATE,
+            warmup=INFER_WARMUP
+        )
+    
+    def load_model(self):
+        """Завантажити TFLite модель"""
+        if DUMMY_MODEL:
+            engine = DummyEngine()
+            engine.load()
+        else:
+            try:
+                engine = self.make_engine(MODEL_PATH)
+                engine.load()
+            except Exception as e:
+                logger.error(f"❌ Помилка завантаження моделі: {e}")
+                raise
+        
+        self.models = ModelManager(engine, self.make_engine)
+        self._reset_batch_engine()
+    
+    def _reset_batch_engine(self):
+        """Окремий інтерпретатор для /predict_batch (завантажується при першому запиті)"""
+        live = self.models.live
+        self.batch_engine = BatchInferenceEngine(
+            live.model_path,
+            num_threads=INFER_THREADS,
+            use_xnnpack=INFER_XNNPACK,
+            dummy=not live.loaded
+        )
     
     def init_serial(self):
         """Ініціалізація Serial портом"""
@@ -95,152 +304,341 @@ class RobotController:
             self.serial_port = serial.Serial(
                 SERIAL_DEV,
                 baudrate=115200,
-                timeout=1
+                timeout=0.05  # короткий таймаут: потік читання перевіряє прострочені ACK
+            )
+            self.link = SerialLink(
+                self.serial_port,
+                window=SERIAL_WINDOW,
+                ack_timeout=SERIAL_ACK_TIMEOUT,
+                rx_budget=SERIAL_RX_BUFFER
             )
-            time.sleep(2)  # Очікування Arduino ініціалізації
-            self.serial_port.reset_input_buffer()
-            self.serial_port.reset_output_buffer()
-            logger.info(f"✅ Serial підключено: {SERIAL_DEV}")
+            self.link.add_listener(self.telemetry.on_line)
+            self.link.add_listener(self._on_serial_line)
+            self.link.start()
+            
+            # Відкриття порту скидає Mega (DTR): замість фіксованої паузи чекаємо
+            # банер READY (телеметрію тоді вмикає _on_serial_line)
+            if not self.serial_ready.wait(SERIAL_READY_TIMEOUT):
+                # Плата не перезавантажилась (DTR-reset вимкнено, емулятор) - перевірка командою
+                future = self.enable_telemetry()
+                ack = future.result(timeout=SERIAL_ACK_TIMEOUT + 1.0) if future else None
+                if ack is None or not ack.ok:
+                    raise RuntimeError(f"Arduino не відповідає: {ack.reply if ack else 'вікно команд заповнене'}")
+                self._mark_serial_ready("probe")
+            logger.info(f"✅ Serial підключено: {SERIAL_DEV} ({self.serial_ready_reason})")
+            
+            if MOTION_MODE == "trajectory":
+                self.streamer = SetpointStreamer(
+                    self.link,
+                    self.telemetry,
+                    TrajectoryGenerator(v_max=TRAJ_V_MAX, a_max=TRAJ_A_MAX, profile=TRAJ_PROFILE),
+                    rate_hz=TRAJ_RATE_HZ
+                )
+                self.streamer.start()
         except Exception as e:
             logger.error(f"❌ Serial помилка: {e}")
             raise
     
+    def _mark_serial_ready(self, reason: str):
+        if not self.serial_ready.is_set():
+            self.serial_ready_reason = reason
+            self.serial_ready.set()
+    
+    def init_mqtt(self):
+        """Підключення до брокера у фоні paho (з автоматичним перепідключенням)"""
+        self.mqtt_client = mqtt.Client()
+        self.mqtt_client.on_connect = self._on_mqtt_connect
+        self.mqtt_client.on_disconnect = self._on_mqtt_disconnect
+        self.mqtt_client.on_message = self.on_mqtt_message
+        self.mqtt_client.connect_async(MQTT_HOST, MQTT_PORT, 60)
+        self.mqtt_client.loop_start()
+    
+    def _on_mqtt_connect(self, client, userdata, flags, rc):
+        if rc != 0:
+            logger.error(f"❌ MQTT connect rc={rc}")
+            return
+        # Підписка тут - відновлюється після кожного перепідключення
+        client.subscribe("arm/vision/objects")
+        self.mqtt_connected = True
+        logger.info(f"✅ MQTT підключено: {MQTT_HOST}:{MQTT_PORT}")
+    
+    def _on_mqtt_disconnect(self, client, userdata, rc):
+        self.mqtt_connected = False
+        if rc != 0:
+            logger.warning(f"⚠️ MQTT відключено (rc={rc}), перепідключення...")
+    
+    def enable_telemetry(self) -> Optional[Future]:
+        """Увімкнути потокову телеметрію стану на Arduino"""
+        if self.link:
+            return self.link.send({"telemetry": TELEMETRY_HZ}, kind="config")
+        return None
+    
+    def _ensure_telemetry(self, generation: int, attempt: int = 1):
+        """
+        Увімкнути телеметрію після READY і повторювати, доки не прийде OK -
+        інакше /state віддавав би застарілий стан. Викликається з потоку
+        читання serial, тож ACK не чекаємо, а обробляємо в callback
+        """
+        if generation != self._telemetry_generation or not self.link or not self.link.running:
+            return
+        future = self.enable_telemetry()
+        if future is None:
+            self._retry_telemetry(generation, attempt, "вікно команд заповнене")
+            return
+        future.add_done_callback(lambda f: self._on_telemetry_ack(f.result(), generation, attempt))
+    
+    def _on_telemetry_ack(self, ack: Ack, generation: int, attempt: int):
+        if ack.ok:
+            if attempt > 1:
+                logger.info(f"✅ Телеметрію увімкнено зі спроби {attempt}")
+            return
+        self._retry_telemetry(generation, attempt, ack.reply)
+    
+    def _retry_telemetry(self, generation: int, attempt: int, reason: str):
+        delay = min(TELEMETRY_RETRY_MAX, 0.25 * 2 ** (attempt - 1))
+        logger.warning(f"⚠️ Телеметрію не увімкнено ({reason}), спроба {attempt} - повтор через {delay:g} с")
+        timer = Timer(delay, self._ensure_telemetry, args=(generation, attempt + 1))
+        timer.daemon = True
+        timer.start()
+    
+    def _on_serial_line(self, line: str, now: float):
+        """Рядки від Arduino, що не є відповіддю на команду"""
+        if line.startswith("READY"):
+            # Після перезавантаження прошивка стартує з вимкненою телеметрією
+            if self.serial_ready.is_set():
+                logger.warning(f"⚠️ Arduino перезавантажилась: {line}")
+            self._mark_serial_ready("READY")
+            self._telemetry_generation += 1
+            self._ensure_telemetry(self._telemetry_generation)
+        elif line.startswith("S "):
+            # Телеметрія вже йде - плата працює без перезавантаження
+            self._mark_serial_ready("telemetry")
+    
     def on_mqtt_message(self, client, userdata, msg):
         """Обробка YOLO детекцій"""
         if msg.topic == "arm/vision/objects":
             try:
-                data = json.loads(msg.payload)
+                t0 = time.perf_counter()
+                detections = detection_schema.decode(msg.payload)
+                MQTT_DECODE_SECONDS.observe(time.perf_counter() - t0)
                 self.last_detection_time = time.time()
+                self._mqtt_objects["binary" if detections.version else "json"].inc()
+                if detections.timestamp:
+                    MQTT_MESSAGE_AGE.observe(max(0.0, self.last_detection_time - detections.timestamp))
                 
-                # Витяг першого об'єкта
-                if data.get("objects"):
-                    obj = data["objects"][0]
-                    self.yolo_target[0] = obj.get("x", 0.0)
-                    self.yolo_target[1] = obj.get("y", 0.0)
-                    self.yolo_target[2] = obj.get("confidence", 0.0)
-                else:
-                    self.yolo_target = np.zeros(3, dtype=np.float32)
+                # Вибір цілі за політикою (control loop підхопить її на наступному тіку)
+                received = time.monotonic()
+                objects = detections.objects
+                index = self.selector.select(objects, received)
+                if index is not None:
+                    obj = objects[index]
+                    world = TARGET_FRAME == "workspace" and "wx" in objects.dtype.names and np.isfinite(obj["wx"])
+                    if world:
+                        # Калібрований детектор: точка на столі → u, v робочої зони (як у симуляції)
+                        u, v = world_to_workspace(float(obj["wx"]), float(obj["wy"]))
+                        vu, vv = velocity_to_workspace(float(obj["wvx"]), float(obj["wvy"]))
+                        self.target.update(u, v, obj["confidence"], received, obj["track_id"], vu, vv)
+                    elif "track_id" in objects.dtype.names:
+                        self.target.update(obj["x"], obj["y"], obj["confidence"], received,
+                                           obj["track_id"], obj["vx"], obj["vy"])
+                    else:
+                        self.target.update(obj["x"], obj["y"], obj["confidence"], received)
+                    self._set_target_frame("workspace" if world else "image")
+                elif not len(objects):
+                    self.target.update(0.0, 0.0, 0.0, received)
                 
-                logger.debug(f"📷 YOLO target: {self.yolo_target}")
+                logger.debug(f"📷 YOLO detection: {self.target.latest}")
             except Exception as e:
+                MQTT_ERRORS.inc()
                 logger.error(f"❌ MQTT parse error: {e}")
     
+    def _set_target_frame(self, frame: str):
+        if frame != self.target_frame:
+            if frame == "image" and TARGET_FRAME == "workspace":
+                logger.warning("⚠️ Детекції без wx, wy (детектор без калібрування) - ціль у координатах кадру")
+            else:
+                logger.info(f"📐 Ціль у координатах: {frame}")
+            self.target_frame = frame
+    
     def predict(self, observation: np.ndarray) -> np.ndarray:
-        """RL інференс"""
-        if DUMMY_MODEL:
-            # Повернути спостереження як є (тестування)
-            return observation[:6]
-        
+        """RL інференс (результат - спільний буфер рушія, дійсний до наступного виклику)"""
         try:
-            # Нормалізація
-            obs = observation.reshape(1, -1).astype(np.float32)
-            
-            # Інференс
-            self.interpreter.set_tensor(
-                self.input_details[0]['index'],
-                obs
-            )
-            self.interpreter.invoke()
-            
-            action = self.interpreter.get_tensor(
-                self.output_details[0]['index']
-            )[0]
-            
+            t0 = time.perf_counter()
+            action = self.models.live.predict(observation)
+            INFERENCE_SECONDS.observe(time.perf_counter() - t0)
             return action
         except Exception as e:
             logger.error(f"❌ Inference error: {e}")
             return np.zeros(6, dtype=np.float32)
     
-    def send_action(self, action: np.ndarray) -> bool:
-        """Відправка дії на Arduino"""
-        if not self.serial_port:
-            return False
+    def send_action(self, action: np.ndarray) -> Optional[Future]:
+        """
+        Відправка дії на Arduino без очікування ACK.
+        Повертає Future[Ack] або None, якщо вікно команд заповнене.
+        У режимі trajectory дія - нова ціль траєкторії (Future першої уставки).
+        """
+        if not self.link:
+            return None
         
-        try:
-            with self.serial_lock:
-                command = {
-                    "action": action.tolist(),
-                    "timestamp": time.time()
-                }
-                
-                json_str = json.dumps(command) + '\r\n'
-                self.serial_port.write(json_str.encode())
-                
-                # Очікування ACK
-                ack_timeout = 0.75
-                start = time.time()
-                ack = ""
-                
-                while time.time() - start < ack_timeout:
-                    if self.serial_port.in_waiting:
-                        ack = self.serial_port.readline().decode().strip()
-                        if ack:
-                            break
-                    time.sleep(0.05)
-                
-                if ack == "ACK":
-                    logger.debug(f"✅ ACK отримано")
-                    return True
-                else:
-                    logger.warning(f"⚠️ Очікувалось ACK, отримано: {ack}")
-                    return False
-        except Exception as e:
-            logger.error(f"❌ Serial send error: {e}")
-            return False
+        if self.streamer is not None and self.streamer.supported:
+            future = self.streamer.set_target(np.clip(action[:6], -np.pi, np.pi), time.monotonic())
+            future.add_done_callback(self._on_ack)
+            return future
+        
+        # Дія в радіанах [-π, π] → нормалізована команда прошивки 0..1
+        cmd = np.clip((action[:6] + np.pi) / (2 * np.pi), 0.0, 1.0)
+        future = self.link.send({"cmd": [round(float(v), 3) for v in cmd]})
+        if future is not None:
+            future.add_done_callback(self._on_ack)
+        return future
     
-    def get_state(self) -> RobotState:
-        """Отримати поточний стан"""
-        with self.serial_lock:
-            try:
-                self.serial_port.write(b'GET_STATE\r\n')
-                response = self.serial_port.readline().decode().strip()
-                
-                data = json.loads(response)
-                self.joint_angles = np.array(data.get("joint_positions", [0]*6), dtype=np.float32)
-                
-                return RobotState(
-                    joint_angles=self.joint_angles.tolist(),
-                    target_object={
-                        "x": self.yolo_target[0],
-                        "y": self.yolo_target[1],
-                        "confidence": self.yolo_target[2]
-                    } if self.yolo_target[2] > 0.5 else None
-                )
-            except Exception as e:
-                logger.error(f"❌ Get state error: {e}")
-                return RobotState(joint_angles=self.joint_angles.tolist())
+    def _on_ack(self, future: Future):
+        ack = future.result()
+        self.last_ack = ack
+        if not ack.ok:
+            logger.warning(f"⚠️ Команда без OK: {ack.reply}")
+    
+    def publish_snapshot(self, action: np.ndarray, tick_time: float):
+        """Записати знімок стану для API (викликає лише control loop)"""
+        values = self._snapshot_values
+        snapshot = self.telemetry.latest()
+        values[SNAP_JOINTS] = self.joint_angles
+        values[SNAP_TARGET] = self.yolo_target
+        values[SNAP_ACTION] = action[:6]
+        values[SNAP_ARMED] = snapshot.armed if snapshot else np.nan
+        values[SNAP_STATE_TIME] = snapshot.host_time if snapshot else np.nan
+        values[SNAP_ACK_OK] = self.last_ack.ok if self.last_ack else np.nan
+        values[SNAP_TICK] = self.scheduler.ticks
+        values[SNAP_TICK_TIME] = tick_time
+        self.snapshot.publish(values, self.last_ack.reply if self.last_ack else None)
+    
+    def get_state(self, values: Optional[np.ndarray] = None) -> RobotState:
+        """Поточний стан зі знімка control loop (без serial і без локів)"""
+        if values is None:
+            values = self.snapshot.read()
+        target = values[SNAP_TARGET]
+        state_time = values[SNAP_STATE_TIME]
+        
+        return RobotState(
+            joint_angles=np.nan_to_num(values[SNAP_JOINTS]).tolist(),
+            target_object={
+                "x": float(target[0]),
+                "y": float(target[1]),
+                "confidence": float(target[2])
+            } if target[2] > 0.5 else None,
+            action=None if np.isnan(values[SNAP_ACTION][0]) else values[SNAP_ACTION].tolist(),
+            serial_ack=self.snapshot.reply,
+            armed=None if np.isnan(values[SNAP_ARMED]) else bool(values[SNAP_ARMED]),
+            state_age_ms=None if np.isnan(state_time) else (time.monotonic() - state_time) * 1000
+        )
+    
+    def stream_frame(self) -> Optional[tuple[int, dict]]:
+        """Кадр для /stream: (тік, стан) зі знімка; None до першого тіку"""
+        values = self.snapshot.read()
+        if np.isnan(values[SNAP_TICK]):
+            return None
+        return int(values[SNAP_TICK]), {
+            "tick": int(values[SNAP_TICK]),
+            "time": time.time(),
+            "yolo_target": np.nan_to_num(values[SNAP_TARGET]).tolist(),
+            **self.get_state(values).model_dump()
+        }
+    
+    def _run_command(self, command: Command) -> tuple[np.ndarray, np.ndarray, Optional[Future]]:
+        """
+        Виконати ручну команду з черги замість дії політики на цьому тіку.
+        Повертає (спостереження, дію, Future[Ack] або None)
+        """
+        obs = command.observation
+        if len(obs) == 6:
+            # Доповнити YOLO даними на момент виконання
+            obs = np.concatenate([obs, self.yolo_target])
+        started = time.monotonic()
+        action = np.array(self.predict(obs), dtype=np.float32)
+        
+        future = self.send_action(action)
+        if future is None:
+            _resolve(command.future, (action, None, started))
+        else:
+            future.add_done_callback(
+                lambda f: _resolve(command.future, (action, f.result(), started))
+            )
+        return obs, action, future
+    
+    def record_tick(self, now: float, obs: np.ndarray, action: np.ndarray,
+                    future: Optional[Future], source: int):
+        """Записати завершений тік у самописець (ACK допишеться при надходженні)"""
+        snapshot = self.telemetry.latest()
+        if future is not None:
+            ack = flight_recorder.ACK_PENDING
+        else:
+            ack = flight_recorder.ACK_DROPPED if self.link else flight_recorder.ACK_NO_LINK
+        tick = self.scheduler.ticks
+        slot = self.recorder.record(
+            tick, now, obs, action,
+            self.scheduler.last_stages, self.scheduler.last_tick,
+            now - snapshot.host_time if snapshot else np.nan,
+            source=source, ack=ack
+        )
+        if future is not None:
+            future.add_done_callback(self.recorder.ack_callback(slot, tick))
     
     def control_loop(self):
         """Основний цикл керування"""
-        logger.info("🚀 Запуск control loop...")
+        logger.info(f"🚀 Запуск control loop: {CONTROL_RATE_HZ:.0f} Hz, overrun={OVERRUN_POLICY}")
         
-        loop_time = 0.05  # 20 Hz
-        last_time = time.time()
+        sched = self.scheduler
+        next_status = time.monotonic() + STATUS_LOG_S
         
         while True:
             try:
-                start = time.time()
+                now = sched.start_tick()
+                
+                # Заміна моделі лише між тіками
+                if self.models.apply_pending():
+                    self._reset_batch_engine()
                 
-                # Оновлення спостереження
+                # Оновлення спостереження з останньої телеметрії
+                snapshot = self.telemetry.latest()
+                if snapshot is not None:
+                    self.joint_angles = snapshot.joint_angles
                 self.current_state[:6] = self.joint_angles
+                # Ціль, екстрапольована на момент тіку (нулі, якщо детекція застаріла)
+                self.target.estimate(now, self.yolo_target)
                 self.current_state[6:9] = self.yolo_target
+                sched.mark("observe")
                 
-                # RL інференс
-                action = self.predict(self.current_state)
+                command = self.commands.poll()
+                if command is not None and command.future.set_running_or_notify_cancel():
+                    # Ручна команда з /predict (інференс + відправка)
+                    obs, action, future = self._run_command(command)
+                    source = flight_recorder.SOURCE_COMMAND
+                    sched.mark("infer")
+                    sched.mark("send")
+                else:
+                    # RL інференс (+ shadow-кандидат у своєму потоці)
+                    obs = self.current_state
+                    action = self.predict(obs)
+                    self.models.submit_shadow(obs, action)
+                    source = flight_recorder.SOURCE_POLICY
+                    sched.mark("infer")
+                    
+                    # Відправка на Arduino (ACK обробляється потоком читання)
+                    future = self.send_action(action)
+                    sched.mark("send")
                 
-                # Відправка на Arduino
-                success = self.send_action(action)
+                # Знімок стану для API
+                self.publish_snapshot(action, now)
+                sched.mark("read")
                 
-                # Читання стану
-                state = self.get_state()
+                sched.end_tick()
                 
-                # Частота
-                elapsed = time.time() - start
-                if elapsed < loop_time:
-                    time.sleep(loop_time - elapsed)
+                if self.recorder is not None:
+                    self.record_tick(now, obs, action, future, source)
                 
-                freq = 1.0 / (time.time() - start)
-                print(f"🔄 Freq: {freq:.1f}Hz | YOLO conf: {self.yolo_target[2]:.2f}", end='\r')
+                if now >= next_status:
+                    logger.info(f"🔄 {sched.summary()} | YOLO conf: {self.yolo_target[2]:.2f}")
+                    next_status = now + STATUS_LOG_S
             
             except KeyboardInterrupt:
                 logger.info("🛑 Зупинка control loop...")
@@ -249,25 +647,52 @@ class RobotController:
                 logger.error(f"❌ Control loop error: {e}")
                 time.sleep(0.1)
 
+def _resolve(future: Future, result):
+    """Завершити Future, якщо клієнт ще чекає"""
+    try:
+        future.set_result(result)
+    except InvalidStateError:
+        pass
+
 controller = None
+stream_hub = None
 
 @app.on_event("startup")
 async def startup():
-    global controller
+    global controller, stream_hub
     controller = RobotController()
+    stream_hub = StreamHub(controller.stream_frame, max_hz=STREAM_MAX_HZ, max_clients=STREAM_MAX_CLIENTS)
+    stream_hub.start()
     
-    # Запуск control loop в окремому потоці
-    control_thread = Thread(target=controller.control_loop, daemon=True)
-    control_thread.start()
+    # Модель, serial і MQTT паралельно у фоні; потім control loop
+    Thread(target=controller.start, name="startup", daemon=True).start()
+
+def _require_ready():
+    if not controller.ready:
+        raise HTTPException(status_code=503, detail="Контролер ще стартує")
 
 @app.get("/healthz")
 async def healthz():
-    """Health check"""
+    """Liveness: процес живий і відповідає"""
     return {
         "status": "ok",
-        "model_loaded": controller.interpreter is not None,
+        "model_loaded": controller.models is not None and controller.models.live.loaded,
         "serial_connected": controller.serial_port is not None,
-        "mqtt_connected": controller.mqtt_client._sock is not None
+        "mqtt_connected": controller.mqtt_connected
+    }
+
+@app.get("/readyz")
+async def readyz(response: Response):
+    """Readiness: модель завантажена, Arduino відповіла, control loop тікає"""
+    ready = controller.ready
+    if not ready:
+        response.status_code = 503
+    return {
+        "ready": ready,
+        "components": controller.readiness(),
+        "serial_ready": controller.serial_ready_reason,
+        "startup_ms": {k: round(v * 1000, 1) for k, v in controller.startup_timings.items()},
+        "error": controller.startup_error
     }
 
 @app.get("/state")
@@ -275,37 +700,228 @@ async def get_robot_state():
     """Отримати поточний стан"""
     return controller.get_state()
 
+@app.websocket("/stream")
+async def stream_websocket(websocket: WebSocket, rate: Optional[float] = None):
+    """
+    Push стану: JSON-кадр на тік control loop, не частіше rate Гц (?rate=10).
+    Частоту можна змінити повідомленням {"rate": 5}; повільний клієнт
+    отримує лише найсвіжіші кадри.
+    """
+    subscriber = stream_hub.subscribe("websocket", stream_hub.clamp_rate(rate, STREAM_DEFAULT_HZ))
+    if subscriber is None:
+        await websocket.close(code=1013)  # try again later
+        return
+    await websocket.accept()
+    
+    async def receive():
+        while True:
+            try:
+                message = await websocket.receive_json()
+                subscriber.rate_hz = stream_hub.clamp_rate(float(message["rate"]), subscriber.rate_hz)
+            except WebSocketDisconnect:
+                return
+            except (ValueError, TypeError, KeyError):
+                continue
+    
+    reader = asyncio.create_task(receive())
+    next_frame = None
+    try:
+        while True:
+            # Очікування кадру навперегони з reader: відключення помітне й без нових кадрів
+            next_frame = asyncio.ensure_future(subscriber.next_frame(stream_hub))
+            await asyncio.wait({next_frame, reader}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_frame.done():
+                break
+            frame, _ = next_frame.result()
+            await asyncio.wait_for(websocket.send_text(frame), STREAM_SEND_TIMEOUT)
+            subscriber.mark_sent()
+    except (WebSocketDisconnect, RuntimeError, asyncio.TimeoutError):
+        pass
+    finally:
+        if next_frame is not None:
+            next_frame.cancel()
+        reader.cancel()
+        stream_hub.unsubscribe(subscriber)
+
+@app.get("/stream")
+async def stream_sse(rate: Optional[float] = None):
+    """Той самий потік як Server-Sent Events (text/event-stream) для клієнтів без WebSocket"""
+    subscriber = stream_hub.subscribe("sse", stream_hub.clamp_rate(rate, STREAM_DEFAULT_HZ))
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Забагато підписників /stream", headers={"Retry-After": "5"})
+    
+    async def events():
+        try:
+            yield b"retry: 1000\n\n"
+            while True:
+                try:
+                    _, event = await asyncio.wait_for(subscriber.next_frame(stream_hub), STREAM_KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield event
+                subscriber.mark_sent()
+        finally:
+            stream_hub.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/predict")
-async def predict(data: dict):
+async def predict(data: dict, response: Response):
     """
-    Ручний запит до RL моделі
+    Ручний запит до RL моделі (виконується control loop на найближчому тіку)
     Input: {"x": [6 joint angles або 9: joints+yolo]}
+    Заголовки: X-Queue-Depth, X-Queue-Wait-Ms, X-Latency-Ms
     """
+    _require_ready()
+    start = time.monotonic()
     try:
         obs = np.array(data.get("x", [0]*9), dtype=np.float32)
-        if len(obs) == 6:
-            # Доповнити YOLO даними
-            obs = np.concatenate([obs, controller.yolo_target])
-        
-        action = controller.predict(obs)
-        success = controller.send_action(action)
-        
-        state = controller.get_state()
-        
-        return {
-            "action": action.tolist(),
-            "serial_ack": "ACK" if success else "NACK",
-            "robot_state": state.dict()
-        }
-    except Exception as e:
-        logger.error(f"❌ Predict error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if obs.shape not in ((6,), (9,)):
+        raise HTTPException(status_code=422, detail="x має містити 6 або 9 значень")
+    
+    command = controller.commands.submit(obs)
+    if command is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Черга команд заповнена",
+            headers={"Retry-After": "1"}
+        )
+    depth = controller.commands.depth
+    
+    try:
+        action, ack, started = await asyncio.wait_for(
+            asyncio.wrap_future(command.future),
+            timeout=PREDICT_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Control loop не виконав команду вчасно")
+    
+    response.headers["X-Queue-Depth"] = str(depth)
+    response.headers["X-Queue-Wait-Ms"] = f"{(started - command.enqueued_at) * 1000:.1f}"
+    response.headers["X-Latency-Ms"] = f"{(time.monotonic() - start) * 1000:.1f}"
+    
+    return {
+        "action": action.tolist(),
+        "serial_ack": "ACK" if ack is not None and ack.ok else "NACK",
+        "robot_state": controller.get_state().model_dump()
+    }
+
+@app.post("/predict_batch")
+async def predict_batch(request: Request):
+    """
+    Пакетна оцінка без відправки на Arduino (окремий інтерпретатор)
+    Input: JSON {"x": [[9 значень], ...]} або application/octet-stream -
+           float32 little-endian N×9 (N×6 доповнюється поточною YOLO ціллю)
+    Output: JSON {"actions": N×6, ...} або float32 N×6, якщо
+            Accept: application/octet-stream (таймінги - в заголовках)
+    """
+    _require_ready()
+    start = time.monotonic()
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("application/octet-stream"):
+            width = int(request.headers.get("X-Obs-Width", 9))
+            obs = np.frombuffer(body, dtype="<f4").reshape(-1, width)
+        else:
+            obs = np.asarray(json.loads(body).get("x", []), dtype=np.float32)
+    except (ValueError, TypeError, AttributeError) as e:
+        raise HTTPException(status_code=422, detail=f"Невірний формат батчу: {e}")
+    
+    if obs.ndim != 2 or obs.shape[1] not in (6, 9) or len(obs) == 0:
+        raise HTTPException(status_code=422, detail="x має бути масивом N×9 (або N×6)")
+    if len(obs) > PREDICT_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"Максимум {PREDICT_BATCH_MAX} рядків")
+    if obs.shape[1] == 6:
+        target = controller.snapshot.read()[SNAP_TARGET]
+        obs = np.hstack([obs, np.broadcast_to(np.nan_to_num(target), (len(obs), 3))])
+    
+    actions, timing = await run_in_threadpool(controller.batch_engine.predict, obs)
+    timing["total_ms"] = (time.monotonic() - start) * 1000
+    headers = {
+        "X-Batch-Size": str(len(obs)),
+        "X-Invoke-Ms": f"{timing['invoke_ms']:.2f}",
+        "X-Latency-Ms": f"{timing['total_ms']:.2f}"
+    }
+    
+    if "application/octet-stream" in request.headers.get("accept", ""):
+        return Response(
+            content=actions.astype("<f4").tobytes(),
+            media_type="application/octet-stream",
+            headers=headers
+        )
+    return Response(
+        content=json.dumps({"n": len(actions), "actions": actions.tolist(), "timing": timing}),
+        media_type="application/json",
+        headers=headers
+    )
+
+@app.get("/model")
+async def model_status():
+    """Жива модель, кандидати та статистика shadow-режиму"""
+    _require_ready()
+    return controller.models.status()
+
+@app.post("/model/load", status_code=202)
+async def model_load(data: dict):
+    """
+    Фонове завантаження моделі без перезапуску
+    Input: {"path": "/app/models/new.tflite", "mode": "swap" | "shadow"}
+    """
+    _require_ready()
+    path = data.get("path")
+    mode = data.get("mode", "swap")
+    if not path or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail=f"Файл моделі не знайдено: {path}")
+    if mode not in MODES:
+        raise HTTPException(status_code=422, detail=f"mode має бути одним з {MODES}")
+    if not controller.models.load(path, mode):
+        raise HTTPException(status_code=409, detail="Інша модель вже завантажується")
+    return {"loading": path, "mode": mode}
+
+@app.post("/model/promote")
+def model_promote():
+    """Зробити shadow-модель живою (заміна на найближчому тіку)"""
+    _require_ready()
+    if not controller.models.promote():
+        raise HTTPException(status_code=409, detail="Немає shadow-моделі")
+    return controller.models.status()
+
+@app.post("/model/shadow/stop")
+def model_shadow_stop():
+    """Зупинити shadow-режим"""
+    _require_ready()
+    controller.models.stop_shadow()
+    return controller.models.status()
 
 @app.get("/metrics")
-async def metrics():
-    """Метрики системи"""
+async def metrics(request: Request, format: Optional[str] = None):
+    """
+    Метрики системи: JSON за замовчуванням, Prometheus text format для
+    скрейпера (Accept: text/plain / openmetrics) або ?format=prometheus
+    """
+    accept = request.headers.get("accept", "")
+    if format == "prometheus" or (format is None and ("text/plain" in accept or "openmetrics" in accept)):
+        return Response(content=REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+    
+    values = controller.snapshot.read()
     return {
-        "yolo_target": controller.yolo_target.tolist(),
-        "joint_angles": controller.joint_angles.tolist(),
-        "last_detection": controller.last_detection_time
+        "yolo_target": np.nan_to_num(values[SNAP_TARGET]).tolist(),
+        "joint_angles": np.nan_to_num(values[SNAP_JOINTS]).tolist(),
+        "last_detection": controller.last_detection_time,
+        "target": {**controller.target.stats(time.monotonic()), "selection": controller.selector.stats(),
+                   "frame": controller.target_frame},
+        "flight_recorder": controller.recorder.stats() if controller.recorder else None,
+        "serial": controller.link.stats() if controller.link else None,
+        "trajectory": controller.streamer.stats() if controller.streamer else None,
+        "stream": stream_hub.stats(),
+        "telemetry": controller.telemetry.stats(),
+        "control": controller.scheduler.stats(),
+        "commands": controller.commands.stats()
     }
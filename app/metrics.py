@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Легкий реєстр метрик у форматі Prometheus (text exposition 0.0.4).
+
+Оновлення - звичайні інкременти атрибутів без локів: кожну метрику пише
+один потік (control loop, serial reader, MQTT), а скрейп лише читає.
+Лок береться тільки при створенні нової комбінації міток.
+"""
+
+import math
+import bisect
+from threading import Lock
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+# Кошики латентності, секунди (останній - +Inf)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02,
+                   0.03, 0.05, 0.075, 0.1, 0.25, 0.5, 1.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{str(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Gauge:
+    """Значення, що встановлюється або обчислюється при скрейпі"""
+
+    def __init__(self):
+        self.value = 0.0
+        self._fn: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def set_function(self, fn: Callable[[], float]):
+        self._fn = fn
+
+    def get(self) -> float:
+        if self._fn is not None:
+            try:
+                return float(self._fn())
+            except Exception:
+                return math.nan
+        return self.value
+
+
+class Counter(Gauge):
+    """
+    Монотонний лічильник. Як і Gauge, може читати значення з функції при
+    скрейпі - тоді лічильник, що вже є в коді як int, не дублюється.
+    """
+
+    def set(self, value: float):
+        raise TypeError("Counter не можна встановити")
+
+
+class Histogram:
+    """Гістограма з фіксованими кошиками (секунди); запис без алокацій"""
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(float(b) for b in buckets)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        """Оцінка перцентиля за верхньою межею кошика"""
+        if self.count == 0:
+            return 0.0
+        rank = q / 100.0 * self.count
+        idx = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return min(self.bounds[idx], self.max) if idx < len(self.bounds) else self.max
+
+    def as_dict(self) -> dict:
+        """JSON-подання в мілісекундах (для /metrics у форматі JSON)"""
+        return {
+            "count": self.count,
+            "mean_ms": self.sum / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max * 1000,
+            "buckets_ms": [b * 1000 for b in self.bounds],
+            "counts": list(self.counts),
+        }
+
+
+class MetricFamily:
+    """Метрика з іменем, довідкою і (опційно) мітками"""
+
+    def __init__(self, kind: str, name: str, documentation: str,
+                 labelnames: tuple = (), factory: Callable = None):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children: dict = {}
+        self._lock = Lock()
+        if not self.labelnames:
+            self._children[()] = factory()
+
+    def labels(self, *values):
+        """Дочірня метрика для значень міток (кешується - тримайте посилання)"""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._factory())
+        return child
+
+    def __getattr__(self, item):
+        # Метрика без міток проксіює inc/set/observe на єдину дочірню
+        if self.labelnames or item.startswith("_"):
+            raise AttributeError(item)
+        return getattr(self._children[()], item)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            if self.kind == "histogram":
+                cumulative = 0
+                for bound, count in zip(self.bounds_of(child), child.counts):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+                lines.append(f"{self.name}_count{labels} {child.count}")
+            else:
+                value = child.get()
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+    @staticmethod
+    def bounds_of(child: Histogram) -> tuple:
+        return child.bounds + (math.inf,)
+
+
+class Registry:
+    def __init__(self):
+        self._families: dict[str, MetricFamily] = {}
+        self._lock = Lock()
+
+    def _register(self, kind: str, name: str, documentation: str,
+                  labelnames: tuple, factory: Callable) -> MetricFamily:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = MetricFamily(kind, name, documentation, labelnames, factory)
+            return family
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> MetricFamily:
+        return self._register("counter", name, documentation, labelnames, Counter)
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> MetricFamily:
+        return self._register("gauge", name, documentation, labelnames, Gauge)
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> MetricFamily:
+        buckets = tuple(buckets)
+        return self._register("histogram", name, documentation, labelnames, lambda: Histogram(buckets))
+
+    def render(self) -> str:
+        lines = []
+        for family in list(self._families.values()):
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+# Глобальний реєстр застосунку
+REGISTRY = Registry()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Гаряче перезавантаження моделі та shadow-режим без перезапуску застосунку
+"""
+
+import time
+import logging
+from threading import Thread, Lock, Event
+from typing import Callable, Optional
+
+import numpy as np
+
+from metrics import REGISTRY, Histogram
+
+logger = logging.getLogger(__name__)
+
+MODES = ("swap", "shadow")
+
+SHADOW_SECONDS = REGISTRY.histogram(
+    "robot_model_shadow_inference_seconds", "Латентність інференсу shadow-моделі")
+
+
+class ShadowStats:
+    """Латентність кандидата та розбіжність його дій з живою моделлю"""
+
+    def __init__(self):
+        self.latency = Histogram()  # лише поточний кандидат (для /model)
+        self.samples = 0
+        self.dropped = 0  # спостереження, які кандидат не встиг обробити
+        self.l2_sum = 0.0
+        self.l2_max = 0.0
+        self.abs_max = 0.0
+
+    def record(self, latency: float, candidate: np.ndarray, live: np.ndarray):
+        diff = candidate - live
+        l2 = float(np.sqrt(np.dot(diff, diff)))
+        self.latency.observe(latency)
+        SHADOW_SECONDS.observe(latency)
+        self.samples += 1
+        self.l2_sum += l2
+        self.l2_max = max(self.l2_max, l2)
+        self.abs_max = max(self.abs_max, float(np.max(np.abs(diff))))
+
+    def as_dict(self) -> dict:
+        return {
+            "samples": self.samples,
+            "dropped": self.dropped,
+            "latency": self.latency.as_dict(),
+            "divergence_l2_mean": self.l2_sum / self.samples if self.samples else 0.0,
+            "divergence_l2_max": self.l2_max,
+            "divergence_abs_max": self.abs_max,
+        }
+
+
+class ModelManager:
+    """
+    Тримає живий рушій control loop і кандидатів.
+
+    - load(path, "swap"): кандидат завантажується і перевіряється у фоні,
+      control loop підхоплює його на межі тіку через apply_pending();
+    - load(path, "shadow"): кандидат отримує ті самі спостереження, що й жива
+      модель (в окремому потоці, лише останнє), його дії логуються, але не
+      відправляються; рахуються латентність і розбіжність;
+    - promote(): shadow-кандидат стає живою моделлю - лише після виходу
+      shadow-потоку, щоб інтерпретатор не викликався з двох потоків.
+    """
+
+    def __init__(self, live_engine, engine_factory: Callable[[str], object],
+                 obs_size: int = 9, action_size: int = 6):
+        self.live = live_engine
+        self.engine_factory = engine_factory
+        self.obs_size = obs_size
+        self.action_size = action_size
+
+        self._pending = None
+        self._promoting = None  # shadow-рушій, що стане _pending після виходу свого потоку
+        self.shadow = None
+        self.shadow_stats: Optional[ShadowStats] = None
+        self.swaps = 0
+        self.loading: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self._lock = Lock()
+
+        # Слот «останнє спостереження» для shadow-потоку
+        self._shadow_obs = np.zeros(obs_size, dtype=np.float32)
+        self._shadow_live = np.zeros(action_size, dtype=np.float32)
+        self._shadow_ready = Event()
+        self._shadow_lock = Lock()
+        self._shadow_thread: Optional[Thread] = None
+
+        REGISTRY.counter("robot_model_swaps_total", "Гарячі заміни живої моделі") \
+            .set_function(lambda: self.swaps)
+
+    # ---- Завантаження ----
+
+    def load(self, path: str, mode: str = "swap") -> bool:
+        """Почати фонове завантаження; False якщо вже щось завантажується"""
+        if mode not in MODES:
+            raise ValueError(f"mode має бути одним з {MODES}")
+        with self._lock:
+            if self.loading:
+                return False
+            self.loading = path
+            self.last_error = None
+        Thread(target=self._load_worker, args=(path, mode), name="model-loader", daemon=True).start()
+        return True
+
+    def _load_worker(self, path: str, mode: str):
+        start = time.monotonic()
+        try:
+            engine = self.engine_factory(path)
+            engine.load()
+            self.validate(engine)
+        except Exception as e:
+            logger.error(f"❌ Кандидат {path} відхилено: {e}")
+            self.last_error = f"{path}: {e}"
+            self.loading = None
+            return
+
+        load_ms = (time.monotonic() - start) * 1000
+        if mode == "swap":
+            self._pending = engine
+            logger.info(f"✅ Модель {path} готова до заміни ({load_ms:.0f} ms)")
+        else:
+            self.stop_shadow()
+            self.shadow_stats = ShadowStats()
+            self._shadow_ready.clear()
+            self.shadow = engine
+            self._shadow_thread = Thread(
+                target=self._shadow_worker, args=(engine,), name="model-shadow", daemon=True
+            )
+            self._shadow_thread.start()
+            logger.info(f"👥 Shadow-модель {path} запущена ({load_ms:.0f} ms)")
+        self.loading = None
+
+    def validate(self, engine):
+        """Форми входу/виходу кандидата мають збігатися з живою моделлю"""
+        if getattr(self.live, "loaded", False):
+            expected_in, expected_out = self.live.input_shape, self.live.output_shape
+        else:
+            expected_in, expected_out = (1, self.obs_size), (1, self.action_size)
+        if tuple(engine.input_shape) != tuple(expected_in):
+            raise ValueError(f"вхід {engine.input_shape}, очікується {expected_in}")
+        if tuple(engine.output_shape) != tuple(expected_out):
+            raise ValueError(f"вихід {engine.output_shape}, очікується {expected_out}")
+
+        action = engine.predict(np.zeros(self.obs_size, dtype=np.float32))
+        if not np.all(np.isfinite(action)):
+            raise ValueError("модель повертає NaN/Inf на нульовому спостереженні")
+
+    # ---- Виклики з control loop ----
+
+    def apply_pending(self) -> bool:
+        """Замінити живу модель на межі тіку (викликає лише control loop)"""
+        engine = self._pending
+        if engine is None:
+            return False
+        self._pending = None
+        previous, self.live = self.live, engine
+        self.swaps += 1
+        logger.info(f"🔁 Живу модель замінено: {previous.model_path} → {engine.model_path}")
+        return True
+
+    def submit_shadow(self, observation: np.ndarray, live_action: np.ndarray):
+        """Передати спостереження кандидату без очікування (старе перезаписується)"""
+        if self.shadow is None:
+            return
+        with self._shadow_lock:
+            if self._shadow_ready.is_set():
+                # Кандидат ще не забрав попереднє спостереження
+                self.shadow_stats.dropped += 1
+            self._shadow_obs[:] = observation[:self.obs_size]
+            self._shadow_live[:] = live_action[:self.action_size]
+            self._shadow_ready.set()
+
+    def _shadow_worker(self, engine):
+        stats = self.shadow_stats
+        obs = np.zeros(self.obs_size, dtype=np.float32)
+        live = np.zeros(self.action_size, dtype=np.float32)
+        while self.shadow is engine:
+            if not self._shadow_ready.wait(timeout=0.5):
+                continue
+            with self._shadow_lock:
+                obs[:] = self._shadow_obs
+                live[:] = self._shadow_live
+                self._shadow_ready.clear()
+            if self.shadow is not engine:
+                break
+
+            t0 = time.perf_counter()
+            action = engine.predict(obs)
+            stats.record(time.perf_counter() - t0, action, live)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"👥 shadow action={np.round(action, 3).tolist()} live={np.round(live, 3).tolist()}")
+
+        # Потік більше не торкається рушія - тепер його можна віддати control loop
+        with self._lock:
+            if self._promoting is engine:
+                self._promoting = None
+                self._pending = engine
+
+    # ---- Керування ----
+
+    def promote(self) -> bool:
+        """
+        Shadow-кандидат стає живою моделлю на тіку після виходу shadow-потоку
+        (його передає сам потік, коли завершено останній predict)
+        """
+        engine = self.shadow
+        if engine is None:
+            return False
+        with self._lock:
+            self._promoting = engine
+        if not self.stop_shadow():
+            logger.warning(f"⚠️ Shadow-інференс {engine.model_path} ще триває - заміна після його завершення")
+        return True
+
+    def stop_shadow(self) -> bool:
+        """Зупинити shadow-потік; False - потік ще в predict (завершиться сам)"""
+        self.shadow = None
+        self._shadow_ready.set()  # розбудити потік, щоб він завершився
+        thread = self._shadow_thread
+        if thread is None:
+            return True
+        thread.join(timeout=1.0)
+        if thread.is_alive():
+            return False
+        self._shadow_thread = None
+        return True
+
+    def status(self) -> dict:
+        return {
+            "live": {
+                "path": self.live.model_path,
+                "input_shape": list(map(int, self.live.input_shape)),
+                "output_shape": list(map(int, self.live.output_shape)),
+            },
+            "pending_swap": self._pending.model_path if self._pending else None,
+            "promoting": self._promoting.model_path if self._promoting else None,
+            "loading": self.loading,
+            "last_error": self.last_error,
+            "swaps": self.swaps,
+            "shadow": {
+                "path": self.shadow.model_path,
+                **self.shadow_stats.as_dict(),
+            } if self.shadow else None,
+        }
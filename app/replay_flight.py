@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Розбір і відтворення файлу самописця: зведення по тіках/ACK та прогін
+записаних спостережень через RobotController.predict офлайн.
+
+    python replay_flight.py /app/data/flight_recorder.bin --model model.tflite
+    python replay_flight.py flight_recorder.bin --dummy --last 2000 --export run.npz
+"""
+
+import time
+import argparse
+
+import numpy as np
+
+import flight_recorder
+from flight_recorder import STAGES
+from inference import InferenceEngine, DummyEngine
+from model_manager import ModelManager
+
+ACK_NAMES = {
+    flight_recorder.ACK_PENDING: "pending",
+    flight_recorder.ACK_OK: "ok",
+    flight_recorder.ACK_ERROR: "error",
+    flight_recorder.ACK_TIMEOUT: "timeout",
+    flight_recorder.ACK_LOST: "lost",
+    flight_recorder.ACK_DROPPED: "dropped",
+    flight_recorder.ACK_NO_LINK: "no_link",
+}
+
+
+def offline_controller(model_path: str, dummy: bool = False, threads: int = 1):
+    """RobotController без serial/MQTT: лише рушій інференсу"""
+    from main import RobotController
+
+    engine = DummyEngine() if dummy else InferenceEngine(model_path, num_threads=threads, warmup=0)
+    engine.load()
+    controller = RobotController.__new__(RobotController)
+    controller.models = ModelManager(engine, controller.make_engine)
+    return controller
+
+
+def replay(controller, records: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Дії моделі для кожного записаного спостереження та латентність"""
+    actions = np.empty((len(records), 6), dtype=np.float32)
+    latencies = np.empty(len(records), dtype=np.float64)
+    for i, obs in enumerate(records["obs"]):
+        t0 = time.perf_counter()
+        actions[i] = controller.predict(obs)
+        latencies[i] = time.perf_counter() - t0
+    return actions, latencies
+
+
+def summarize(records: np.ndarray, info: dict):
+    print(f"📼 {len(records)} записів (всього записано {info['written']}, кільце {info['capacity']})")
+    if not len(records):
+        return
+    span = records["t"][-1] - records["t"][0]
+    print(f"   Тривалість {span:.1f} s | тіки {records['tick'][0]}..{records['tick'][-1]} | "
+          f"ручних команд {int(np.sum(records['source'] == flight_recorder.SOURCE_COMMAND))}")
+
+    codes, counts = np.unique(records["ack"], return_counts=True)
+    print("   ACK: " + ", ".join(f"{ACK_NAMES.get(int(c), c)}={n}" for c, n in zip(codes, counts)))
+    rtt = records["ack_rtt"][np.isfinite(records["ack_rtt"])]
+    if len(rtt):
+        print(f"   ACK RTT p50 {np.percentile(rtt, 50) * 1000:.1f} ms | p99 {np.percentile(rtt, 99) * 1000:.1f} ms")
+
+    tick = records["tick_s"]
+    print(f"   Тік p50 {np.percentile(tick, 50) * 1000:.2f} ms | p99 {np.percentile(tick, 99) * 1000:.2f} ms | "
+          f"max {tick.max() * 1000:.2f} ms")
+    for i, name in enumerate(STAGES):
+        stage = records["stages"][:, i]
+        print(f"     {name:<8} p50 {np.percentile(stage, 50) * 1000:.3f} ms | p99 {np.percentile(stage, 99) * 1000:.3f} ms")
+
+    age = records["telemetry_age"][np.isfinite(records["telemetry_age"])]
+    if len(age):
+        print(f"   Вік телеметрії p50 {np.percentile(age, 50) * 1000:.1f} ms | max {age.max() * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", nargs="?", default="/app/data/flight_recorder.bin")
+    parser.add_argument("--model", default="model.tflite")
+    parser.add_argument("--dummy", action="store_true", help="DummyEngine замість TFLite")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--last", type=int, default=None, help="лише останні N записів")
+    parser.add_argument("--no-replay", action="store_true")
+    parser.add_argument("--export", default=None, help="зберегти датасет у .npz")
+    args = parser.parse_args()
+
+    records, info = flight_recorder.load(args.path)
+    if args.last:
+        records = records[-args.last:]
+    summarize(records, info)
+
+    arrays = {name: records[name] for name in records.dtype.names if name != "reserved"}
+    if not args.no_replay and len(records):
+        controller = offline_controller(args.model, args.dummy, args.threads)
+        actions, latencies = replay(controller, records)
+        diff = actions - records["action"]
+        l2 = np.sqrt(np.sum(diff * diff, axis=1))
+        policy = records["source"] == flight_recorder.SOURCE_POLICY
+        print(f"🔁 Replay ({controller.models.live.model_path}): "
+              f"p50 {np.percentile(latencies, 50) * 1e6:.0f} µs | p99 {np.percentile(latencies, 99) * 1e6:.0f} µs")
+        if policy.any():
+            print(f"   Розбіжність з записом (політика): L2 mean {l2[policy].mean():.5f} | "
+                  f"max {l2[policy].max():.5f} | abs max {np.abs(diff[policy]).max():.5f}")
+        arrays["replay_action"] = actions
+
+    if args.export:
+        np.savez_compressed(args.export, stage_names=np.array(STAGES), **arrays)
+        print(f"💾 Датасет збережено: {args.export}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Планувальник реального часу для control loop: абсолютні дедлайни на
+монотонному годиннику, політика перевищень та гістограми часу стадій
+"""
+
+import time
+import logging
+from typing import Iterable, Optional
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+OVERRUN_POLICIES = ("skip", "catchup")
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "robot_control_stage_seconds", "Тривалість стадій тіку control loop", ("stage",))
+TICK_SECONDS = REGISTRY.histogram(
+    "robot_control_tick_seconds", "Тривалість роботи тіку control loop")
+PERIOD_SECONDS = REGISTRY.histogram(
+    "robot_control_period_seconds", "Фактичний період між стартами тіків")
+JITTER_SECONDS = REGISTRY.histogram(
+    "robot_control_jitter_seconds", "Запізнення старту тіку відносно дедлайну")
+
+
+class RealtimeScheduler:
+    """
+    Тактування циклу за абсолютними дедлайнами `t0 + k * period`:
+    похибка сну не накопичується.
+
+    Політики перевищення (тік довший за період):
+    - skip: пропущені такти відкидаються, наступний тік - на найближчому
+      майбутньому дедлайні (фаза зберігається);
+    - catchup: пропущені такти виконуються підряд без сну, доки цикл не
+      дожене графік (не більше max_catchup тактів, далі - ресинхронізація).
+    """
+
+    def __init__(self, rate_hz: float = 20.0, overrun_policy: str = "skip",
+                 stages: Iterable[str] = ("observe", "infer", "send", "read"),
+                 max_catchup: int = 5):
+        if overrun_policy not in OVERRUN_POLICIES:
+            raise ValueError(f"overrun_policy має бути одним з {OVERRUN_POLICIES}")
+        self.rate_hz = rate_hz
+        self.period = 1.0 / rate_hz
+        self.overrun_policy = overrun_policy
+        self.max_catchup = max_catchup
+
+        self.stages = {name: STAGE_SECONDS.labels(name) for name in stages}
+        self._stage_index = {name: i for i, name in enumerate(self.stages)}
+        self.last_stages = [0.0] * len(self.stages)  # секунди стадій останнього тіку
+        self.last_tick = 0.0
+        self.tick_time = TICK_SECONDS.labels()
+        self.period_hist = PERIOD_SECONDS.labels()
+        self.jitter = JITTER_SECONDS.labels()
+
+        self.ticks = 0
+        self.overruns = 0          # тіки, що не вклались у період
+        self.missed_deadlines = 0  # такти, пропущені через перевищення
+        self.resyncs = 0
+
+        # Лічильники читаються при скрейпі - на тік вони нічого не коштують
+        REGISTRY.counter("robot_control_ticks_total", "Виконані тіки control loop") \
+            .set_function(lambda: self.ticks)
+        REGISTRY.counter("robot_control_overruns_total", "Тіки, довші за період") \
+            .set_function(lambda: self.overruns)
+        REGISTRY.counter("robot_control_missed_deadlines_total", "Такти, пропущені через перевищення") \
+            .set_function(lambda: self.missed_deadlines)
+        REGISTRY.gauge("robot_control_rate_hz", "Цільова частота control loop").set(rate_hz)
+
+        self._deadline: Optional[float] = None
+        self._tick_start = 0.0
+        self._stage_start = 0.0
+
+    # ---- Тактування ----
+
+    def start_tick(self) -> float:
+        """Дочекатися дедлайну наступного тіку; повертає час старту"""
+        now = time.monotonic()
+        if self._deadline is None:
+            self._deadline = now
+        elif now < self._deadline:
+            time.sleep(self._deadline - now)
+            now = time.monotonic()
+
+        if self.ticks:
+            self.period_hist.observe(now - self._tick_start)
+        self.jitter.observe(max(0.0, now - self._deadline))
+
+        self._tick_start = now
+        self._stage_start = now
+        self.ticks += 1
+        return now
+
+    def end_tick(self) -> float:
+        """Завершити тік і спланувати наступний дедлайн; повертає тривалість"""
+        now = time.monotonic()
+        elapsed = now - self._tick_start
+        self.tick_time.observe(elapsed)
+        self.last_tick = elapsed
+
+        next_deadline = self._deadline + self.period
+        if now > next_deadline:
+            self.overruns += 1
+            behind = int((now - next_deadline) // self.period) + 1
+            if self.overrun_policy == "skip":
+                self.missed_deadlines += behind
+                next_deadline += behind * self.period
+            elif behind > self.max_catchup:
+                # Занадто далеко позаду - наздоганяти немає сенсу
+                self.missed_deadlines += behind
+                self.resyncs += 1
+                next_deadline = now
+        self._deadline = next_deadline
+        return elapsed
+
+    def mark(self, stage: str):
+        """Закрити стадію: час від попередньої мітки (або старту тіку)"""
+        now = time.monotonic()
+        elapsed = now - self._stage_start
+        self.stages[stage].observe(elapsed)
+        self.last_stages[self._stage_index[stage]] = elapsed
+        self._stage_start = now
+
+    # ---- Звітність ----
+
+    @property
+    def achieved_hz(self) -> float:
+        mean = self.period_hist.sum / self.period_hist.count if self.period_hist.count else 0.0
+        return 1.0 / mean if mean else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "rate_hz": self.rate_hz,
+            "achieved_hz": round(self.achieved_hz, 2),
+            "overrun_policy": self.overrun_policy,
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "missed_deadlines": self.missed_deadlines,
+            "resyncs": self.resyncs,
+            "tick_time": self.tick_time.as_dict(),
+            "period": self.period_hist.as_dict(),
+            "jitter": self.jitter.as_dict(),
+            "stages": {name: h.as_dict() for name, h in self.stages.items()},
+        }
+
+    def summary(self) -> str:
+        """Короткий рядок для логу"""
+        return (f"{self.achieved_hz:.1f}/{self.rate_hz:.0f} Hz | "
+                f"tick p99 {self.tick_time.percentile(99) * 1000:.1f} ms | "
+                f"jitter p99 {self.jitter.percentile(99) * 1000:.1f} ms | "
+                f"missed {self.missed_deadlines}")
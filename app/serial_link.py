@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Конвеєрний serial-канал до Arduino Mega з нумерацією команд (seq)
+"""
+
+import json
+import time
+import logging
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from threading import Thread, Lock
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SERIAL_RTT = REGISTRY.histogram(
+    "robot_serial_rtt_seconds", "Round-trip команди до Arduino до відповіді", ("kind",))
+SERIAL_COMMANDS = REGISTRY.counter(
+    "robot_serial_commands_total", "Команди до Arduino за результатом", ("kind", "status"))
+
+
+class Ack(NamedTuple):
+    """Результат однієї команди"""
+    ok: bool
+    reply: str
+    rtt: float
+
+
+class _Pending:
+    __slots__ = ("seq", "kind", "sent_at", "size", "future")
+
+    def __init__(self, seq: int, kind: str, sent_at: float, size: int):
+        self.seq = seq
+        self.kind = kind
+        self.sent_at = sent_at
+        self.size = size  # байт рядка разом з \r\n
+        self.future: Future = Future()
+
+
+class RttStats:
+    """Статистика round-trip для одного типу команд"""
+
+    def __init__(self, kind: str, history: int = 256):
+        self._rtt_metric = SERIAL_RTT.labels(kind)
+        self._status_metric = {
+            status: SERIAL_COMMANDS.labels(kind, status)
+            for status in ("ok", "error", "timeout", "lost", "dropped")
+        }
+        self.sent = 0
+        self.ok = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.lost = 0
+        self.dropped = 0
+        self.last = 0.0
+        self.max = 0.0
+        self.total = 0.0
+        self._history = deque(maxlen=history)
+
+    def record(self, ack: Ack, status: str):
+        self._status_metric[status].inc()
+        if status == "ok":
+            self.ok += 1
+        elif status == "timeout":
+            self.timeouts += 1
+        elif status == "lost":
+            self.lost += 1
+        else:
+            self.errors += 1
+        if status in ("ok", "error"):
+            self.last = ack.rtt
+            self.total += ack.rtt
+            if ack.rtt > self.max:
+                self.max = ack.rtt
+            self._history.append(ack.rtt)
+            self._rtt_metric.observe(ack.rtt)
+
+    def drop(self):
+        self.dropped += 1
+        self._status_metric["dropped"].inc()
+
+    def as_dict(self) -> dict:
+        answered = self.ok + self.errors
+        rtts = np.fromiter(self._history, dtype=np.float64) if self._history else None
+        return {
+            "sent": self.sent,
+            "ok": self.ok,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "lost": self.lost,
+            "dropped": self.dropped,
+            "rtt_last_ms": self.last * 1000,
+            "rtt_mean_ms": (self.total / answered * 1000) if answered else 0.0,
+            "rtt_max_ms": self.max * 1000,
+            "rtt_p50_ms": float(np.percentile(rtts, 50) * 1000) if rtts is not None else 0.0,
+            "rtt_p99_ms": float(np.percentile(rtts, 99) * 1000) if rtts is not None else 0.0,
+        }
+
+
+class SerialLink:
+    """
+    Serial I/O підсистема:
+    - фоновий потік читання розбирає відповіді прошивки та завершує Future;
+    - відповідь `OK seq=<n>` зіставляється за номером, відповіді без seq
+      (`ERR ...`, `ARMED`, `OK prime`, ...) - з найстарішою командою в польоті,
+      бо прошивка обробляє рядки строго по черзі;
+    - обмежене вікно команд у польоті: якщо вікно повне, `send` не блокує,
+      а повертає None (команда відкидається і рахується як dropped).
+
+    Вікно обмежене і кількістю рядків (window), і байтами (rx_budget): RX-буфер
+    Mega лише 64 байти, а поки виконується `moveWithRateLimit`, прошивка не читає
+    порт. Рядок `cmd` з seq - ~54 байти, тож другий такий рядок у польоті вже
+    переповнив би буфер: новий рядок іде лише якщо всі рядки в польоті разом
+    з ним вміщаються в rx_budget (у порожній канал - завжди).
+
+    Команда без відповіді за ack_timeout завершується для викликача як timeout,
+    але лишається в польоті (stale) - прошивка ще може її виконувати - доки не
+    прийде `OK seq=` цієї чи новішої команди, відповідь без seq, `READY` або не
+    мине stale_timeout (найдовший блокуючий рух; захист від втраченої відповіді).
+    """
+
+    def __init__(self, port, window: int = 2, ack_timeout: float = 0.75,
+                 rx_budget: int = 64, stale_timeout: float = 60.0):
+        self.port = port
+        self.window = max(1, window)
+        self.ack_timeout = ack_timeout
+        self.rx_budget = rx_budget
+        self.stale_timeout = stale_timeout
+
+        self._seq = 0
+        self._pending: "OrderedDict[int, _Pending]" = OrderedDict()
+        self._stale: "OrderedDict[int, _Pending]" = OrderedDict()  # timeout, але ще в прошивці
+        self._lock = Lock()
+        self._write_lock = Lock()
+        self._stats: dict[str, RttStats] = {}
+        self._listeners: list[Callable[[str, float], None]] = []
+
+        self.late_replies = 0
+        self.unsolicited = 0
+        self.running = False
+        self._thread: Optional[Thread] = None
+
+        REGISTRY.gauge("robot_serial_in_flight", "Команди в польоті").set_function(lambda: self.in_flight)
+        REGISTRY.counter("robot_serial_late_replies_total", "Відповіді без очікуваної команди") \
+            .set_function(lambda: self.late_replies)
+
+    # ---- Публічний API ----
+
+    def start(self):
+        self.running = True
+        self._thread = Thread(target=self._reader_loop, name="serial-reader", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        self._fail_all("closed")
+        self._retire_stale()
+
+    def add_listener(self, callback: Callable[[str, float], None]):
+        """Підписка на рядки, які не є відповіддю на команду (READY, телеметрія...)"""
+        self._listeners.append(callback)
+
+    @property
+    def in_flight(self) -> int:
+        """Рядки, які прошивка ще не підтвердила (разом зі stale)"""
+        return len(self._pending) + len(self._stale)
+
+    def send(self, payload: dict, kind: str = "cmd") -> Optional[Future]:
+        """Надіслати JSON-команду з новим seq; None якщо вікно заповнене"""
+        with self._lock:
+            seq = self._seq + 1
+            line = json.dumps({"seq": seq, **payload}, separators=(",", ":"))
+            entry = self._admit(seq, kind, line)
+        return self._write(entry, line) if entry is not None else None
+
+    def send_raw(self, line: str, kind: str) -> Optional[Future]:
+        """Надіслати довільний рядок (без seq); відповідь зіставляється за чергою"""
+        with self._lock:
+            entry = self._admit(self._seq + 1, kind, line)
+        return self._write(entry, line) if entry is not None else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            per_kind = {kind: s.as_dict() for kind, s in self._stats.items()}
+        return {
+            "in_flight": self.in_flight,
+            "stale": len(self._stale),
+            "bytes_in_flight": self._bytes_in_flight(),
+            "window": self.window,
+            "rx_budget": self.rx_budget,
+            "late_replies": self.late_replies,
+            "unsolicited": self.unsolicited,
+            "commands": per_kind,
+        }
+
+    # ---- Внутрішнє ----
+
+    def _stats_for(self, kind: str) -> RttStats:
+        stats = self._stats.get(kind)
+        if stats is None:
+            stats = self._stats[kind] = RttStats(kind)
+        return stats
+
+    def _bytes_in_flight(self) -> int:
+        return sum(e.size for e in self._pending.values()) + sum(e.size for e in self._stale.values())
+
+    def _admit(self, seq: int, kind: str, line: str) -> Optional[_Pending]:
+        """Під self._lock: новий _Pending, якщо рядок вміщається у вікно і RX-буфер"""
+        stats = self._stats_for(kind)
+        size = len(line) + 2
+        if self.in_flight and (
+            self.in_flight >= self.window or self._bytes_in_flight() + size > self.rx_budget
+        ):
+            stats.drop()
+            return None
+        self._seq = seq
+        entry = _Pending(seq, kind, time.monotonic(), size)
+        self._pending[seq] = entry
+        stats.sent += 1
+        return entry
+
+    def _write(self, entry: _Pending, line: str) -> Future:
+        try:
+            with self._write_lock:
+                self.port.write((line + "\r\n").encode())
+        except Exception as e:
+            logger.error(f"❌ Serial write error: {e}")
+            self._complete(entry, f"ERR write {e}", "error")
+        return entry.future
+
+    def _complete(self, entry: _Pending, reply: str, status: str, stale: bool = False):
+        with self._lock:
+            if self._pending.pop(entry.seq, None) is None:
+                return
+            if stale:
+                self._stale[entry.seq] = entry
+            ack = Ack(status == "ok", reply, time.monotonic() - entry.sent_at)
+            self._stats_for(entry.kind).record(ack, status)
+        entry.future.set_result(ack)
+
+    def _fail_all(self, reason: str):
+        with self._lock:
+            entries = list(self._pending.values())
+        for entry in entries:
+            self._complete(entry, reason, "lost")
+
+    def _expire(self, now: float):
+        with self._lock:
+            expired = [e for e in self._pending.values() if now - e.sent_at > self.ack_timeout]
+            forgotten = [s for s, e in self._stale.items() if now - e.sent_at > self.stale_timeout]
+            for seq in forgotten:
+                del self._stale[seq]
+        for entry in expired:
+            # Викликач отримує timeout, але рядок ще займає прошивку і її RX-буфер
+            self._complete(entry, "timeout", "timeout", stale=True)
+        if forgotten:
+            logger.warning(f"⚠️ Serial: {len(forgotten)} команд без відповіді понад {self.stale_timeout:g} с")
+
+    def _retire_stale(self, up_to: Optional[int] = None) -> int:
+        """Прибрати stale з seq <= up_to (None - усі); повертає кількість"""
+        with self._lock:
+            retired = [s for s in self._stale if up_to is None or s <= up_to]
+            for seq in retired:
+                del self._stale[seq]
+        return len(retired)
+
+    def _oldest(self) -> Optional[_Pending]:
+        with self._lock:
+            return next(iter(self._pending.values()), None)
+
+    def _dispatch(self, line: str, now: float):
+        if line.startswith("OK seq="):
+            try:
+                seq = int(line[7:].split()[0])
+            except ValueError:
+                seq = -1
+            with self._lock:
+                entry = self._pending.get(seq)
+                older = [e for s, e in self._pending.items() if s < seq]
+            # Старші stale-команди прошивка вже пройшла; сама seq може бути stale
+            self._retire_stale(seq)
+            if entry is None:
+                self.late_replies += 1
+                return
+            # Прошивка відповідає строго по черзі: старші команди без відповіді втрачені
+            for lost in older:
+                self._complete(lost, "lost", "lost")
+            self._complete(entry, line, "ok")
+            return
+
+        if line.startswith("READY"):
+            # Плата перезавантажилась - все, що було в польоті, втрачено
+            self._fail_all("reset")
+            self._retire_stale()
+            self._notify(line, now)
+            return
+
+        if line.startswith(("OK", "ARMED", "DISARMED", "ERR")):
+            with self._lock:
+                stale = next(iter(self._stale), None)
+                if stale is not None:
+                    # Прошивка відповідає по черзі: це запізніла відповідь найстаршій stale
+                    del self._stale[stale]
+            if stale is not None:
+                self.late_replies += 1
+                return
+            entry = self._oldest()
+            if entry is None:
+                self.late_replies += 1
+                return
+            self._complete(entry, line, "error" if line.startswith("ERR") else "ok")
+            return
+
+        self._notify(line, now)
+
+    def _notify(self, line: str, now: float):
+        self.unsolicited += 1
+        for callback in self._listeners:
+            try:
+                callback(line, now)
+            except Exception as e:
+                logger.error(f"❌ Serial listener error: {e}")
+
+    def _reader_loop(self):
+        logger.info("🚀 Serial reader запущено")
+        while self.running:
+            try:
+                raw = self.port.readline()
+            except Exception as e:
+                logger.error(f"❌ Serial read error: {e}")
+                self._fail_all("read_error")
+                time.sleep(0.1)
+                continue
+
+            now = time.monotonic()
+            if raw:
+                line = raw.decode(errors="replace").strip()
+                if line:
+                    self._dispatch(line, now)
+            self._expire(now)
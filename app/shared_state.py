@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Обмін даними між control loop і HTTP API без локів на serial:
+подвійний буфер знімка стану та обмежена черга ручних команд
+"""
+
+import time
+import queue
+from concurrent.futures import Future
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+# Розкладка знімка стану (float64)
+SNAP_JOINTS = slice(0, 6)
+SNAP_TARGET = slice(6, 9)
+SNAP_ACTION = slice(9, 15)
+SNAP_ARMED = 15        # 1/0, NaN - невідомо
+SNAP_STATE_TIME = 16   # monotonic час телеметрії, NaN - немає
+SNAP_ACK_OK = 17       # 1/0, NaN - ще не було
+SNAP_TICK = 18
+SNAP_TICK_TIME = 19    # monotonic час тіку
+SNAP_SIZE = 20
+
+
+class StateSnapshotBuffer:
+    """
+    Подвійний буфер з лічильником версій (seqlock).
+
+    Єдиний письменник (control loop) пише в задній буфер і перемикає індекс;
+    читачі копіюють передній без локів. Непарна версія - буфер пишеться;
+    якщо версія змінилась під час копіювання, читач повторює спробу.
+    """
+
+    def __init__(self, size: int = SNAP_SIZE):
+        self._buffers = np.full((2, size), np.nan, dtype=np.float64)
+        self._versions = [0, 0]
+        self._front = 0
+        self.reply: Optional[str] = None  # останній текст ACK (заміна посилання атомарна)
+
+    def publish(self, values: np.ndarray, reply: Optional[str] = None):
+        back = 1 - self._front
+        self._versions[back] += 1
+        self._buffers[back, :] = values
+        self._versions[back] += 1
+        self._front = back
+        if reply is not None:
+            self.reply = reply
+
+    def read(self) -> np.ndarray:
+        while True:
+            idx = self._front
+            version = self._versions[idx]
+            if version & 1:
+                continue
+            snapshot = self._buffers[idx].copy()
+            if self._versions[idx] == version:
+                return snapshot
+
+
+class Command(NamedTuple):
+    """Ручний запит /predict, що виконує control loop"""
+    observation: np.ndarray
+    future: Future
+    enqueued_at: float
+
+
+class CommandQueue:
+    """Обмежена черга команд: HTTP кладе без очікування, control loop забирає"""
+
+    def __init__(self, maxsize: int = 8):
+        self._queue: "queue.Queue[Command]" = queue.Queue(maxsize=maxsize)
+        self.maxsize = maxsize
+        self.accepted = 0
+        self.rejected = 0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, observation: np.ndarray) -> Optional[Command]:
+        """None якщо черга повна"""
+        command = Command(observation, Future(), time.monotonic())
+        try:
+            self._queue.put_nowait(command)
+        except queue.Full:
+            self.rejected += 1
+            return None
+        self.accepted += 1
+        return command
+
+    def poll(self) -> Optional[Command]:
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "maxsize": self.maxsize,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Push-потік стану руки для клієнтів (/stream): WebSocket або SSE.
+
+Один кадр на тік control loop серіалізується один раз і роздається всім
+підписникам. Кожен підписник має власний слот «останній кадр»: повільний
+клієнт отримує найсвіжіший кадр, проміжні відкидаються - черги не ростуть,
+а control loop і serial про підписників нічого не знають.
+"""
+
+import json
+import time
+import asyncio
+import logging
+from typing import Callable, Optional
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+TRANSPORTS = ("websocket", "sse")
+
+STREAM_FRAMES = REGISTRY.counter(
+    "robot_stream_frames_total", "Кадри стану, надіслані підписникам", ("transport",))
+STREAM_DROPPED = REGISTRY.counter(
+    "robot_stream_dropped_frames_total", "Кадри, пропущені через частоту або повільного клієнта", ("transport",))
+
+
+class Subscriber:
+    """Один клієнт: бажана частота і слот останнього кадру"""
+
+    def __init__(self, transport: str, rate_hz: float, seq: int = 0):
+        self.transport = transport
+        self.rate_hz = rate_hz
+        self.connected_at = time.monotonic()
+        self._event = asyncio.Event()
+        self._seq = seq  # останній отриманий кадр; seq хаба - кешований кадр уже не годиться
+        self._next_send = 0.0
+        self.sent = 0
+        self.dropped = 0
+        self._frames = STREAM_FRAMES.labels(transport)
+        self._dropped = STREAM_DROPPED.labels(transport)
+
+    def notify(self):
+        self._event.set()
+
+    async def next_frame(self, hub: "StreamHub") -> tuple[str, bytes]:
+        """
+        Дочекатися свіжого кадру не раніше, ніж дозволяє частота клієнта.
+        Повертає (JSON для WebSocket, подію SSE)
+        """
+        delay = self._next_send - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        while hub.seq == self._seq:
+            self._event.clear()
+            await self._event.wait()
+        seq = hub.seq
+        if self._seq:
+            skipped = seq - self._seq - 1
+            self.dropped += skipped
+            self._dropped.inc(skipped)
+        self._seq = seq
+        self._next_send = time.monotonic() + 1.0 / self.rate_hz
+        return hub.frame, hub.sse
+
+    def mark_sent(self):
+        self.sent += 1
+        self._frames.inc()
+
+
+class StreamHub:
+    """
+    Опитує знімок стану з частотою max_hz (лише поки є підписники) і
+    публікує новий кадр, коли змінився тік control loop.
+
+    snapshot() -> (tick, dict) або None; викликається в event loop і має
+    бути дешевим (читання seqlock-буфера, без serial).
+    """
+
+    def __init__(self, snapshot: Callable[[], Optional[tuple[int, dict]]],
+                 max_hz: float = 50.0, max_clients: int = 16):
+        self.snapshot = snapshot
+        self.max_hz = max_hz
+        self.max_clients = max_clients
+        self.subscribers: set[Subscriber] = set()
+        self.seq = 0
+        self.frame = ""    # JSON кадру
+        self.sse = b""     # той самий кадр як подія SSE
+        self._tick = None
+        self.frames = 0
+        self.rejected = 0
+        self._sent_closed = 0     # підсумки відключених клієнтів
+        self._dropped_closed = 0
+        self._task: Optional[asyncio.Task] = None
+
+        gauge = REGISTRY.gauge("robot_stream_clients", "Підписники /stream", ("transport",))
+        for transport in TRANSPORTS:
+            gauge.labels(transport).set_function(
+                lambda t=transport: sum(1 for s in self.subscribers if s.transport == t))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def clamp_rate(self, rate_hz: Optional[float], default: float) -> float:
+        rate = default if rate_hz is None else rate_hz
+        return min(max(rate, 0.1), self.max_hz)
+
+    def subscribe(self, transport: str, rate_hz: float) -> Optional[Subscriber]:
+        """None якщо досягнуто max_clients"""
+        if len(self.subscribers) >= self.max_clients:
+            self.rejected += 1
+            return None
+        # Без підписників опитування стояло, і кешований кадр може бути як завгодно
+        # старим: свіжий знімок, а якщо його немає - клієнт чекає наступного кадру
+        fresh = self._poll() if not self.subscribers else True
+        subscriber = Subscriber(transport, rate_hz, seq=0 if fresh else self.seq)
+        self.subscribers.add(subscriber)
+        logger.info(f"📡 /stream +{transport} @ {rate_hz:g} Hz (клієнтів: {len(self.subscribers)})")
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        if subscriber in self.subscribers:
+            self.subscribers.discard(subscriber)
+            self._sent_closed += subscriber.sent
+            self._dropped_closed += subscriber.dropped
+            logger.info(f"📡 /stream -{subscriber.transport}: надіслано {subscriber.sent}, "
+                        f"пропущено {subscriber.dropped} (клієнтів: {len(self.subscribers)})")
+
+    def publish(self, tick: int, state: dict):
+        self._tick = tick
+        self.frame = json.dumps(state, separators=(",", ":"))
+        self.seq += 1
+        self.sse = f"id: {self.seq}\nevent: state\ndata: {self.frame}\n\n".encode()
+        self.frames += 1
+        for subscriber in self.subscribers:
+            subscriber.notify()
+
+    def stats(self) -> dict:
+        return {
+            "clients": {t: sum(1 for s in self.subscribers if s.transport == t) for t in TRANSPORTS},
+            "max_clients": self.max_clients,
+            "max_hz": self.max_hz,
+            "frames": self.frames,
+            "rejected": self.rejected,
+            "sent": self._sent_closed + sum(s.sent for s in self.subscribers),
+            "dropped": self._dropped_closed + sum(s.dropped for s in self.subscribers),
+        }
+
+    def _poll(self) -> bool:
+        """Опублікувати знімок, якщо тік змінився; True - кешований кадр відповідає поточному тіку"""
+        try:
+            current = self.snapshot()
+        except Exception as e:
+            logger.error(f"❌ Stream snapshot error: {e}")
+            return False
+        if current is None:
+            return False
+        if current[0] != self._tick:
+            self.publish(*current)
+        return True
+
+    async def _run(self):
+        period = 1.0 / self.max_hz
+        while True:
+            await asyncio.sleep(period)
+            if self.subscribers:
+                self._poll()
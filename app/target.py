@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Оцінка положення цілі між кадрами YOLO: вибір цілі серед об'єктів кадру
+(політика + утримання треку), атомарні детекції з часовою міткою, Калман
+з постійною швидкістю та поріг «старіння» детекції
+"""
+
+import logging
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+class Detection(NamedTuple):
+    """Незмінна детекція: MQTT-потік лише замінює посилання"""
+    seq: int
+    x: float
+    y: float
+    confidence: float
+    t: float  # time.monotonic() при прийомі
+    track_id: int = 0  # 0 - детектор без трекера
+    vx: float = 0.0    # швидкість з трекера детектора, частки кадру/с
+    vy: float = 0.0
+
+
+POLICIES = ("locked", "confidence", "nearest")
+
+
+class TargetSelector:
+    """
+    Яку детекцію кадру вважати ціллю (MQTT-потік).
+
+    - confidence: найвпевненіша;
+    - nearest: найближча до попередньої цілі (спочатку - до центру кадру);
+    - locked: тримати обраний track_id, поки він є в кадрі; якщо зник -
+      чекати lock_timeout (кадр без нього не оновлює ціль), далі обрати
+      найвпевненішу. Без id треків (схема v1, JSON) - як nearest.
+
+    select() → індекс об'єкта, або None - ціль у цьому кадрі не оновлювати.
+    """
+
+    def __init__(self, policy: str = "locked", lock_timeout: float = 0.5):
+        if policy not in POLICIES:
+            raise ValueError(f"policy має бути одним з {POLICIES}")
+        self.policy = policy
+        self.lock_timeout = lock_timeout
+        self.track_id = 0
+        self._position = (0.5, 0.5)
+        self._seen = 0.0
+        self.switches = 0
+
+        REGISTRY.counter("robot_target_switches_total", "Зміни обраної цілі (track_id)") \
+            .set_function(lambda: self.switches)
+        REGISTRY.gauge("robot_target_track_id", "track_id обраної цілі (0 - немає)") \
+            .set_function(lambda: self.track_id)
+
+    def _nearest(self, objects: np.ndarray) -> int:
+        px, py = self._position
+        return int(np.argmin((objects["x"] - px) ** 2 + (objects["y"] - py) ** 2))
+
+    def select(self, objects: np.ndarray, now: float) -> Optional[int]:
+        if not len(objects):
+            return None
+        tracked = "track_id" in objects.dtype.names and bool(objects["track_id"].any())
+
+        if self.policy == "confidence":
+            index = int(np.argmax(objects["confidence"]))
+        elif self.policy == "nearest" or not tracked:
+            index = self._nearest(objects)
+        else:
+            locked = np.flatnonzero(objects["track_id"] == self.track_id) if self.track_id else ()
+            if len(locked):
+                index = int(locked[0])
+            elif self.track_id and now - self._seen < self.lock_timeout:
+                return None
+            else:
+                index = int(np.argmax(objects["confidence"]))
+
+        if tracked:
+            track_id = int(objects["track_id"][index])
+            if track_id != self.track_id:
+                if self.track_id:
+                    self.switches += 1
+                    logger.info(f"🎯 Ціль: трек {self.track_id} → {track_id}")
+                self.track_id = track_id
+        self._position = (float(objects["x"][index]), float(objects["y"][index]))
+        self._seen = now
+        return index
+
+    def stats(self) -> dict:
+        return {
+            "policy": self.policy,
+            "track_id": self.track_id,
+            "switches": self.switches,
+        }
+
+
+class TargetEstimator:
+    """
+    Письменник (MQTT-потік) викликає update(), читач (control loop) -
+    estimate(). Фільтр живе лише в control loop, тому локи не потрібні:
+    нова детекція потрапляє у фільтр на найближчому тіку.
+
+    Модель по кожній осі незалежна: стан [позиція, швидкість], шум
+    прискорення process_noise, шум вимірювання measurement_noise
+    (в нормованих координатах кадру 0..1).
+    """
+
+    def __init__(self, max_age: float = 0.5, process_noise: float = 4.0,
+                 measurement_noise: float = 1e-4, min_confidence: float = 0.0,
+                 predict: bool = True):
+        self.max_age = max_age
+        self.q = process_noise
+        self.r = measurement_noise
+        self.min_confidence = min_confidence
+        self.predict_enabled = predict
+
+        self._latest: Optional[Detection] = None
+        self._seq = 0
+
+        # Стан фільтра (лише control loop)
+        self._applied_seq = 0
+        self._t = 0.0
+        self._pos = np.zeros(2)
+        self._vel = np.zeros(2)
+        self._p00 = np.ones(2)
+        self._p01 = np.zeros(2)
+        self._p11 = np.ones(2)
+        self._confidence = 0.0
+        self._track_id = 0
+        self._initialized = False
+
+        self.lost = True
+        self.lost_events = 0
+        self.detections_applied = 0
+
+        REGISTRY.gauge("robot_target_lost", "1 - ціль втрачена або детекція застаріла") \
+            .set_function(lambda: float(self.lost))
+        REGISTRY.counter("robot_target_lost_events_total", "Переходи цілі у стан lost") \
+            .set_function(lambda: self.lost_events)
+        REGISTRY.counter("robot_target_detections_total", "Детекції, застосовані у фільтрі") \
+            .set_function(lambda: self.detections_applied)
+
+    # ---- MQTT-потік ----
+
+    def update(self, x: float, y: float, confidence: float, t: float,
+               track_id: int = 0, vx: float = 0.0, vy: float = 0.0):
+        """Нова детекція (confidence=0 - об'єкта в кадрі немає)"""
+        self._seq += 1
+        self._latest = Detection(self._seq, float(x), float(y), float(confidence), t,
+                                 int(track_id), float(vx), float(vy))
+
+    @property
+    def latest(self) -> Optional[Detection]:
+        return self._latest
+
+    # ---- Control loop ----
+
+    def _reset(self, det: Detection):
+        self._pos[:] = (det.x, det.y)
+        self._vel[:] = (det.vx, det.vy)  # швидкість треку детектора, якщо є
+        self._track_id = det.track_id
+        self._p00[:] = self.r
+        self._p01[:] = 0.0
+        self._p11[:] = 1.0
+        self._t = det.t
+        self._initialized = True
+
+    def _apply(self, det: Detection):
+        """Predict до часу детекції + update вимірюванням"""
+        if not self._initialized or det.track_id != self._track_id:
+            # Інший об'єкт - його швидкість не пов'язана з попереднім
+            self._reset(det)
+            return
+        dt = det.t - self._t
+        if dt > 0:
+            q = self.q
+            self._pos += self._vel * dt
+            self._p00 += dt * (2 * self._p01 + dt * self._p11) + q * dt ** 4 / 4
+            self._p01 += dt * self._p11 + q * dt ** 3 / 2
+            self._p11 += q * dt ** 2
+            self._t = det.t
+
+        s = self._p00 + self.r
+        k0 = self._p00 / s
+        k1 = self._p01 / s
+        innovation = np.array((det.x, det.y)) - self._pos
+        self._pos += k0 * innovation
+        self._vel += k1 * innovation
+        self._p11 -= k1 * self._p01
+        self._p00 *= 1 - k0
+        self._p01 *= 1 - k0
+
+    def estimate(self, now: float, out: np.ndarray) -> bool:
+        """
+        Записати [x, y, confidence] цілі на момент now у out.
+        Повертає False, якщо ціль втрачена (out = нулі).
+        """
+        det = self._latest
+        if det is not None and det.seq != self._applied_seq:
+            self._applied_seq = det.seq
+            if det.confidence > self.min_confidence:
+                self._apply(det)
+                self._confidence = det.confidence
+                self.detections_applied += 1
+            else:
+                self._initialized = False
+
+        lost = (det is None or not self._initialized
+                or now - det.t > self.max_age)
+        if lost:
+            if not self.lost:
+                self.lost_events += 1
+                logger.info("👻 Ціль втрачена (немає свіжих детекцій)")
+            self.lost = True
+            # Наступна детекція ініціалізує фільтр заново (швидкість невідома)
+            self._initialized = False
+            out[:] = 0.0
+            return False
+
+        self.lost = False
+        if self.predict_enabled:
+            dt = max(0.0, now - self._t)
+            out[0] = min(1.0, max(0.0, self._pos[0] + self._vel[0] * dt))
+            out[1] = min(1.0, max(0.0, self._pos[1] + self._vel[1] * dt))
+        else:
+            out[0] = det.x
+            out[1] = det.y
+        out[2] = self._confidence
+        return True
+
+    def stats(self, now: float) -> dict:
+        det = self._latest
+        return {
+            "lost": self.lost,
+            "lost_events": self.lost_events,
+            "detections": self.detections_applied,
+            "age_ms": (now - det.t) * 1000 if det else None,
+            "velocity": self._vel.tolist(),
+            "max_age_ms": self.max_age * 1000,
+        }
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Кеш потокової телеметрії суглобів від Arduino
+"""
+
+import time
+import logging
+from threading import Lock
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Колонки кільцевого буфера історії
+HISTORY_COLUMNS = ("host_time", "device_ms", "armed",
+                   "j0", "j1", "j2", "j3", "j4", "j5")
+
+
+class JointSnapshot(NamedTuple):
+    """Незмінний знімок стану руки"""
+    host_time: float          # time.monotonic() на хості в момент прийому
+    device_ms: int            # millis() прошивки
+    armed: bool
+    joint_angles: np.ndarray  # радіани, read-only
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.host_time
+
+
+def permille_to_angle(permille: np.ndarray) -> np.ndarray:
+    """Позиція прошивки 0..1000 → радіани [-π, π] (зворотне до send_action)"""
+    return (permille.astype(np.float32) / 1000.0) * (2 * np.pi) - np.pi
+
+
+class TelemetryCache:
+    """
+    Розбирає рядки `S <millis> <armed> <p0> ... <p5>` і тримає:
+    - останній знімок (заміна посилання атомарна, читачам не потрібен лок);
+    - кільцевий буфер історії фіксованого розміру.
+    """
+
+    def __init__(self, history: int = 512, n_joints: int = 6):
+        self.n_joints = n_joints
+        self._latest: Optional[JointSnapshot] = None
+        self._history = np.zeros((history, len(HISTORY_COLUMNS)), dtype=np.float64)
+        self._write_idx = 0
+        self._count = 0
+        self._lock = Lock()  # тільки для історії
+
+        self.parse_errors = 0
+        self._rate_t0 = time.monotonic()
+        self._rate_n = 0
+        self.rate_hz = 0.0
+
+        REGISTRY.counter("robot_telemetry_samples_total", "Прийняті рядки телеметрії") \
+            .set_function(lambda: self._count)
+        REGISTRY.counter("robot_telemetry_parse_errors_total", "Нерозібрані рядки телеметрії") \
+            .set_function(lambda: self.parse_errors)
+        REGISTRY.gauge("robot_telemetry_age_seconds", "Вік останнього знімка стану") \
+            .set_function(lambda: self._latest.age if self._latest else float("nan"))
+
+    def on_line(self, line: str, now: float):
+        """Listener для SerialLink"""
+        if not line.startswith("S "):
+            return
+        parts = line.split()
+        if len(parts) != 3 + self.n_joints:
+            self.parse_errors += 1
+            return
+        try:
+            device_ms = int(parts[1])
+            armed = parts[2] == "1"
+            permille = np.array(parts[3:], dtype=np.int32)
+        except ValueError:
+            self.parse_errors += 1
+            return
+
+        angles = permille_to_angle(permille)
+        angles.flags.writeable = False
+        self._latest = JointSnapshot(now, device_ms, armed, angles)
+
+        with self._lock:
+            row = self._history[self._write_idx]
+            row[0] = now
+            row[1] = device_ms
+            row[2] = armed
+            row[3:] = angles
+            self._write_idx = (self._write_idx + 1) % len(self._history)
+            self._count += 1
+
+        self._rate_n += 1
+        elapsed = now - self._rate_t0
+        if elapsed >= 1.0:
+            self.rate_hz = self._rate_n / elapsed
+            self._rate_t0 = now
+            self._rate_n = 0
+
+    def latest(self) -> Optional[JointSnapshot]:
+        return self._latest
+
+    def history(self, n: Optional[int] = None) -> np.ndarray:
+        """Копія останніх n записів у хронологічному порядку"""
+        with self._lock:
+            size = min(self._count, len(self._history))
+            n = size if n is None else min(n, size)
+            idx = (self._write_idx - n + np.arange(n)) % len(self._history)
+            return self._history[idx].copy()
+
+    def stats(self) -> dict:
+        latest = self._latest
+        return {
+            "samples": self._count,
+            "rate_hz": round(self.rate_hz, 1),
+            "parse_errors": self.parse_errors,
+            "age_ms": latest.age * 1000 if latest else None,
+            "armed": latest.armed if latest else None,
+        }
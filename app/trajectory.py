@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Траєкторії на хості: дія політики → рух з обмеженням швидкості й
+прискорення, який потоком дрібних уставок `sp` (з seq) іде на Arduino.
+
+Прошивка виконує `cmd` через moveWithRateLimit (1 мкс за 25 мс) і весь рух
+не читає порт: великий крок блокує канал на секунди. Уставка `sp` лише
+записує імпульс і одразу відповідає `OK seq=<n>`, тож канал лишається
+вільним, а нова ціль перериває поточний рух (перепланування з поточного
+стану траєкторії).
+"""
+
+import math
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+from threading import Thread, Lock, Event
+from typing import Optional
+
+import numpy as np
+
+from metrics import REGISTRY
+from serial_link import Ack
+
+logger = logging.getLogger(__name__)
+
+PROFILES = ("trapezoid", "minjerk")
+
+# Максимальна кількість сегментів трапеції на вісь: гальмування через ціль + 3
+_SEGMENTS = 4
+# Пікові швидкість і прискорення мінімального ривка: 1.875·d/T і 5.7735·d/T²
+_MINJERK_PEAK_V = 1.875
+_MINJERK_PEAK_A = 5.7735
+
+TRACKING_ERROR = REGISTRY.histogram(
+    "robot_trajectory_tracking_error_radians",
+    "Максимальна по суглобах похибка: підтверджена уставка мінус телеметрія",
+    buckets=(0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+)
+SETPOINTS = REGISTRY.counter(
+    "robot_trajectory_setpoints_total", "Уставки sp за результатом", ("status",))
+REPLANS = REGISTRY.counter(
+    "robot_trajectory_replans_total", "Перепланування траєкторії новою ціллю")
+
+
+def _trapezoid(d: float, v: float, v_max: float, a_max: float) -> list[tuple[float, float]]:
+    """
+    Оптимальний за часом рух однієї осі зі швидкості v на відстань d до
+    зупинки: список сегментів (тривалість, прискорення)
+    """
+    s = 1.0 if d >= 0 else -1.0
+    dist, u = d * s, v * s  # у системі «до цілі»
+    if u > 0 and u * u / (2 * a_max) > dist:
+        # Не встигаємо загальмувати: зупинка за ціллю і рух назад
+        t = u / a_max
+        return [(t, -s * a_max)] + _trapezoid(d - v * t / 2, 0.0, v_max, a_max)
+
+    peak = min(v_max, math.sqrt(a_max * dist + u * u / 2))
+    if peak <= 0:
+        return []
+    accel = (peak * peak - u * u) / (2 * a_max) if peak >= u else (u * u - peak * peak) / (2 * a_max)
+    brake = peak * peak / (2 * a_max)
+    cruise = max(0.0, dist - accel - brake) / peak
+    return [
+        (abs(peak - u) / a_max, s * a_max if peak >= u else -s * a_max),
+        (cruise, 0.0),
+        (peak / a_max, -s * a_max),
+    ]
+
+
+class TrajectoryGenerator:
+    """
+    Багатовісна траєкторія, параметризована часом (monotonic):
+    - trapezoid: кожна вісь - оптимальна за часом трапеція швидкості з
+      поточної швидкості (осі завершують рух незалежно);
+    - minjerk: поліном 5-го степеня з поточних (p, v, a) у (ціль, 0, 0),
+      спільна тривалість для всіх осей.
+
+    set_target() перепланує з поточного стану - рух можна перервати будь-коли.
+    """
+
+    def __init__(self, n: int = 6, v_max: float = 1.0, a_max: float = 4.0,
+                 profile: str = "trapezoid"):
+        if profile not in PROFILES:
+            raise ValueError(f"profile має бути одним з {PROFILES}")
+        self.n = n
+        self.v_max = v_max  # рад/с
+        self.a_max = a_max  # рад/с²
+        self.profile = profile
+
+        self.goal = np.zeros(n)
+        self.t0 = 0.0
+        self.duration = 0.0
+        self.initialized = False
+
+        # Трапеція: початок, прискорення, стан на старті кожного сегмента
+        self._starts = np.zeros((n, _SEGMENTS))
+        self._acc = np.zeros((n, _SEGMENTS))
+        self._p = np.zeros((n, _SEGMENTS))
+        self._v = np.zeros((n, _SEGMENTS))
+        self._ends = np.zeros(n)
+        # Мінімальний ривок: коефіцієнти c0..c5
+        self._coef = np.zeros((6, n))
+
+        self.pos = np.zeros(n)
+        self.vel = np.zeros(n)
+        self.acc = np.zeros(n)
+
+    def reset(self, position: np.ndarray, now: float):
+        """Стан спокою в заданій позиції (напр. з телеметрії)"""
+        self.goal[:] = position
+        self.pos[:] = position
+        self.vel[:] = 0.0
+        self.acc[:] = 0.0
+        self.t0 = now
+        self.duration = 0.0
+        self._plan()
+        self.initialized = True
+
+    def set_target(self, target: np.ndarray, now: float):
+        if not self.initialized:
+            self.reset(target, now)
+            return
+        self.sample(now)  # pos/vel/acc на момент перепланування
+        self.goal[:] = target
+        self.t0 = now
+        self._plan()
+
+    def done(self, now: float) -> bool:
+        return now - self.t0 >= self.duration
+
+    def sample(self, now: float) -> np.ndarray:
+        """Позиція на момент now (також оновлює vel/acc); повертає внутрішній буфер"""
+        tau = now - self.t0
+        if tau >= self.duration:
+            self.pos[:] = self.goal
+            self.vel[:] = 0.0
+            self.acc[:] = 0.0
+            return self.pos
+        tau = max(tau, 0.0)
+
+        if self.profile == "minjerk":
+            c = self._coef
+            self.pos[:] = c[0] + tau * (c[1] + tau * (c[2] + tau * (c[3] + tau * (c[4] + tau * c[5]))))
+            self.vel[:] = c[1] + tau * (2 * c[2] + tau * (3 * c[3] + tau * (4 * c[4] + tau * 5 * c[5])))
+            self.acc[:] = 2 * c[2] + tau * (6 * c[3] + tau * (12 * c[4] + tau * 20 * c[5]))
+            return self.pos
+
+        rows = np.arange(self.n)
+        idx = (self._starts <= tau).sum(axis=1) - 1
+        dt = tau - self._starts[rows, idx]
+        acc = self._acc[rows, idx]
+        v0 = self._v[rows, idx]
+        self.pos[:] = self._p[rows, idx] + v0 * dt + 0.5 * acc * dt * dt
+        self.vel[:] = v0 + acc * dt
+        self.acc[:] = acc
+        finished = tau >= self._ends
+        self.pos[finished] = self.goal[finished]
+        self.vel[finished] = 0.0
+        self.acc[finished] = 0.0
+        return self.pos
+
+    def _plan(self):
+        distance = self.goal - self.pos
+        if self.profile == "minjerk":
+            self._plan_minjerk(distance)
+        else:
+            self._plan_trapezoid(distance)
+
+    def _plan_trapezoid(self, distance: np.ndarray):
+        self._starts[:] = np.inf
+        self._acc[:] = 0.0
+        for i in range(self.n):
+            t, p, v = 0.0, self.pos[i], self.vel[i]
+            for k, (duration, acc) in enumerate(_trapezoid(distance[i], v, self.v_max, self.a_max)):
+                self._starts[i, k] = t
+                self._acc[i, k] = acc
+                self._p[i, k] = p
+                self._v[i, k] = v
+                p += v * duration + 0.5 * acc * duration * duration
+                v += acc * duration
+                t += duration
+            self._ends[i] = t
+            if not np.isfinite(self._starts[i, 0]):
+                # Вже в цілі: один нульовий сегмент
+                self._starts[i, 0] = 0.0
+                self._p[i, 0] = self.goal[i]
+                self._v[i, 0] = 0.0
+        self.duration = float(self._ends.max())
+
+    def _plan_minjerk(self, distance: np.ndarray):
+        d = np.abs(distance)
+        v0, a0 = self.vel, self.acc
+        durations = np.maximum.reduce([
+            _MINJERK_PEAK_V * d / self.v_max,
+            np.sqrt(_MINJERK_PEAK_A * d / self.a_max),
+            2 * np.abs(v0) / self.a_max,  # час погасити поточну швидкість
+        ])
+        T = float(durations.max())
+        self.duration = T
+        if T <= 0:
+            self._coef[:] = 0.0
+            self._coef[0] = self.goal
+            return
+        c = self._coef
+        c[0] = self.pos
+        c[1] = v0
+        c[2] = a0 / 2
+        c[3] = (20 * distance - 12 * v0 * T - 3 * a0 * T ** 2) / (2 * T ** 3)
+        c[4] = (-30 * distance + 16 * v0 * T + 3 * a0 * T ** 2) / (2 * T ** 4)
+        c[5] = (12 * distance - 6 * v0 * T - a0 * T ** 2) / (2 * T ** 5)
+
+
+def angle_to_permille(angles: np.ndarray) -> list[int]:
+    """Радіани [-π, π] → позиція прошивки 0..1000 (зворотне до permille_to_angle)"""
+    permille = np.clip(np.rint((angles + np.pi) / (2 * np.pi) * 1000.0), 0, 1000)
+    return [int(p) for p in permille]
+
+
+class SetpointStreamer:
+    """
+    Потік уставок з фіксованою частотою: на кожному такті - точка
+    траєкторії як `{"sp": [p0..p5]}` (проміле) через SerialLink.
+
+    - set_target() (control loop) повертає Future[Ack] першої уставки до
+      нової цілі - для самописця й /predict, як Future команди `cmd`;
+    - поки рука стоїть у цілі, уставки не надсилаються;
+    - похибка стеження: остання підтверджена уставка мінус телеметрія,
+      що прийшла після її ACK;
+    - прошивка без `sp` (ERR missing_cmd) - supported=False, control loop
+      повертається до блокуючого `cmd`.
+    """
+
+    def __init__(self, link, telemetry, generator: TrajectoryGenerator,
+                 rate_hz: float = 50.0, history: int = 512):
+        self.link = link
+        self.telemetry = telemetry
+        self.generator = generator
+        self.rate_hz = rate_hz
+        self.period = 1.0 / rate_hz
+        self.supported = True
+
+        self._lock = Lock()
+        self._waiters: list[Future] = []
+        self._sent_goal: Optional[list] = None  # остання надіслана уставка, проміле
+        self._acked = np.zeros(generator.n)
+        self._acked_at = 0.0
+        self._checked_at = 0.0
+        self._errors = deque(maxlen=history)
+        self.last_error = np.zeros(generator.n)
+
+        self._status = {status: SETPOINTS.labels(status)
+                        for status in ("ok", "error", "timeout", "lost", "dropped")}
+        self.sent = 0
+        self.replans = 0
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+        REGISTRY.gauge("robot_trajectory_remaining_radians", "Найбільша відстань уставки до цілі") \
+            .set_function(lambda: float(np.abs(self.generator.goal - self.generator.pos).max()))
+
+    def start(self):
+        self._thread = Thread(target=self._run, name="setpoint-streamer", daemon=True)
+        self._thread.start()
+        logger.info(f"🚀 Траєкторії: {self.generator.profile}, уставки {self.rate_hz:.0f} Hz, "
+                    f"v_max {self.generator.v_max} рад/с, a_max {self.generator.a_max} рад/с²")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def set_target(self, target: np.ndarray, now: float) -> Future:
+        """Нова ціль (радіани); перериває поточний рух. Стример зупинено - Ack без OK одразу"""
+        future: Future = Future()
+        future.set_running_or_notify_cancel()
+        with self._lock:
+            if not self.supported or self._stop.is_set():
+                # Виклик проскочив перевірку supported у control loop: наступний такт піде через cmd
+                _resolve(future, Ack(False, self._stopped_reply(), 0.0))
+                return future
+            if not self.generator.initialized:
+                snapshot = self.telemetry.latest()
+                if snapshot is not None:
+                    self.generator.reset(snapshot.joint_angles, now)
+            if not np.array_equal(target, self.generator.goal):
+                self.replans += 1
+                REPLANS.inc()
+            self.generator.set_target(target, now)
+            self._waiters.append(future)
+        return future
+
+    def stats(self) -> dict:
+        errors = np.fromiter(self._errors, dtype=np.float64) if self._errors else None
+        now = time.monotonic()
+        return {
+            "supported": self.supported,
+            "profile": self.generator.profile,
+            "rate_hz": self.rate_hz,
+            "moving": not self.generator.done(now),
+            "sent": self.sent,
+            "replans": self.replans,
+            "remaining": float(np.abs(self.generator.goal - self.generator.pos).max()),
+            "tracking_error": {
+                "last": self.last_error.tolist(),
+                "rms": float(np.sqrt(np.mean(errors ** 2))) if errors is not None else None,
+                "p99": float(np.percentile(errors, 99)) if errors is not None else None,
+                "max": float(errors.max()) if errors is not None else None,
+            },
+        }
+
+    # ---- Внутрішнє ----
+
+    def _run(self):
+        deadline = time.monotonic()
+        while not self._stop.is_set() and self.supported:
+            now = time.monotonic()
+            try:
+                self._tick(now)
+                self._check_tracking()
+            except Exception as e:
+                logger.error(f"❌ Setpoint streamer error: {e}")
+            deadline += self.period
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                deadline = time.monotonic()
+        # Цілі, які вже не підуть уставками, інакше /predict чекав би до таймауту
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+        failed = Ack(False, self._stopped_reply(), 0.0)
+        for waiter in waiters:
+            _resolve(waiter, failed)
+
+    def _stopped_reply(self) -> str:
+        return "closed" if self.supported else "ERR missing_cmd"
+
+    def _tick(self, now: float):
+        with self._lock:
+            if not self.generator.initialized:
+                return
+            setpoint = angle_to_permille(self.generator.sample(now))
+            holding = setpoint == self._sent_goal
+            if holding:
+                waiters, self._waiters = self._waiters, []
+
+        if holding:
+            # Уставка вже на платі (рука в цілі) - нова ціль нічого не змінила
+            hold = Ack(True, "OK hold", 0.0)
+            for waiter in waiters:
+                _resolve(waiter, hold)
+            return
+
+        future = self.link.send({"sp": setpoint}, kind="sp")
+        if future is None:
+            # Вікно заповнене: ця точка пропала, наступна піде за період
+            self._status["dropped"].inc()
+            return
+        self.sent += 1
+        with self._lock:
+            self._sent_goal = setpoint
+            waiters, self._waiters = self._waiters, []
+        sent = np.array(setpoint, dtype=np.float64) / 1000.0 * (2 * np.pi) - np.pi
+        future.add_done_callback(lambda f: self._on_ack(f, sent, waiters))
+
+    def _on_ack(self, future: Future, setpoint: np.ndarray, waiters: list):
+        ack = future.result()
+        if ack.ok:
+            self._status["ok"].inc()
+            self._acked = setpoint
+            self._acked_at = time.monotonic()
+        else:
+            if ack.reply == "timeout":
+                self._status["timeout"].inc()
+            elif ack.reply.startswith("ERR"):
+                self._status["error"].inc()
+            else:
+                self._status["lost"].inc()  # reset / read_error / closed
+            if "missing_cmd" in ack.reply and self.supported:
+                logger.warning("⚠️ Прошивка не підтримує sp - повернення до cmd (moveWithRateLimit)")
+                with self._lock:
+                    self.supported = False
+            else:
+                # Плата могла не застосувати уставку - надіслати знову на наступному такті
+                with self._lock:
+                    self._sent_goal = None
+        for waiter in waiters:
+            _resolve(waiter, ack)
+
+    def _check_tracking(self):
+        """Похибка за першою телеметрією після ACK уставки"""
+        snapshot = self.telemetry.latest()
+        if snapshot is None or snapshot.host_time <= self._acked_at or self._acked_at <= self._checked_at:
+            return
+        self._checked_at = self._acked_at
+        np.subtract(self._acked, snapshot.joint_angles, out=self.last_error)
+        worst = float(np.abs(self.last_error).max())
+        self._errors.append(worst)
+        TRACKING_ERROR.observe(worst)
+
+
+def _resolve(future: Future, result):
+    try:
+        future.set_result(result)
+    except InvalidStateError:
+        pass
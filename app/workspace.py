@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Робоча зона на столі: метричні wx, wy від каліброваного детектора →
+нормовані u, v, які бачила політика в симуляції.
+
+Значення мають збігатися з training/environments/workspace.py.
+"""
+
+WORKSPACE_X = (0.15, 0.40)  # м, від бази вздовж X
+WORKSPACE_Y = (-0.20, 0.20)  # м, вздовж Y
+
+
+def world_to_workspace(x: float, y: float) -> tuple:
+    """Точка на столі (м) → нормовані u, v"""
+    return (
+        (x - WORKSPACE_X[0]) / (WORKSPACE_X[1] - WORKSPACE_X[0]),
+        (y - WORKSPACE_Y[0]) / (WORKSPACE_Y[1] - WORKSPACE_Y[0]),
+    )
+
+
+def velocity_to_workspace(vx: float, vy: float) -> tuple:
+    """Швидкість на столі (м/с) → одиниці u, v за секунду"""
+    return vx / (WORKSPACE_X[1] - WORKSPACE_X[0]), vy / (WORKSPACE_Y[1] - WORKSPACE_Y[0])
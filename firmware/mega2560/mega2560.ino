@@ -28,6 +28,18 @@ const int   DEADBAND_US   = 0;    // не «гасимо» дрібні крок
 int  last_us[N];
 bool ARMED = false;
 
+// Потокові уставки {"sp":[p0..p5]} від траєкторій хоста: loop() не блокується,
+// канал підтягується до уставки не швидше SP_MAX_STEP_US за SP_STEP_MS
+const int SP_MAX_STEP_US = 4;
+const unsigned long SP_STEP_MS = 5;
+int  sp_us[N];
+bool SP_ACTIVE = false;
+unsigned long last_sp_step_ms = 0;
+
+// Потокова телеметрія стану (0 = вимкнено, вмикає хост командою {"telemetry":hz})
+unsigned long TELEMETRY_PERIOD_MS = 0;
+unsigned long last_telemetry_ms = 0;
+
 inline int clampUs(int ch, int us){
   if (us < MIN_US[ch]) us = MIN_US[ch];
   if (us > MAX_US[ch]) us = MAX_US[ch];
@@ -44,6 +56,32 @@ int normToUsWithGain(int ch, float v){
   return clampUs(ch, us);
 }
 
+// Зворотне до normToUsWithGain: мкс → позиція 0..1 (у проміле, щоб не друкувати float)
+int usToPermille(int ch, int us){
+  const int minv = MIN_US[ch], maxv = MAX_US[ch];
+  const int mid  = (minv + maxv)/2;
+  const int half = (maxv - minv)/2;
+  if (half <= 0) return 500;
+  float v = 0.5f + (float)(us - mid) / (2.0f * CMD_GAIN * half);
+  return (int)(v * 1000.0f + 0.5f);
+}
+
+// Рядок телеметрії: "S <millis> <armed> <p0> ... <p5>" (p - позиція 0..1000)
+void maybeSendTelemetry(){
+  if (TELEMETRY_PERIOD_MS == 0) return;
+  unsigned long now = millis();
+  if (now - last_telemetry_ms < TELEMETRY_PERIOD_MS) return;
+  last_telemetry_ms = now;
+  Serial.print(F("S "));
+  Serial.print(now);
+  Serial.print(ARMED ? F(" 1") : F(" 0"));
+  for (uint8_t i=0;i<N;i++){
+    Serial.print(' ');
+    Serial.print(usToPermille(i, last_us[i]));
+  }
+  Serial.println();
+}
+
 inline void writeUs(int ch, int us){
   us = clampUs(ch, us);
   pwm.writeMicroseconds(ch, us);
@@ -55,6 +93,7 @@ void outputsOff(){
 }
 
 void moveWithRateLimit(const int target_us[]){
+  SP_ACTIVE = false;  // блокуючий рух скасовує потокову уставку
   bool done = false;
   while (!done){
     done = true;
@@ -68,6 +107,7 @@ void moveWithRateLimit(const int target_us[]){
         writeUs(i, cur + step);
       }
     }
+    maybeSendTelemetry();  // рух блокує loop(), тож телеметрія йде й звідси
     delay(STEP_DELAY_MS);
   }
 }
@@ -75,14 +115,33 @@ void moveWithRateLimit(const int target_us[]){
 // Мікрокроки для одного каналу: du (мкс за крок), n (кількість), dly (мс)
 void stepChannel(uint8_t ch, int du, int n, int dly){
   if (ch >= N) return;
+  SP_ACTIVE = false;
   for (int k=0; k<n; k++){
     writeUs(ch, last_us[ch] + du);
+    maybeSendTelemetry();
     delay(dly);
   }
 }
 
+// Неблокуючий крок до потокової уставки (викликається з loop())
+void serviceSetpoint(){
+  if (!SP_ACTIVE || !ARMED) return;
+  unsigned long now = millis();
+  if (now - last_sp_step_ms < SP_STEP_MS) return;
+  last_sp_step_ms = now;
+  bool done = true;
+  for (uint8_t i=0;i<N;i++){
+    int d = sp_us[i] - last_us[i];
+    if (d == 0) continue;
+    done = false;
+    writeUs(i, last_us[i] + constrain(d, -SP_MAX_STEP_US, SP_MAX_STEP_US));
+  }
+  if (done) SP_ACTIVE = false;
+}
+
 // ARM з опційною ініціалізацією (записуємо імпульси заздалегідь, поки OE=HIGH)
 void armAndMaybeInit(const int *init_us){
+  SP_ACTIVE = false;
   if (init_us){
     for (uint8_t i=0;i<N;i++){
       last_us[i] = clampUs(i, init_us[i]);
@@ -97,6 +156,7 @@ void armAndMaybeInit(const int *init_us){
 }
 
 void disarmAll(){
+  SP_ACTIVE = false;
   outputsOff();
 #if USE_OE
   digitalWrite(OE_PIN, HIGH);  // вимкнути виходи
@@ -132,6 +192,8 @@ void setup(){
 }
 
 void loop(){
+  maybeSendTelemetry();
+  serviceSetpoint();
   if (!Serial.available()) return;
   String line = Serial.readStringUntil('\n');
   line.trim();
@@ -160,10 +222,19 @@ void loop(){
     return;
   }
 
+  // ---- TELEMETRY: частота потокової телеметрії, Гц (0 = вимкнути) ----
+  if (doc.containsKey("telemetry")){
+    int hz = doc["telemetry"] | 0;
+    TELEMETRY_PERIOD_MS = (hz > 0) ? (1000UL / (unsigned long)hz) : 0;
+    Serial.println(F("OK telemetry"));
+    return;
+  }
+
   // ---- PRIME: попередньо записати мікросекунди (поки виходи вимкнені) ----
   if (doc.containsKey("prime")){
     JsonArray a = doc["prime"];
     if (a.size()!=N){ Serial.println(F("ERR prime_size")); return; }
+    SP_ACTIVE = false;
     for (uint8_t i=0;i<N;i++){
       int us = a[i].as<int>();
       last_us[i] = clampUs(i, us);
@@ -173,6 +244,21 @@ void loop(){
     return;
   }
 
+  // ---- SP: потокова уставка (проміле 0..1000), відповідь одразу ----
+  if (doc.containsKey("sp")){
+    if (!ARMED){ Serial.println(F("ERR not_armed")); return; }
+    JsonArray sp = doc["sp"];
+    if (sp.size()!=N){ Serial.println(F("ERR sp_size")); return; }
+    for (uint8_t i=0;i<N;i++){
+      sp_us[i] = normToUsWithGain(i, sp[i].as<int>() / 1000.0f);
+    }
+    SP_ACTIVE = true;
+    Serial.print(F("OK"));
+    if (doc.containsKey("seq")){ Serial.print(F(" seq=")); Serial.print(doc["seq"].as<String>()); }
+    Serial.println();
+    return;
+  }
+
   // ---- STEP для одного каналу ----
   if (doc.containsKey("step")){
     if (!ARMED){ Serial.println(F("ERR not_armed")); return; }
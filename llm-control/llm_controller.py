@@ -7,6 +7,7 @@ LLM контролер для роборуки
 import os
 import json
 import time
+import threading
 import requests
 from anthropic import Anthropic
 from dotenv import load_dotenv
@@ -18,21 +19,66 @@ ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 ORANGE_PI_HOST = os.getenv("ORANGE_PI_HOST", "192.168.1.101")
 ORANGE_PI_PORT = os.getenv("ORANGE_PI_PORT", "8000")
 BASE_URL = f"http://{ORANGE_PI_HOST}:{ORANGE_PI_PORT}"
+ROBOT_STREAM = os.getenv("ROBOT_STREAM", "1") == "1"  # стан через SSE /stream замість опитування
+ROBOT_STREAM_HZ = float(os.getenv("ROBOT_STREAM_HZ", 5))
+ROBOT_STREAM_MAX_AGE = float(os.getenv("ROBOT_STREAM_MAX_AGE", 1.0))  # с, старіший кадр - запит /state
 
 # Ініціалізація Claude
 client = Anthropic(api_key=ANTHROPIC_API_KEY)
 
 
+class StateStream:
+    """Фонова підписка на SSE /stream: останній кадр стану без опитування"""
+    
+    def __init__(self, base_url: str, rate_hz: float = 5.0):
+        self.url = f"{base_url}/stream?rate={rate_hz:g}"
+        self.latest = None
+        self.received_at = 0.0
+        self.connected = False
+        self._thread = threading.Thread(target=self._run, name="state-stream", daemon=True)
+        self._thread.start()
+    
+    def get(self, max_age: float):
+        """Останній кадр, якщо він не старший за max_age секунд"""
+        if self.latest is not None and time.monotonic() - self.received_at <= max_age:
+            return self.latest
+        return None
+    
+    def _run(self):
+        backoff = 1.0
+        while True:
+            try:
+                with requests.get(self.url, stream=True, timeout=(5, 30),
+                                  headers={"Accept": "text/event-stream"}) as response:
+                    response.raise_for_status()
+                    self.connected = True
+                    backoff = 1.0
+                    for line in response.iter_lines(decode_unicode=True):
+                        if line and line.startswith("data: "):
+                            self.latest = json.loads(line[6:])
+                            self.received_at = time.monotonic()
+            except Exception as e:
+                if self.connected:
+                    print(f"⚠️ /stream відключено: {e}")
+            self.connected = False
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+
 class RobotArmController:
     """LLM-контролер для роборуки"""
     
     def __init__(self):
         self.base_url = BASE_URL
+        self.stream = StateStream(self.base_url, ROBOT_STREAM_HZ) if ROBOT_STREAM else None
         print(f"🤖 LLM Controller ініціалізовано")
         print(f"🔗 Orange Pi: {self.base_url}")
     
     def get_robot_state(self):
         """Отримати поточний стан робота"""
+        frame = self.stream.get(ROBOT_STREAM_MAX_AGE) if self.stream else None
+        if frame is not None:
+            return frame
         try:
             response = requests.get(f"{self.base_url}/state", timeout=5)
             response.raise_for_status()
@@ -43,6 +89,9 @@ class RobotArmController:
     
     def get_vision_data(self):
         """Отримати дані з камери/YOLO"""
+        frame = self.stream.get(ROBOT_STREAM_MAX_AGE) if self.stream else None
+        if frame is not None:
+            return frame["yolo_target"]
         try:
             response = requests.get(f"{self.base_url}/metrics", timeout=5)
             response.raise_for_status()
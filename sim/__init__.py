@@ -0,0 +1,14 @@
+"""
+Симулятор стеку без заліза: емулятор Mega2560 на pty, локальний MQTT-брокер,
+сценарні YOLO детекції та бенчмарк app/main.py наскрізь
+"""
+
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(ROOT_DIR, "app")
+
+# Модулі app пласкі (from metrics import ...) - як у контейнері /app
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Наскрізний бенчмарк app/main.py без заліза: емулятор Mega на pty, локальний
+брокер і сценарні детекції; app запускається окремим процесом uvicorn.
+
+Фази:
+1. loop - для кожної частоти з --rates: досягнута частота control loop,
+   перевищення, p99 тіку, ACK RTT / втрати команд (cmd або уставок sp),
+   похибка стеження траєкторії;
+2. api - латентність /state і /predict під паралельним навантаженням
+   (--concurrency клієнтів), коди відповідей.
+
+    python -m sim.bench --rates 20,50,100 --duration 10 --concurrency 1,4,16
+    python -m sim.bench --model app/model.tflite --out bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import logging
+import argparse
+import subprocess
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from sim import APP_DIR
+from sim.mega_emulator import MegaEmulator
+from sim.mqtt_broker import MiniBroker
+from sim.detections import ScriptedDetections, SCRIPTS
+
+logger = logging.getLogger(__name__)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _percentiles(values: list) -> dict:
+    if not values:
+        return {"n": 0}
+    arr = np.asarray(values) * 1000
+    return {
+        "n": len(values),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+        "max_ms": round(float(arr.max()), 3),
+    }
+
+
+class AppProcess:
+    """app/main.py під uvicorn з env, що вказує на емулятори"""
+
+    def __init__(self, serial_dev: str, mqtt_port: int, rate_hz: float,
+                 model: Optional[str] = None, env: Optional[dict] = None):
+        self.port = _free_port()
+        self.env = {
+            **os.environ,
+            "SERIAL_DEV": serial_dev,
+            "MQTT_HOST": "127.0.0.1",
+            "MQTT_PORT": str(mqtt_port),
+            "CONTROL_RATE_HZ": str(rate_hz),
+            "DUMMY_MODEL": "0" if model else "1",
+            "MODEL_PATH": os.path.abspath(model) if model else "",
+            "FLIGHT_RECORDER_PATH": "",
+            **(env or {}),
+        }
+        self.proc: Optional[subprocess.Popen] = None
+
+    def start(self, timeout: float = 30.0):
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+             "--port", str(self.port), "--log-level", "warning"],
+            cwd=APP_DIR, env=self.env,
+        )
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"app завершився з кодом {self.proc.returncode}")
+            try:
+                status, _ = self.request("GET", "/readyz")
+                if status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise TimeoutError("app не став готовим (/readyz)")
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+    def connection(self) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection("127.0.0.1", self.port, timeout=10)
+
+    def request(self, method: str, path: str, body: Optional[dict] = None,
+                conn: Optional[http.client.HTTPConnection] = None) -> tuple[int, bytes]:
+        own = conn is None
+        conn = conn or self.connection()
+        try:
+            payload = json.dumps(body) if body is not None else None
+            headers = {"Content-Type": "application/json"} if body is not None else {}
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            return response.status, response.read()
+        finally:
+            if own:
+                conn.close()
+
+    def metrics(self) -> dict:
+        _, body = self.request("GET", "/metrics")
+        return json.loads(body)
+
+
+def bench_loop(app: AppProcess, duration: float, warmup: float) -> dict:
+    time.sleep(warmup)
+    before = app.metrics()
+    time.sleep(duration)
+    after = app.metrics()
+
+    control_before, control = before["control"], after["control"]
+    commands = (after["serial"] or {}).get("commands", {})
+    kind = "sp" if "sp" in commands else "cmd"  # MOTION_MODE=trajectory шле уставки
+    cmd_before = (before["serial"] or {}).get("commands", {}).get(kind, {})
+    cmd = commands.get(kind, {})
+    ticks = control["ticks"] - control_before["ticks"]
+
+    def delta(key):
+        return cmd.get(key, 0) - cmd_before.get(key, 0)
+
+    return {
+        "achieved_hz": round(ticks / duration, 2),
+        "overruns": control["overruns"] - control_before["overruns"],
+        "missed_deadlines": control["missed_deadlines"] - control_before["missed_deadlines"],
+        "tick_p99_ms": round(control["tick_time"]["p99_ms"], 3),
+        "jitter_p99_ms": round(control["jitter"]["p99_ms"], 3),
+        "ack": {
+            "kind": kind,
+            "sent": delta("sent"),
+            "ok": delta("ok"),
+            "dropped": delta("dropped"),
+            "timeouts": delta("timeouts"),
+            "lost": delta("lost"),
+            "rtt_p50_ms": round(cmd.get("rtt_p50_ms", 0.0), 3),
+            "rtt_p99_ms": round(cmd.get("rtt_p99_ms", 0.0), 3),
+        },
+        "telemetry_hz": after["telemetry"]["rate_hz"],
+        "tracking_error": (after.get("trajectory") or {}).get("tracking_error"),
+    }
+
+
+def bench_api(app: AppProcess, concurrency: int, duration: float) -> dict:
+    """Кожен клієнт - власне keep-alive з'єднання; 3 запити /state на 1 /predict"""
+    observation = {"x": [0.1, -0.2, 0.3, 0.0, 0.5, -0.5]}
+
+    def client(worker: int) -> dict:
+        results = {"state": [], "predict": [], "codes": {}}
+        conn = app.connection()
+        deadline = time.monotonic() + duration
+        i = worker
+        try:
+            while time.monotonic() < deadline:
+                name = "predict" if i % 4 == 3 else "state"
+                i += 1
+                t0 = time.perf_counter()
+                try:
+                    if name == "predict":
+                        status, _ = app.request("POST", "/predict", observation, conn)
+                    else:
+                        status, _ = app.request("GET", "/state", conn=conn)
+                except (OSError, http.client.HTTPException):
+                    status = 0
+                    conn.close()
+                    conn = app.connection()
+                elapsed = time.perf_counter() - t0
+                key = f"{name}:{status}"
+                results["codes"][key] = results["codes"].get(key, 0) + 1
+                if status == 200:
+                    results[name].append(elapsed)
+        finally:
+            conn.close()
+        return results
+
+    ticks_before = app.metrics()["control"]["ticks"]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        per_client = list(pool.map(client, range(concurrency)))
+    control = app.metrics()["control"]
+
+    merged = {"state": [], "predict": [], "codes": {}}
+    for r in per_client:
+        merged["state"] += r["state"]
+        merged["predict"] += r["predict"]
+        for k, v in r["codes"].items():
+            merged["codes"][k] = merged["codes"].get(k, 0) + v
+    total = sum(merged["codes"].values())
+    return {
+        "concurrency": concurrency,
+        "throughput_rps": round(total / duration, 1),
+        "loop_hz_under_load": round((control["ticks"] - ticks_before) / duration, 2),
+        "tick_p99_ms": round(control["tick_time"]["p99_ms"], 3),
+        "state": _percentiles(merged["state"]),
+        "predict": _percentiles(merged["predict"]),
+        "codes": merged["codes"],
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rates", default="20,50,100", help="частоти control loop, Hz")
+    parser.add_argument("--duration", type=float, default=10.0, help="с на кожне вимірювання")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--concurrency", default="1,4,16", help="паралельні API-клієнти")
+    parser.add_argument("--api-rate", type=float, default=None, help="частота loop у фазі api (за замовч. перша з --rates)")
+    parser.add_argument("--model", default=None, help="TFLite модель (за замовч. DummyEngine)")
+    parser.add_argument("--script", choices=SCRIPTS, default="circle")
+    parser.add_argument("--detections-hz", type=float, default=30.0)
+    parser.add_argument("--time-scale", type=float, default=1.0, help="масштаб delay() прошивки")
+    parser.add_argument("--motion", choices=("trajectory", "cmd"), default="trajectory", help="MOTION_MODE app")
+    parser.add_argument("--out", default=None, help="зберегти результат у JSON")
+    args = parser.parse_args()
+
+    rates = [float(r) for r in args.rates.split(",") if r]
+    concurrency = [int(c) for c in args.concurrency.split(",") if c]
+
+    broker = MiniBroker()
+    broker.start()
+    source = ScriptedDetections("127.0.0.1", broker.port, args.script, args.detections_hz)
+    source.start()
+
+    report = {"config": vars(args), "loop": [], "api": []}
+    try:
+        for rate in rates:
+            emulator = MegaEmulator(armed=True, time_scale=args.time_scale)
+            app = AppProcess(emulator.start(), broker.port, rate, args.model,
+                             env={"MOTION_MODE": args.motion})
+            try:
+                app.start()
+                result = {"rate_hz": rate, **bench_loop(app, args.duration, args.warmup)}
+                result["emulator"] = dict(emulator.stats)
+                report["loop"].append(result)
+                logger.info(f"⏱️ loop {rate:.0f} Hz → {result['achieved_hz']} Hz | "
+                            f"tick p99 {result['tick_p99_ms']} ms | ACK p99 {result['ack']['rtt_p99_ms']} ms | "
+                            f"dropped {result['ack']['dropped']}")
+            finally:
+                app.stop()
+                emulator.stop()
+
+        emulator = MegaEmulator(armed=True, time_scale=args.time_scale)
+        app = AppProcess(emulator.start(), broker.port, args.api_rate or rates[0], args.model,
+                         env={"MOTION_MODE": args.motion})
+        try:
+            app.start()
+            time.sleep(args.warmup)
+            for n in concurrency:
+                result = bench_api(app, n, args.duration)
+                report["api"].append(result)
+                logger.info(f"🌐 api x{n}: {result['throughput_rps']} rps | "
+                            f"/state p99 {result['state'].get('p99_ms')} ms | "
+                            f"/predict p99 {result['predict'].get('p99_ms')} ms | "
+                            f"loop {result['loop_hz_under_load']} Hz")
+        finally:
+            app.stop()
+            emulator.stop()
+    finally:
+        source.stop()
+        broker.stop()
+
+    report["broker"] = broker.stats
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
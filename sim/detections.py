@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Сценарне джерело YOLO детекцій для arm/vision/objects (без камери і моделі).
+
+Сценарії:
+- static: об'єкт нерухомо в центрі;
+- circle: рух по колу (перевірка прогнозу цілі між кадрами);
+- random: випадкові координати, як емуляція в yolo_detector.py;
+- blink: circle, але об'єкт зникає на 1 с кожні 3 с (втрата цілі);
+- pair: circle + нерухомий відволікач; порядок об'єктів чергується, а
+  впевненість відволікача то вища, то нижча (перевірка вибору цілі).
+
+Записи - схема v2 з track_id (після зникнення в blink - новий id).
+
+    python -m sim.detections --host 127.0.0.1 --port 1883 --script circle --rate 30
+"""
+
+import json
+import math
+import time
+import logging
+import argparse
+from threading import Thread, Event
+from typing import Optional
+
+import numpy as np
+import paho.mqtt.client as mqtt
+
+import sim  # noqa: F401  (APP_DIR у sys.path)
+import detection_schema
+
+logger = logging.getLogger(__name__)
+
+SCRIPTS = ("static", "circle", "random", "blink", "pair")
+DISTRACTOR = (0.3, 0.7)  # положення відволікача в pair
+
+
+class ScriptedDetections:
+    def __init__(self, host: str = "127.0.0.1", port: int = 1883, script: str = "circle",
+                 rate_hz: float = 30.0, topic: str = "arm/vision/objects",
+                 fmt: str = "binary", period_s: float = 4.0, seed: int = 0):
+        if script not in SCRIPTS:
+            raise ValueError(f"script має бути одним з {SCRIPTS}")
+        self.host = host
+        self.port = port
+        self.script = script
+        self.rate_hz = rate_hz
+        self.topic = topic
+        self.fmt = fmt
+        self.period_s = period_s
+        self._rng = np.random.default_rng(seed)
+
+        self._record = np.zeros(2, dtype=detection_schema.RECORD_V2)
+        self._record["w"] = 0.1
+        self._record["h"] = 0.1
+        self._track_id = 1
+        self._visible = True
+        self._frame = 0
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self._client = mqtt.Client()
+        self.published = 0
+
+    def position(self, t: float) -> Optional[tuple[float, float, float]]:
+        """(x, y, confidence) у момент t від старту; None - об'єкта немає"""
+        if self.script == "static":
+            return 0.5, 0.5, 0.9
+        if self.script == "random":
+            return (float(self._rng.uniform(0.3, 0.7)), float(self._rng.uniform(0.3, 0.7)),
+                    float(self._rng.uniform(0.7, 0.95)))
+        if self.script == "blink" and t % 3.0 >= 2.0:
+            return None
+        phase = 2 * math.pi * t / self.period_s
+        return 0.5 + 0.2 * math.cos(phase), 0.5 + 0.2 * math.sin(phase), 0.9
+
+    def velocity(self, t: float) -> tuple[float, float]:
+        if self.script not in ("circle", "blink", "pair"):
+            return 0.0, 0.0
+        omega = 2 * math.pi / self.period_s
+        phase = omega * t
+        return -0.2 * omega * math.sin(phase), 0.2 * omega * math.cos(phase)
+
+    def encode(self, t: float) -> bytes:
+        position = self.position(t)
+        self._frame += 1
+        count = 0
+        if position is not None:
+            if not self._visible:
+                self._track_id += 1  # зник і з'явився - новий трек, як у трекера детектора
+            record = self._record[0]
+            record["x"], record["y"], record["confidence"] = position
+            record["vx"], record["vy"] = self.velocity(t)
+            record["track_id"] = self._track_id
+            record["age"] = t
+            count = 1
+        self._visible = position is not None
+        if self.script == "pair":
+            distractor = self._record[1]
+            distractor["x"], distractor["y"] = DISTRACTOR
+            distractor["confidence"] = 0.95 if self._frame % 4 < 2 else 0.6
+            distractor["track_id"] = 0xFFFF
+            distractor["age"] = t
+            count = 2
+        records = self._record[:count] if self._frame % 2 else self._record[:count][::-1]
+        if self.fmt == "json":
+            objects = [{"class": "object", "x": float(r["x"]), "y": float(r["y"]),
+                        "confidence": float(r["confidence"]), "track_id": int(r["track_id"]),
+                        "vx": float(r["vx"]), "vy": float(r["vy"]), "age": float(r["age"])}
+                       for r in records]
+            return json.dumps({"timestamp": time.time(), "objects": objects,
+                               "inference_time_ms": 0.0}).encode()
+        header = detection_schema.HEADER.pack(detection_schema.MAGIC, 2, count, time.time(), 0.0)
+        return header + records.tobytes()
+
+    def start(self):
+        self._client.connect(self.host, self.port, 60)
+        self._client.loop_start()
+        self._thread = Thread(target=self._run, name="scripted-detections", daemon=True)
+        self._thread.start()
+        logger.info(f"📷 Сценарій детекцій: {self.script} @ {self.rate_hz:.0f} Hz → {self.topic}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        self._client.loop_stop()
+        self._client.disconnect()
+
+    def _run(self):
+        period = 1.0 / self.rate_hz
+        t0 = time.monotonic()
+        deadline = t0
+        while not self._stop.is_set():
+            self._client.publish(self.topic, self.encode(deadline - t0), qos=0)
+            self.published += 1
+            deadline += period
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                self._stop.wait(delay)
+            else:
+                deadline = time.monotonic()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--script", choices=SCRIPTS, default="circle")
+    parser.add_argument("--rate", type=float, default=30.0)
+    parser.add_argument("--format", choices=("binary", "json"), default="binary")
+    args = parser.parse_args()
+
+    source = ScriptedDetections(args.host, args.port, args.script, args.rate, fmt=args.format)
+    source.start()
+    try:
+        Event().wait()
+    except KeyboardInterrupt:
+        source.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Емулятор прошивки firmware/mega2560/mega2560.ino на псевдотерміналі.
+
+Протокол той самий, що в прошивці: JSON-рядки arm/init, telemetry, prime,
+step, setRange, cmd(+seq), відповіді OK/ERR/ARMED/DISARMED і рядки
+телеметрії `S <millis> <armed> p0..p5`, потокові уставки sp. Відтворено й таймінги:
+- moveWithRateLimit: MAX_STEP_US мкс на ітерацію з delay(STEP_DELAY_MS),
+  loop() заблокований на весь рух;
+- stepChannel: n кроків з delay(dly);
+- serviceSetpoint: SP_MAX_STEP_US мкс за SP_STEP_MS без блокування loop();
+- RX-буфер 64 байти: поки прошивка зайнята, надлишок байтів губиться;
+- TX на 115200 бод;
+- скидання при відкритті порту (DTR): банер READY через boot_ms після того,
+  як хост налаштує термінал (на pty DTR немає - відкриття видно зі зміни termios).
+
+    python -m sim.mega_emulator --armed      # друкує шлях pty для SERIAL_DEV
+"""
+
+import os
+import tty
+import json
+import termios
+import time
+import select
+import logging
+import argparse
+from threading import Thread, Event
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+N = 6
+CMD_GAIN = 0.50
+MAX_STEP_US = 1
+STEP_DELAY_MS = 25
+DEADBAND_US = 0
+DEFAULT_MIN_US = 1200
+DEFAULT_MAX_US = 1800
+SP_MAX_STEP_US = 4
+SP_STEP_MS = 5
+
+
+class MegaEmulator:
+    """
+    Один потік = один loop() прошивки: рядки обробляються строго по черзі,
+    а під час руху відповіді й читання порту не відбуваються.
+
+    time_scale масштабує всі delay() (0.1 - у 10 разів швидше).
+    """
+
+    def __init__(self, armed: bool = False, time_scale: float = 1.0,
+                 rx_buffer: int = 64, baud: int = 115200, line_ms: float = 1.0,
+                 reset_on_open: bool = True, boot_ms: float = 1600.0,
+                 banner: str = "READY DISARMED (OE) MG90S"):
+        self.time_scale = time_scale
+        self.rx_buffer = rx_buffer
+        self.baud = baud
+        self.line_ms = line_ms  # розбір JSON на AVR
+        self.reset_on_open = reset_on_open
+        self.boot_ms = boot_ms  # бутлоадер + setup()
+        self.banner = banner
+        self._armed_at_boot = armed
+
+        self.min_us = [DEFAULT_MIN_US] * N
+        self.max_us = [DEFAULT_MAX_US] * N
+        self.last_us = [(a + b) // 2 for a, b in zip(self.min_us, self.max_us)]
+        self.armed = armed
+        self.telemetry_period_ms = 0
+        self._last_telemetry_ms = 0
+        self.sp_us = list(self.last_us)
+        self.sp_active = False
+        self._last_sp_step_ms = 0
+
+        self._master: Optional[int] = None
+        self._slave: Optional[int] = None
+        self.port: Optional[str] = None
+        self._termios: Optional[list] = None  # налаштування pty до відкриття хостом
+        self._rx = bytearray()
+        self._t0 = time.monotonic()
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+        self.stats = {
+            "lines": 0,
+            "cmd": 0,
+            "sp": 0,
+            "ok": 0,
+            "errors": 0,
+            "rx_overflow_bytes": 0,
+            "telemetry": 0,
+            "busy_s": 0.0,
+        }
+
+    # ---- Життєвий цикл ----
+
+    def start(self) -> str:
+        """Створити pty і запустити loop(); повертає шлях для SERIAL_DEV"""
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)  # без ехо і канонічного режиму
+        self.port = os.ttyname(self._slave)
+        self._termios = termios.tcgetattr(self._slave)
+        self._thread = Thread(target=self._run, name="mega-emulator", daemon=True)
+        self._thread.start()
+        logger.info(f"🤖 Mega emulator: {self.port} (armed={self.armed}, time_scale={self.time_scale})")
+        return self.port
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def reset(self):
+        """Емуляція перезавантаження плати (як при DTR)"""
+        self._delay(self.boot_ms)
+        self.armed = self._armed_at_boot
+        self.telemetry_period_ms = 0
+        self.sp_active = False
+        self._rx.clear()  # байти, що прийшли під час завантаження, з'їв бутлоадер
+        self._t0 = time.monotonic()
+        self._println(self.banner)
+
+    def _port_opened(self) -> bool:
+        """Хост відкрив порт: pyserial переналаштовує termios"""
+        if not self.reset_on_open or self._termios is None:
+            return False
+        try:
+            current = termios.tcgetattr(self._slave)
+        except termios.error:
+            return False
+        if current == self._termios:
+            return False
+        self._termios = None  # лише перше відкриття
+        return True
+
+    # ---- Arduino API ----
+
+    def millis(self) -> int:
+        return int((time.monotonic() - self._t0) * 1000 / self.time_scale)
+
+    def _delay(self, ms: float):
+        """delay(): прошивка не читає порт, байти лише накопичуються в RX"""
+        deadline = time.monotonic() + ms / 1000 * self.time_scale
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self._pump(remaining)
+
+    def _pump(self, timeout: float):
+        """Прийняти байти з pty у RX-буфер (з обмеженням розміру)"""
+        try:
+            ready, _, _ = select.select([self._master], [], [], max(0.0, timeout))
+        except (OSError, ValueError):
+            self._stop.set()
+            return
+        if not ready:
+            return
+        try:
+            data = os.read(self._master, 4096)
+        except OSError:
+            return
+        if self.rx_buffer:
+            room = self.rx_buffer - len(self._rx)
+            if len(data) > room:
+                self.stats["rx_overflow_bytes"] += len(data) - max(0, room)
+                data = data[:max(0, room)]
+        self._rx += data
+
+    def _println(self, line: str):
+        data = (line + "\r\n").encode()
+        try:
+            os.write(self._master, data)
+        except OSError:
+            return
+        if self.baud:
+            time.sleep(len(data) * 10 / self.baud)
+
+    # ---- Логіка прошивки ----
+
+    def clamp_us(self, ch: int, us: int) -> int:
+        return min(max(us, self.min_us[ch]), self.max_us[ch])
+
+    def norm_to_us(self, ch: int, v: float) -> int:
+        v = min(max(v, 0.0), 1.0)
+        mid = (self.min_us[ch] + self.max_us[ch]) // 2
+        half = (self.max_us[ch] - self.min_us[ch]) // 2
+        x = (v - 0.5) * 2.0 * CMD_GAIN
+        return self.clamp_us(ch, int(mid + x * half + 0.5))
+
+    def us_to_permille(self, ch: int, us: int) -> int:
+        mid = (self.min_us[ch] + self.max_us[ch]) // 2
+        half = (self.max_us[ch] - self.min_us[ch]) // 2
+        if half <= 0:
+            return 500
+        v = 0.5 + (us - mid) / (2.0 * CMD_GAIN * half)
+        return int(v * 1000.0 + 0.5)
+
+    def maybe_send_telemetry(self):
+        if not self.telemetry_period_ms:
+            return
+        now = self.millis()
+        if now - self._last_telemetry_ms < self.telemetry_period_ms:
+            return
+        self._last_telemetry_ms = now
+        positions = " ".join(str(self.us_to_permille(i, self.last_us[i])) for i in range(N))
+        self._println(f"S {now} {1 if self.armed else 0} {positions}")
+        self.stats["telemetry"] += 1
+
+    def write_us(self, ch: int, us: int):
+        self.last_us[ch] = self.clamp_us(ch, us)
+
+    def move_with_rate_limit(self, target_us: list):
+        self.sp_active = False
+        done = False
+        while not done:
+            done = True
+            for i in range(N):
+                cur = self.last_us[i]
+                d = self.clamp_us(i, target_us[i]) - cur
+                if abs(d) > DEADBAND_US:
+                    done = False
+                    step = (MAX_STEP_US if d > 0 else -MAX_STEP_US) if abs(d) > MAX_STEP_US else d
+                    self.write_us(i, cur + step)
+            self.maybe_send_telemetry()
+            self._delay(STEP_DELAY_MS)
+
+    def step_channel(self, ch: int, du: int, n: int, dly: int):
+        if ch >= N:
+            return
+        self.sp_active = False
+        for _ in range(n):
+            self.write_us(ch, self.last_us[ch] + du)
+            self.maybe_send_telemetry()
+            self._delay(dly)
+
+    def service_setpoint(self):
+        if not self.sp_active or not self.armed:
+            return
+        now = self.millis()
+        if now - self._last_sp_step_ms < SP_STEP_MS:
+            return
+        self._last_sp_step_ms = now
+        done = True
+        for i in range(N):
+            d = self.sp_us[i] - self.last_us[i]
+            if d:
+                done = False
+                self.write_us(i, self.last_us[i] + min(max(d, -SP_MAX_STEP_US), SP_MAX_STEP_US))
+        if done:
+            self.sp_active = False
+
+    def handle(self, line: str):
+        """Один рядок - гілки loop() прошивки"""
+        self.stats["lines"] += 1
+        if self.line_ms:
+            self._delay(self.line_ms)
+        try:
+            doc = json.loads(line)
+            if not isinstance(doc, dict):
+                raise ValueError("not an object")
+        except ValueError:
+            self._reply("ERR json_parse InvalidInput")
+            return
+
+        if "arm" in doc:
+            self.sp_active = False
+            if doc["arm"]:
+                init = doc.get("init")
+                if isinstance(init, list) and len(init) == N:
+                    for i in range(N):
+                        self.write_us(i, int(init[i]))
+                self.armed = True
+                self._println("ARMED")
+            else:
+                self.armed = False
+                self._println("DISARMED")
+            return
+
+        if "telemetry" in doc:
+            hz = int(doc["telemetry"] or 0)
+            self.telemetry_period_ms = 1000 // hz if hz > 0 else 0
+            self._reply("OK telemetry")
+            return
+
+        if "prime" in doc:
+            values = doc["prime"]
+            if not isinstance(values, list) or len(values) != N:
+                self._reply("ERR prime_size")
+                return
+            self.sp_active = False
+            for i in range(N):
+                self.write_us(i, int(values[i]))
+            self._reply("OK prime")
+            return
+
+        if "sp" in doc:
+            if not self.armed:
+                self._reply("ERR not_armed")
+                return
+            values = doc["sp"]
+            if not isinstance(values, list) or len(values) != N:
+                self._reply("ERR sp_size")
+                return
+            self.sp_us = [self.norm_to_us(i, int(values[i]) / 1000.0) for i in range(N)]
+            self.sp_active = True
+            self.stats["sp"] += 1
+            self._reply(f"OK seq={doc['seq']}" if "seq" in doc else "OK")
+            return
+
+        if "step" in doc:
+            if not self.armed:
+                self._reply("ERR not_armed")
+                return
+            st = doc["step"] or {}
+            self.step_channel(int(st.get("ch", 0)), int(st.get("du", 10)),
+                              int(st.get("n", 10)), int(st.get("dly", 40)))
+            self._reply("OK step")
+            return
+
+        if "setRange" in doc:
+            sr = doc["setRange"] or {}
+            ch = int(sr.get("ch", 255))
+            if ch < N:
+                self.min_us[ch] = int(sr.get("min", self.min_us[ch]))
+                self.max_us[ch] = int(sr.get("max", self.max_us[ch]))
+                if self.min_us[ch] > self.max_us[ch]:
+                    self.min_us[ch], self.max_us[ch] = self.max_us[ch], self.min_us[ch]
+                self.last_us[ch] = self.clamp_us(ch, self.last_us[ch])
+                self._reply("OK setRange")
+            else:
+                self._reply("ERR ch_range")
+            return
+
+        if "cmd" not in doc:
+            self._reply("ERR missing_cmd")
+            return
+        if not self.armed:
+            self._reply("ERR not_armed")
+            return
+        cmd = doc["cmd"]
+        if not isinstance(cmd, list) or len(cmd) != N:
+            self._reply("ERR cmd_size")
+            return
+
+        self.stats["cmd"] += 1
+        started = time.monotonic()
+        self.move_with_rate_limit([self.norm_to_us(i, float(cmd[i])) for i in range(N)])
+        self.stats["busy_s"] += time.monotonic() - started
+        self._reply(f"OK seq={doc['seq']}" if "seq" in doc else "OK")
+
+    def _reply(self, line: str):
+        self.stats["ok" if line.startswith("OK") else "errors"] += 1
+        self._println(line)
+
+    def _run(self):
+        self._println(self.banner)
+        while not self._stop.is_set():
+            if self._port_opened():
+                self.reset()
+            self.maybe_send_telemetry()
+            self.service_setpoint()
+            newline = self._rx.find(b"\n")
+            if newline < 0:
+                timeout = 0.05
+                if self.telemetry_period_ms:
+                    timeout = min(timeout, self.telemetry_period_ms / 1000 * self.time_scale)
+                if self.sp_active:
+                    timeout = min(timeout, SP_STEP_MS / 1000 * self.time_scale)
+                self._pump(timeout)
+                continue
+            raw = bytes(self._rx[:newline])
+            del self._rx[:newline + 1]
+            line = raw.decode(errors="replace").strip()
+            if line:
+                self.handle(line)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--armed", action="store_true", help="стартувати в стані ARMED")
+    parser.add_argument("--time-scale", type=float, default=1.0)
+    parser.add_argument("--rx-buffer", type=int, default=64, help="0 - без обмеження")
+    parser.add_argument("--no-reset", action="store_true", help="не емулювати скидання при відкритті порту")
+    args = parser.parse_args()
+
+    emulator = MegaEmulator(armed=args.armed, time_scale=args.time_scale,
+                            rx_buffer=args.rx_buffer, reset_on_open=not args.no_reset)
+    port = emulator.start()
+    print(f"SERIAL_DEV={port}", flush=True)
+    try:
+        while True:
+            time.sleep(10)
+            logger.info(f"📊 {emulator.stats}")
+    except KeyboardInterrupt:
+        emulator.stop()
+
+
+if __name__ == "__main__":
+    main()
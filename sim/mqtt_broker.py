@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Мінімальний MQTT 3.1.1 брокер на asyncio для тестів без mosquitto.
+
+Підтримано: CONNECT, PUBLISH (QoS 0/1/2 від клієнта), SUBSCRIBE/UNSUBSCRIBE
+з + та #, retained, PINGREQ, DISCONNECT. Підписникам доставляється QoS 0;
+якщо підписник не встигає читати, повідомлення відкидаються (як QoS 0).
+
+    python -m sim.mqtt_broker --port 1883
+"""
+
+import asyncio
+import logging
+import argparse
+from threading import Thread, Event
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = 1, 2, 3, 4, 5, 6, 7
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT = 8, 9, 10, 11, 12, 13, 14
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    p_parts = pattern.split("/")
+    t_parts = topic.split("/")
+    for i, p in enumerate(p_parts):
+        if p == "#":
+            return True
+        if i >= len(t_parts) or (p != "+" and p != t_parts[i]):
+            return False
+    return len(p_parts) == len(t_parts)
+
+
+def _encode_length(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = n % 128
+        n //= 128
+        out.append(byte | 0x80 if n else byte)
+        if not n:
+            return bytes(out)
+
+
+def _publish_packet(topic: str, payload: bytes, retain: bool = False) -> bytes:
+    encoded = topic.encode()
+    body = len(encoded).to_bytes(2, "big") + encoded + payload
+    return bytes((0x30 | int(retain),)) + _encode_length(len(body)) + body
+
+
+class _Session:
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.subscriptions: set[str] = set()
+        self.client_id = ""
+
+
+class MiniBroker:
+    """Брокер у власному потоці з event loop; port=0 - вільний порт"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, max_buffer: int = 256 * 1024):
+        self.host = host
+        self.port = port
+        self.max_buffer = max_buffer  # байтів у черзі підписника до відкидання
+        self._sessions: set[_Session] = set()
+        self._retained: dict[str, bytes] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._ready = Event()
+        self._thread: Optional[Thread] = None
+        self.stats = {"connections": 0, "published": 0, "delivered": 0, "dropped": 0}
+
+    # ---- Життєвий цикл ----
+
+    def start(self) -> int:
+        self._thread = Thread(target=self._run, name="mqtt-broker", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5.0)
+        logger.info(f"📡 MQTT broker: {self.host}:{self.port}")
+        return self.port
+
+    def stop(self):
+        if self._loop and self._loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=2.0)
+            except Exception as e:
+                logger.warning(f"⚠️ MQTT broker shutdown: {e}")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    async def _shutdown(self):
+        self._server.close()
+        for session in list(self._sessions):
+            session.writer.close()
+        # Закриті з'єднання завершують обробники через EOF
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=1.0)
+            for task in pending:
+                task.cancel()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            self._loop.close()
+
+    # ---- Протокол ----
+
+    async def _read_packet(self, reader: asyncio.StreamReader) -> tuple[int, int, bytes]:
+        header = (await reader.readexactly(1))[0]
+        length, multiplier = 0, 1
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            length += (byte & 0x7F) * multiplier
+            if not byte & 0x80:
+                break
+            multiplier *= 128
+        body = await reader.readexactly(length) if length else b""
+        return header >> 4, header & 0x0F, body
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = _Session(writer)
+        self.stats["connections"] += 1
+        try:
+            while True:
+                kind, flags, body = await self._read_packet(reader)
+                if kind == CONNECT:
+                    self._sessions.add(session)
+                    writer.write(b"\x20\x02\x00\x00")
+                elif kind == PUBLISH:
+                    self._on_publish(session, flags, body)
+                elif kind == PUBREL:
+                    writer.write(b"\x70\x02" + body[:2])
+                elif kind == SUBSCRIBE:
+                    self._on_subscribe(session, body)
+                elif kind == UNSUBSCRIBE:
+                    pos = 2
+                    while pos < len(body):
+                        size = int.from_bytes(body[pos:pos + 2], "big")
+                        session.subscriptions.discard(body[pos + 2:pos + 2 + size].decode())
+                        pos += 2 + size
+                    writer.write(b"\xb0\x02" + body[:2])
+                elif kind == PINGREQ:
+                    writer.write(b"\xd0\x00")
+                elif kind == DISCONNECT:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._sessions.discard(session)
+            writer.close()
+
+    def _on_publish(self, session: _Session, flags: int, body: bytes):
+        qos = (flags >> 1) & 0x03
+        retain = bool(flags & 0x01)
+        size = int.from_bytes(body[:2], "big")
+        topic = body[2:2 + size].decode()
+        pos = 2 + size
+        if qos:
+            packet_id = body[pos:pos + 2]
+            pos += 2
+            session.writer.write((b"\x40\x02" if qos == 1 else b"\x50\x02") + packet_id)
+        payload = body[pos:]
+        self.stats["published"] += 1
+
+        if retain:
+            if payload:
+                self._retained[topic] = payload
+            else:
+                self._retained.pop(topic, None)
+
+        packet = _publish_packet(topic, payload)
+        for other in list(self._sessions):
+            if any(topic_matches(p, topic) for p in other.subscriptions):
+                self._deliver(other, packet)
+
+    def _on_subscribe(self, session: _Session, body: bytes):
+        packet_id = body[:2]
+        pos, granted, patterns = 2, bytearray(), []
+        while pos < len(body):
+            size = int.from_bytes(body[pos:pos + 2], "big")
+            pattern = body[pos + 2:pos + 2 + size].decode()
+            pos += 3 + size  # + байт QoS
+            session.subscriptions.add(pattern)
+            patterns.append(pattern)
+            granted.append(0)
+        session.writer.write(b"\x90" + _encode_length(2 + len(granted)) + packet_id + bytes(granted))
+        for topic, payload in self._retained.items():
+            if any(topic_matches(p, topic) for p in patterns):
+                self._deliver(session, _publish_packet(topic, payload, retain=True))
+
+    def _deliver(self, session: _Session, packet: bytes):
+        transport = session.writer.transport
+        if transport.is_closing() or transport.get_write_buffer_size() > self.max_buffer:
+            self.stats["dropped"] += 1
+            return
+        session.writer.write(packet)
+        self.stats["delivered"] += 1
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=1883)
+    args = parser.parse_args()
+
+    broker = MiniBroker(args.host, args.port)
+    broker.start()
+    try:
+        Event().wait()
+    except KeyboardInterrupt:
+        broker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+Сервіси - пласкі модулі у своїх теках (як у контейнерах), тож тести
+імпортують їх напряму: detection_schema з app/, sinks і tracker з
+yolo-detection/. Імена модулів у цих теках не перетинаються.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for service in ("app", "yolo-detection"):
+    path = os.path.join(ROOT, service)
+    if path not in sys.path:
+        sys.path.insert(0, path)
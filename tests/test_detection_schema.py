@@ -0,0 +1,111 @@
+"""Схема arm/vision/objects: енкодер детектора (sinks) ↔ декодер app (detection_schema)"""
+
+import json
+
+import numpy as np
+import pytest
+
+import detection_schema
+from calibration import WORLD_RECORD
+from sinks import SCHEMA_HEADER, SCHEMA_MAGIC, SCHEMA_VERSIONS, DetectionEncoder, encode_json
+from tracker import TRACK_RECORD
+from yolo_engine import DETECTION_RECORD
+
+RECORDS = [(DETECTION_RECORD, 1), (TRACK_RECORD, 2), (WORLD_RECORD, 3)]
+
+
+def filled(record: np.dtype, n: int) -> np.ndarray:
+    """Записи з різними значеннями в кожному полі"""
+    out = np.zeros(n, dtype=record)
+    for k, name in enumerate(record.names):
+        if out[name].dtype.kind == "f":
+            out[name] = np.arange(n, dtype=np.float32) * 0.01 + k * 0.1
+        else:
+            out[name] = np.arange(n) + k + 1
+    return out
+
+
+def test_header_matches_app():
+    assert SCHEMA_HEADER.format == detection_schema.HEADER.format
+    assert SCHEMA_HEADER.size == 16
+    assert SCHEMA_MAGIC == detection_schema.MAGIC
+
+
+@pytest.mark.parametrize("record, version", RECORDS)
+def test_record_layout_matches_app(record, version):
+    assert SCHEMA_VERSIONS[record] == version
+    assert record.descr == detection_schema.RECORDS[version].descr
+    assert record.itemsize == detection_schema.RECORDS[version].itemsize
+
+
+@pytest.mark.parametrize("record, version", RECORDS)
+def test_binary_round_trip(record, version):
+    objects = filled(record, 5)
+    payload = DetectionEncoder(max_detections=8, record=record).encode(objects, 1234.5, 7.25)
+
+    message = detection_schema.decode(payload)
+    assert message.version == version
+    assert message.timestamp == 1234.5
+    assert message.inference_ms == 7.25
+    assert len(message.objects) == 5
+    for name in record.names:
+        np.testing.assert_array_equal(message.objects[name], objects[name])
+
+
+def test_encoder_truncates_to_max_detections():
+    objects = filled(TRACK_RECORD, 10)
+    payload = DetectionEncoder(max_detections=4, record=TRACK_RECORD).encode(objects, 0.0, 0.0)
+    message = detection_schema.decode_binary(payload)
+    assert len(message.objects) == 4
+    np.testing.assert_array_equal(message.objects["track_id"], objects["track_id"][:4])
+
+
+def test_empty_message():
+    payload = DetectionEncoder(record=WORLD_RECORD).encode(np.zeros(0, dtype=WORLD_RECORD), 1.0, 0.0)
+    assert len(payload) == SCHEMA_HEADER.size
+    assert len(detection_schema.decode(payload).objects) == 0
+
+
+def test_encoder_buffer_reuse_does_not_leak_previous_frame():
+    encoder = DetectionEncoder(max_detections=8, record=TRACK_RECORD)
+    encoder.encode(filled(TRACK_RECORD, 6), 0.0, 0.0)
+    message = detection_schema.decode(encoder.encode(filled(TRACK_RECORD, 2), 1.0, 0.0))
+    assert len(message.objects) == 2
+
+
+def test_truncated_and_unknown_payloads_rejected():
+    payload = DetectionEncoder(record=TRACK_RECORD).encode(filled(TRACK_RECORD, 3), 0.0, 0.0)
+    with pytest.raises(ValueError):
+        detection_schema.decode_binary(payload[:-1])
+    with pytest.raises(ValueError):
+        detection_schema.decode_binary(payload[:10])
+    unknown = bytearray(payload)
+    unknown[1] = 99
+    with pytest.raises(ValueError):
+        detection_schema.decode_binary(bytes(unknown))
+
+
+@pytest.mark.parametrize("record", [TRACK_RECORD, WORLD_RECORD])
+def test_json_round_trip(record):
+    objects = filled(record, 3)
+    objects["class_id"] = 0
+    message = detection_schema.decode(encode_json(objects, 99.0, 3.5).encode())
+
+    assert message.version == 0
+    assert message.timestamp == 99.0
+    for name in ("x", "y", "w", "h", "confidence", "track_id", "vx", "vy", "age"):
+        np.testing.assert_allclose(message.objects[name], objects[name], rtol=1e-6)
+    if "wx" in record.names:
+        for name in ("wx", "wy", "wvx", "wvy"):
+            np.testing.assert_allclose(message.objects[name], objects[name], rtol=1e-6)
+    else:
+        # Без калібрування точки на столі немає
+        assert np.isnan(message.objects["wx"]).all()
+
+
+def test_json_is_plain_object_list():
+    payload = encode_json(filled(DETECTION_RECORD, 2), 1.0, 2.0)
+    data = json.loads(payload)
+    assert data["timestamp"] == 1.0
+    assert len(data["objects"]) == 2
+    assert not detection_schema.is_binary(payload.encode())
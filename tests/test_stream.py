@@ -0,0 +1,47 @@
+"""StreamHub: кадр для першого підписника після простою"""
+
+import asyncio
+
+from stream import StreamHub
+
+
+class Snapshot:
+    """Знімок стану з керованим тіком; None - стану ще немає"""
+
+    def __init__(self):
+        self.tick = 0
+        self.ready = True
+
+    def __call__(self):
+        return (self.tick, {"tick": self.tick}) if self.ready else None
+
+
+def first_frame(hub, timeout=0.2):
+    async def run():
+        subscriber = hub.subscribe("websocket", 50.0)
+        try:
+            frame, _ = await asyncio.wait_for(subscriber.next_frame(hub), timeout)
+            return frame
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            hub.unsubscribe(subscriber)
+    return asyncio.run(run())
+
+
+def test_first_subscriber_after_idle_gets_fresh_snapshot():
+    snapshot = Snapshot()
+    hub = StreamHub(snapshot)
+    assert first_frame(hub) == '{"tick":0}'
+
+    snapshot.tick = 42  # control loop працював, поки підписників не було
+    assert first_frame(hub) == '{"tick":42}'
+
+
+def test_stale_frame_not_served_without_snapshot():
+    snapshot = Snapshot()
+    hub = StreamHub(snapshot)
+    assert first_frame(hub) == '{"tick":0}'
+
+    snapshot.ready = False
+    assert first_frame(hub) is None  # старий кадр не віддається - чекаємо наступного
@@ -0,0 +1,146 @@
+"""SortTracker: стабільні id, два етапи ByteTrack, старіння треків"""
+
+import numpy as np
+
+from tracker import SortTracker, greedy_assign, iou_matrix
+from yolo_engine import DETECTION_RECORD
+
+DT = 0.1
+
+
+def detections(*objects):
+    """(x, y, confidence[, class_id]) → записи DETECTION_RECORD з боксом 0.1x0.1"""
+    out = np.zeros(len(objects), dtype=DETECTION_RECORD)
+    for record, obj in zip(out, objects):
+        x, y, confidence = obj[:3]
+        record["x"], record["y"] = x, y
+        record["w"], record["h"] = 0.1, 0.1
+        record["confidence"] = confidence
+        record["class_id"] = obj[3] if len(obj) > 3 else 0
+    return out
+
+
+def ids_by_position(tracks):
+    return {(round(float(t["x"]), 2), round(float(t["y"]), 2)): int(t["track_id"]) for t in tracks}
+
+
+def test_iou_matrix_identical_disjoint_and_half():
+    a = np.array([[0.5, 0.5, 0.2, 0.2]], dtype=np.float32)
+    b = np.array([[0.5, 0.5, 0.2, 0.2], [0.9, 0.9, 0.1, 0.1], [0.6, 0.5, 0.2, 0.2]], dtype=np.float32)
+    iou = iou_matrix(a, b)
+    assert iou.shape == (1, 3)
+    np.testing.assert_allclose(iou[0], [1.0, 0.0, 1.0 / 3.0], atol=1e-5)
+
+
+def test_greedy_assign_takes_best_pairs_above_threshold():
+    cost = np.array([
+        [0.9, 0.8, 0.0],
+        [0.85, 0.1, 0.0],
+        [0.0, 0.0, 0.2],
+    ])
+    # 0-0 найкраща; рядок 1 лишається лише з 0.1 - нижче порогу, як і 2-2
+    assert greedy_assign(cost, 0.3) == [(0, 0)]
+    assert greedy_assign(np.zeros((0, 3)), 0.3) == []
+
+
+def test_ids_persist_across_reordered_detections():
+    tracker = SortTracker(min_hits=2)
+    rng = np.random.default_rng(0)
+    starts = [(0.2, 0.2), (0.5, 0.5), (0.8, 0.3)]
+    seen = {}
+    for frame in range(10):
+        objects = [(x + 0.01 * frame, y, 0.9) for x, y in starts]
+        order = rng.permutation(len(objects))
+        out = tracker.update(detections(*(objects[i] for i in order)), frame * DT)
+        if frame == 0:
+            assert len(out) == 0  # ще не підтверджені (min_hits=2)
+            continue
+        assert len(out) == 3
+        for record in out:
+            # Об'єкт впізнається за початковою точкою траєкторії
+            start = (round(float(record["x"]) - 0.01 * frame, 2), round(float(record["y"]), 2))
+            seen.setdefault(start, int(record["track_id"]))
+            assert seen[start] == int(record["track_id"])
+    assert len(set(seen.values())) == 3
+    assert tracker.created == 3
+
+
+def test_velocity_follows_motion():
+    tracker = SortTracker(min_hits=1, velocity_smoothing=1.0)
+    tracker.update(detections((0.3, 0.5, 0.9)), 0.0)
+    out = tracker.update(detections((0.32, 0.5, 0.9)), DT)
+    np.testing.assert_allclose([out[0]["vx"], out[0]["vy"]], [0.2, 0.0], atol=1e-4)
+    assert out[0]["age"] == np.float32(DT)
+
+
+def test_weak_detection_extends_track_but_does_not_create_one():
+    tracker = SortTracker(min_hits=1, high_confidence=0.5)
+    first = tracker.update(detections((0.5, 0.5, 0.9)), 0.0)
+    track_id = int(first[0]["track_id"])
+
+    # Слабка детекція на місці треку - той самий id; слабка окремо - нового треку немає
+    out = tracker.update(detections((0.5, 0.5, 0.3), (0.1, 0.9, 0.3)), DT)
+    assert [int(t["track_id"]) for t in out] == [track_id]
+    assert len(tracker.tracks) == 1
+
+
+def test_strong_detections_matched_before_weak():
+    tracker = SortTracker(min_hits=1)
+    track_id = int(tracker.update(detections((0.5, 0.5, 0.9)), 0.0)[0]["track_id"])
+    # Слабка детекція перекривається з треком сильніше, але першою зіставляється впевнена
+    out = tracker.update(detections((0.5, 0.5, 0.3), (0.53, 0.5, 0.9)), DT)
+    matched = {int(t["track_id"]): round(float(t["x"]), 2) for t in out}
+    assert matched == {track_id: 0.53}
+
+
+def test_class_change_starts_new_track():
+    tracker = SortTracker(min_hits=1)
+    first = int(tracker.update(detections((0.5, 0.5, 0.9, 0)), 0.0)[0]["track_id"])
+    out = tracker.update(detections((0.5, 0.5, 0.9, 1)), DT)
+    assert len(out) == 1 and int(out[0]["track_id"]) != first
+
+
+def test_track_expires_after_max_age_and_roi_keeps_it():
+    tracker = SortTracker(min_hits=1, max_age=0.3)
+    tracker.update(detections((0.2, 0.2, 0.9)), 0.0)
+
+    # Поза вікном ROI пропуск не рахується
+    for frame in range(1, 6):
+        tracker.update(detections(), frame * DT, window=(0.5, 0.5, 1.0, 1.0))
+    assert len(tracker.tracks) == 1
+
+    for frame in range(6, 11):
+        tracker.update(detections(), frame * DT)
+    assert len(tracker.tracks) == 0
+    assert tracker.removed == 1
+
+
+def test_ids_stable_with_new_object_appearing():
+    tracker = SortTracker(min_hits=1)
+    before = ids_by_position(tracker.update(detections((0.2, 0.2, 0.9), (0.7, 0.7, 0.9)), 0.0))
+    after = ids_by_position(tracker.update(detections((0.45, 0.45, 0.9), (0.7, 0.7, 0.9), (0.2, 0.2, 0.9)), DT))
+    assert after[(0.2, 0.2)] == before[(0.2, 0.2)]
+    assert after[(0.7, 0.7)] == before[(0.7, 0.7)]
+    assert after[(0.45, 0.45)] not in before.values()
+
+
+def test_emulated_detector_publishes_tracked_object(monkeypatch):
+    """Без моделі (емуляція) трекер підтверджує об'єкт після min_hits кадрів"""
+    import yolo_detector
+
+    monkeypatch.setattr(yolo_detector, "YOLO_BACKEND", "emulate")
+    monkeypatch.setattr(yolo_detector, "TRACKER", True)
+    monkeypatch.setattr(yolo_detector, "CALIBRATION", "")
+    detector = yolo_detector.SimpleDetector(source="synthetic", sink="null", timer_history=None,
+                                            verbose=False, realtime=False)
+    try:
+        assert detector.engine is None
+        tracker = detector.tracker
+        published = [tracker.update(detector.infer(None), frame * DT).copy() for frame in range(10)]
+    finally:
+        detector.sink.close()
+
+    assert all(len(out) == 0 for out in published[:tracker.min_hits - 1])
+    assert all(len(out) == 1 for out in published[tracker.min_hits - 1:])
+    assert {int(out[0]["track_id"]) for out in published[tracker.min_hits - 1:]} == {1}
+    assert len(tracker.tracks) == 1
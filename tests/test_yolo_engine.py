@@ -0,0 +1,62 @@
+"""Постпроцесинг YOLOv8: жадібний NMS і декодування виходу"""
+
+import numpy as np
+import pytest
+
+from yolo_engine import decode_yolov8, greedy_nms
+
+
+def xyxy(*centers, size=10.0):
+    """Квадрати size x size з центрами (cx, cy) → (K, 4) x1y1x2y2"""
+    c = np.array(centers, dtype=np.float32)
+    return np.concatenate([c - size / 2, c + size / 2], axis=1)
+
+
+@pytest.mark.parametrize("matrix_limit", [0, 96])  # IoU рядками / матриця K x K
+def test_chain_keeps_box_suppressed_only_by_suppressed_box(matrix_limit):
+    # A-B і B-C: IoU 0.67, A-C: 0.43 (нижче порогу). B пригнічено A,
+    # тож C лишається (Fast NMS відкинув би C через уже пригнічений B)
+    boxes = xyxy((0, 0), (2, 0), (4, 0))
+    keep = greedy_nms(boxes, iou_threshold=0.45, matrix_limit=matrix_limit)
+    assert keep.tolist() == [0, 2]
+
+
+@pytest.mark.parametrize("matrix_limit", [0, 96])
+def test_overlapping_boxes_below_threshold_are_kept(matrix_limit):
+    boxes = xyxy((0, 0), (6, 0), (12, 0))  # сусіди з IoU 0.25
+    assert greedy_nms(boxes, iou_threshold=0.45, matrix_limit=matrix_limit).tolist() == [0, 1, 2]
+
+
+def test_max_keep_stops_early():
+    boxes = xyxy(*[(20 * i, 0) for i in range(10)])
+    assert greedy_nms(boxes, iou_threshold=0.45, max_keep=3).tolist() == [0, 1, 2]
+
+
+def prediction(*objects, nc=2):
+    """(cx, cy, w, h, class_id, score) → вихід YOLOv8 (4 + nc, N)"""
+    pred = np.zeros((4 + nc, len(objects)), dtype=np.float32)
+    for n, (cx, cy, w, h, class_id, score) in enumerate(objects):
+        pred[:4, n] = cx, cy, w, h
+        pred[4 + class_id, n] = score
+    return pred
+
+
+def test_decode_sorts_thresholds_and_applies_class_aware_nms():
+    pred = prediction(
+        (50, 50, 10, 10, 0, 0.6),   # A
+        (52, 50, 10, 10, 0, 0.9),   # B - найвпевненіший, пригнічує A
+        (59, 50, 10, 10, 0, 0.5),   # C - перекриває лише A
+        (52, 50, 10, 10, 1, 0.8),   # той самий бокс, інший клас - лишається
+        (90, 90, 10, 10, 0, 0.1),   # нижче порогу
+    )
+    boxes, confidence, class_id = decode_yolov8(pred, conf_threshold=0.25, iou_threshold=0.45, max_detections=32)
+    np.testing.assert_allclose(confidence, [0.9, 0.8, 0.5])
+    assert class_id.tolist() == [0, 1, 0]
+    np.testing.assert_allclose(boxes[0], [47, 45, 57, 55])
+
+
+def test_decode_limits_to_max_detections():
+    pred = prediction(*[(20 * i + 10, 10, 10, 10, 0, 0.5 + 0.01 * i) for i in range(10)])
+    boxes, confidence, _ = decode_yolov8(pred, conf_threshold=0.25, iou_threshold=0.45, max_detections=4)
+    assert len(boxes) == 4
+    np.testing.assert_allclose(confidence, [0.59, 0.58, 0.57, 0.56], atol=1e-6)
@@ -2,17 +2,23 @@ import gymnasium as gym
 import numpy as np
 import pybullet as p
 import pybullet_data
+from pybullet_utils import bullet_client
 from gymnasium import spaces
 import os
 import warnings
 
+from environments.workspace import workspace_to_world
+
 warnings.filterwarnings('ignore')
 
 class RobotArmEnv(gym.Env):
     """
     6-DOF роборука з YOLO детекцією
     Observation: [joint_positions(6), yolo_target(3)]
+    yolo_target - [u, v робочої зони (environments/workspace.py), confidence]
     Action: [joint_angles(6)] в радіанах [-π, π]
+    Кожен екземпляр має власний світ PyBullet (BulletClient), тому кілька
+    середовищ в одному процесі (DummyVecEnv) не скидають одне одного.
     """
     metadata = {'render_modes': ['human', 'rgb_array']}
 
@@ -21,14 +27,15 @@ class RobotArmEnv(gym.Env):
         
         print("🚀 Ініціалізація RobotArmEnv...")
         
-        # Підключення до PyBullet
-        if render_mode == "human":
-            self.physics_client = p.connect(p.GUI)
-        else:
-            self.physics_client = p.connect(p.DIRECT)
+        # Власне підключення до PyBullet: усі виклики йдуть через self.client,
+        # а не через глобальний клієнт модуля p
+        self.client = bullet_client.BulletClient(
+            connection_mode=p.GUI if render_mode == "human" else p.DIRECT
+        )
+        self.physics_client = self.client._client
         
-        p.setAdditionalSearchPath(pybullet_data.getDataPath())
-        p.setGravity(0, 0, -9.81)
+        self.client.setAdditionalSearchPath(pybullet_data.getDataPath())
+        self.client.setGravity(0, 0, -9.81)
         
         # Action space: кути для 6 joints [-π, π]
         self.action_space = spaces.Box(
@@ -67,30 +74,30 @@ class RobotArmEnv(gym.Env):
         super().reset(seed=seed)
         
         try:
-            p.resetSimulation()
-            p.setGravity(0, 0, -9.81)
-            p.setPhysicsEngineParameter(numSubSteps=1)
+            self.client.resetSimulation()
+            self.client.setGravity(0, 0, -9.81)
+            self.client.setPhysicsEngineParameter(numSubSteps=1)
             
             # Завантаження підлоги
-            p.loadURDF("plane.urdf", [0, 0, -0.1])
+            self.client.loadURDF("plane.urdf", [0, 0, -0.1])
             
             # Завантаження робота
             if not os.path.exists(self.urdf_path):
                 raise FileNotFoundError(f"URDF не знайдено: {self.urdf_path}")
             
-            self.robot_id = p.loadURDF(
+            self.robot_id = self.client.loadURDF(
                 self.urdf_path, 
                 [0, 0, 0],
                 useFixedBase=True
             )
             
-            num_joints = p.getNumJoints(self.robot_id)
+            num_joints = self.client.getNumJoints(self.robot_id)
             
             # Випадкові початкові позиції (з безпечним діапазоном)
             for joint_id in range(min(6, num_joints)):
                 try:
                     # Припинення обмежень для цього joint
-                    info = p.getJointInfo(self.robot_id, joint_id)
+                    info = self.client.getJointInfo(self.robot_id, joint_id)
                     lower_limit = info[8]
                     upper_limit = info[9]
                     
@@ -105,7 +112,7 @@ class RobotArmEnv(gym.Env):
                     angle = self.np_random.uniform(lower_limit, upper_limit)
                     angle = np.clip(angle, -np.pi, np.pi)
                     
-                    p.resetJointState(self.robot_id, joint_id, angle, 0.0)
+                    self.client.resetJointState(self.robot_id, joint_id, angle, 0.0)
                 except Exception as e:
                     print(f"⚠️  Joint {joint_id}: {e}")
             
@@ -137,12 +144,12 @@ class RobotArmEnv(gym.Env):
             action = np.clip(action, -np.pi, np.pi)
             action = np.nan_to_num(action, nan=0.0, posinf=np.pi, neginf=-np.pi)
             
-            num_joints = p.getNumJoints(self.robot_id)
+            num_joints = self.client.getNumJoints(self.robot_id)
             
             # Застосування дій
             for joint_id in range(min(6, num_joints)):
                 try:
-                    p.setJointMotorControl2(
+                    self.client.setJointMotorControl2(
                         self.robot_id, joint_id,
                         p.POSITION_CONTROL,
                         targetPosition=float(action[joint_id]),
@@ -153,7 +160,7 @@ class RobotArmEnv(gym.Env):
                     print(f"⚠️  Motor control error joint {joint_id}: {e}")
             
             # Крок симуляції
-            p.stepSimulation()
+            self.client.stepSimulation()
             
             obs = self._get_obs()
             reward = self._compute_reward()
@@ -177,12 +184,12 @@ class RobotArmEnv(gym.Env):
     def _get_obs(self):
         """Observation: [joint_angles(6), yolo_target(3)]"""
         try:
-            num_joints = p.getNumJoints(self.robot_id)
+            num_joints = self.client.getNumJoints(self.robot_id)
             
             joint_states = []
             for i in range(min(6, num_joints)):
                 try:
-                    angle = p.getJointState(self.robot_id, i)[0]
+                    angle = self.client.getJointState(self.robot_id, i)[0]
                     angle = np.clip(float(angle), -np.pi, np.pi)
                     joint_states.append(angle)
                 except:
@@ -214,12 +221,8 @@ class RobotArmEnv(gym.Env):
             
             ee_pos = self._get_ee_pos()
             
-            # Ціль в світовій системі
-            target_world = np.array([
-                0.15 + float(self.yolo_target[0]) * 0.25,
-                -0.2 + float(self.yolo_target[1]) * 0.4,
-                0.15
-            ], dtype=np.float32)
+            # Ціль в світовій системі (u, v робочої зони - як у реальної руки після калібрування)
+            target_world = workspace_to_world(self.yolo_target[0], self.yolo_target[1])
             
             # Обчислення відстані
             distance = np.linalg.norm(ee_pos - target_world)
@@ -251,9 +254,9 @@ class RobotArmEnv(gym.Env):
     def _get_ee_pos(self):
         """Позиція end-effector"""
         try:
-            num_joints = p.getNumJoints(self.robot_id)
+            num_joints = self.client.getNumJoints(self.robot_id)
             if num_joints > 0:
-                ee_state = p.getLinkState(self.robot_id, num_joints - 1)
+                ee_state = self.client.getLinkState(self.robot_id, num_joints - 1)
                 pos = np.array(ee_state[0], dtype=np.float32)
                 pos = np.clip(pos, -10, 10)
                 return pos
@@ -266,18 +269,17 @@ class RobotArmEnv(gym.Env):
         """Успіх = близько до цілі"""
         try:
             ee_pos = self._get_ee_pos()
-            target_world = np.array([
-                0.15 + float(self.yolo_target[0]) * 0.25,
-                -0.2 + float(self.yolo_target[1]) * 0.4,
-                0.15
-            ], dtype=np.float32)
+            target_world = workspace_to_world(self.yolo_target[0], self.yolo_target[1])
             distance = np.linalg.norm(ee_pos - target_world)
             return distance < 0.05
         except:
             return False
     
     def close(self):
+        if self.client is None:
+            return
         try:
-            p.disconnect()
+            self.client.disconnect()
         except:
             pass
+        self.client = None
@@ -0,0 +1,33 @@
+"""
+Робоча зона на столі: спільна система координат симуляції і реальної руки.
+
+Ціль у спостереженні (yolo_target[0:2]) - нормовані координати робочої
+зони u, v (0..1), а не пікселі кадру: u вздовж X бази від WORKSPACE_X[0]
+до WORKSPACE_X[1], v вздовж Y. На реальній руці app отримує від детектора
+метричні wx, wy (калібрування камери) і переводить їх сюди ж.
+
+Значення мають збігатися з app/workspace.py.
+"""
+
+import numpy as np
+
+WORKSPACE_X = (0.15, 0.40)  # м, від бази вздовж X
+WORKSPACE_Y = (-0.20, 0.20)  # м, вздовж Y
+TARGET_Z = 0.15  # м, висота точки захоплення над столом
+
+
+def workspace_to_world(u: float, v: float, z: float = TARGET_Z) -> np.ndarray:
+    """Нормовані u, v робочої зони → точка в системі бази (м)"""
+    return np.array([
+        WORKSPACE_X[0] + float(u) * (WORKSPACE_X[1] - WORKSPACE_X[0]),
+        WORKSPACE_Y[0] + float(v) * (WORKSPACE_Y[1] - WORKSPACE_Y[0]),
+        z
+    ], dtype=np.float32)
+
+
+def world_to_workspace(x: float, y: float) -> tuple:
+    """Точка на столі (м) → нормовані u, v"""
+    return (
+        (x - WORKSPACE_X[0]) / (WORKSPACE_X[1] - WORKSPACE_X[0]),
+        (y - WORKSPACE_Y[0]) / (WORKSPACE_Y[1] - WORKSPACE_Y[0]),
+    )
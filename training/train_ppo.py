@@ -4,11 +4,44 @@ import torch
 import argparse
 from datetime import datetime
 from stable_baselines3 import PPO
-from stable_baselines3.common.env_util import make_vec_env
 from stable_baselines3.common.callbacks import CheckpointCallback
-from stable_baselines3.common.vec_env import VecNormalize
+from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecNormalize
 from environments.robot_arm_env import RobotArmEnv
 
+VEC_ENVS = {"subproc": SubprocVecEnv, "dummy": DummyVecEnv}
+
+
+def select_cores(count):
+    """Перші count ядер, доступних процесу (0 - усі)"""
+    if hasattr(os, "sched_getaffinity"):
+        available = sorted(os.sched_getaffinity(0))
+    else:
+        available = list(range(os.cpu_count() or 1))
+    return available[:count] if count > 0 else available
+
+
+def make_env(core=None):
+    """Фабрика RobotArmEnv для VecEnv; core - прив'язка процесу-воркера до ядра"""
+    def _init():
+        if core is not None:
+            if hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(0, {core})
+            # Воркер лише крокує фізику - потоки torch йому не потрібні
+            torch.set_num_threads(1)
+        return Monitor(RobotArmEnv())
+    return _init
+
+
+def make_envs(args, cores):
+    """subproc - середовище на процес (по ядру на воркер), dummy - усі в цьому процесі"""
+    n_envs = args.n_envs or len(cores)
+    if args.vec_env == "subproc":
+        env_fns = [make_env(cores[rank % len(cores)]) for rank in range(n_envs)]
+    else:
+        env_fns = [make_env() for _ in range(n_envs)]
+    return VEC_ENVS[args.vec_env](env_fns)
+
 def train(args):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     run_name = f"ppo_robotarm_yolo_{timestamp}"
@@ -19,8 +52,15 @@ def train(args):
     
     print(f"🚀 YOLO-aware RL training: {run_name}")
     
-    # Векторизоване середовище
-    env = make_vec_env(RobotArmEnv, n_envs=args.n_envs)
+    # Ядра: головний процес і воркери лише на обраних, torch - стільки ж потоків
+    cores = select_cores(args.cores)
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, set(cores))
+    torch.set_num_threads(args.torch_threads or len(cores))
+    
+    # Векторизоване середовище (кожен RobotArmEnv - власний світ PyBullet)
+    env = make_envs(args, cores)
+    print(f"🧵 {env.num_envs} середовищ ({args.vec_env}), ядра {cores}, потоків torch {torch.get_num_threads()}")
     env = VecNormalize(env, norm_obs=True, norm_reward=True)
     
     checkpoint_callback = CheckpointCallback(
@@ -60,6 +100,7 @@ def train(args):
     final_path = f"{models_dir}/final_model"
     model.save(final_path)
     env.save(f"{models_dir}/vec_normalize.pkl")
+    env.close()
     
     print(f"✅ Модель збережено: {final_path}")
     return final_path
@@ -67,7 +108,11 @@ def train(args):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--total-timesteps", type=int, default=500_000)
-    parser.add_argument("--n-envs", type=int, default=4)
+    parser.add_argument("--n-envs", type=int, default=0, help="0 - по середовищу на ядро")
+    parser.add_argument("--vec-env", default="subproc", choices=tuple(VEC_ENVS),
+                        help="subproc - процес на середовище, dummy - усі в одному процесі")
+    parser.add_argument("--cores", type=int, default=0, help="скільки ядер використати (0 - усі доступні)")
+    parser.add_argument("--torch-threads", type=int, default=0, help="потоки torch для оновлень PPO (0 - = ядер)")
     parser.add_argument("--lr", type=float, default=3e-4)
     parser.add_argument("--n-steps", type=int, default=2048)
     parser.add_argument("--batch-size", type=int, default=64)
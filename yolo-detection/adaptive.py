@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Адаптивний інференс детектора: повний кадр лише коли треба.
+
+- MotionGate: дешеве порівняння зменшеного сірого кадру з кадром
+  останнього інференсу; якщо сцена не змінилась - публікується попередній
+  результат без запуску моделі.
+- RoiTracker: вікно навколо останньої відстежуваної детекції; інференс
+  на вирізці (менший вхід моделі), повний кадр - періодично або коли ціль
+  загублено.
+- BudgetController: обмежує частоту детекцій до цільової і вибирає режим
+  (full / roi) за виміряною вартістю кожного.
+"""
+
+from typing import Optional
+
+import cv2
+import numpy as np
+
+MODES = ("full", "roi", "gated")
+
+
+class MotionGate:
+    """
+    Різниця зменшеного сірого кадру з опорним (кадр останнього інференсу).
+    Повільний дрейф накопичується відносно опори, тому не проскакує;
+    max_skip_s примусово пропускає кадр на інференс навіть у статиці.
+    """
+
+    def __init__(self, size: tuple = (64, 48), pixel_threshold: int = 12,
+                 min_fraction: float = 0.002, max_skip_s: float = 2.0):
+        self.size = size
+        self.pixel_threshold = pixel_threshold
+        self.min_fraction = min_fraction
+        self.max_skip_s = max_skip_s
+        w, h = size
+        self._small = np.empty((h, w, 3), dtype=np.uint8)
+        self._gray = np.empty((h, w), dtype=np.uint8)
+        self._diff = np.empty((h, w), dtype=np.uint8)
+        self._reference: Optional[np.ndarray] = None
+        self._reference_time = 0.0
+        self.fraction = 1.0      # частка змінених пікселів на останньому кадрі
+        self.skipped = 0
+
+    def changed(self, image: np.ndarray, now: float) -> bool:
+        """True - кадр треба обробити моделлю"""
+        cv2.resize(image, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        if self._reference is None or now - self._reference_time >= self.max_skip_s:
+            self.fraction = 1.0
+            return True
+        cv2.absdiff(self._gray, self._reference, dst=self._diff)
+        cv2.threshold(self._diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=self._diff)
+        self.fraction = cv2.countNonZero(self._diff) / self._diff.size
+        if self.fraction >= self.min_fraction:
+            return True
+        self.skipped += 1
+        return False
+
+    def update_reference(self, now: float):
+        """Поточний кадр (з останнього changed()) стає опорним"""
+        if self._reference is None:
+            self._reference = self._gray.copy()
+        else:
+            self._reference[...] = self._gray
+        self._reference_time = now
+
+    def reset(self):
+        self._reference = None
+
+
+class RoiTracker:
+    """
+    Ціль - детекція, найближча до попередньої (того ж класу), інакше
+    найвпевненіша. Вікно - квадрат навколо боксу з запасом margin,
+    не менший за min_size кадру.
+    """
+
+    def __init__(self, margin: float = 1.0, min_size: float = 0.35,
+                 refresh_s: float = 1.0, max_misses: int = 1):
+        self.margin = margin
+        self.min_size = min_size
+        self.refresh_s = refresh_s
+        self.max_misses = max_misses
+        self.target: Optional[tuple] = None   # (x, y, w, h, class_id) нормалізовані
+        self.misses = 0
+        self.last_full = 0.0
+        self.lost = 0
+
+    @property
+    def tracking(self) -> bool:
+        return self.target is not None
+
+    def full_due(self, now: float) -> bool:
+        return not self.tracking or now - self.last_full >= self.refresh_s
+
+    def update(self, detections: np.ndarray, mode: str, now: float):
+        if mode == "full":
+            self.last_full = now
+        if len(detections) == 0:
+            if mode == "roi":
+                self.misses += 1
+                if self.misses >= self.max_misses:
+                    self.target = None
+                    self.lost += 1
+            else:
+                self.target = None
+            return
+        self.misses = 0
+
+        index = int(np.argmax(detections["confidence"]))
+        if self.target is not None:
+            tx, ty, _, _, tclass = self.target
+            same = np.flatnonzero(detections["class_id"] == tclass)
+            if len(same):
+                dist = (detections["x"][same] - tx) ** 2 + (detections["y"][same] - ty) ** 2
+                index = int(same[np.argmin(dist)])
+        d = detections[index]
+        self.target = (float(d["x"]), float(d["y"]), float(d["w"]), float(d["h"]), int(d["class_id"]))
+
+    def window(self, frame_shape: tuple) -> tuple:
+        """Пікселі вікна (x0, y0, x1, y1) у кадрі"""
+        fh, fw = frame_shape[:2]
+        x, y, w, h, _ = self.target
+        side = max(w * fw, h * fh) * (1.0 + 2.0 * self.margin)
+        side = int(min(max(side, self.min_size * min(fw, fh)), fw, fh))
+        x0 = int(np.clip(x * fw - side / 2, 0, fw - side))
+        y0 = int(np.clip(y * fh - side / 2, 0, fh - side))
+        return x0, y0, x0 + side, y0 + side
+
+    @staticmethod
+    def to_frame(detections: np.ndarray, window: tuple, frame_shape: tuple):
+        """Нормалізовані до вирізки координати → нормалізовані до кадру (in place)"""
+        fh, fw = frame_shape[:2]
+        x0, y0, x1, y1 = window
+        sx, sy = (x1 - x0) / fw, (y1 - y0) / fh
+        detections["x"] = detections["x"] * sx + x0 / fw
+        detections["y"] = detections["y"] * sy + y0 / fh
+        detections["w"] *= sx
+        detections["h"] *= sy
+
+
+class BudgetController:
+    """
+    Цільова частота детекцій target_dps: між слотами детектор спить, а
+    не обробляє зайві кадри (камера віддасть найсвіжіший). Режим (roi="auto") - full, якщо його вартість вкладається в
+    бюджет кадру, інакше roi (коли є ціль); roi="always" - roi завжди, коли
+    є ціль; roi="off" - лише full. Вартість кожного режиму - EWMA.
+    """
+
+    def __init__(self, target_dps: float = 10.0, roi: str = "auto",
+                 headroom: float = 0.9, alpha: float = 0.2):
+        self.period = 1.0 / target_dps if target_dps > 0 else 0.0
+        self.roi = roi
+        self.headroom = headroom
+        self.alpha = alpha
+        self.cost = {mode: 0.0 for mode in MODES}
+        self.counts = {mode: 0 for mode in MODES}
+        self.busy = 0.0          # сумарний час обробки, с
+        self.started = 0.0
+        self._next = 0.0
+
+    def delay(self, now: float) -> float:
+        """Скільки чекати до слоту наступної детекції"""
+        return max(0.0, self._next - now)
+
+    def begin(self, now: float):
+        if not self.started:
+            self.started = now
+        # Пропущені слоти не накопичуються
+        self._next = max(self._next + self.period, now)
+
+    def choose(self, tracking: bool, full_due: bool) -> str:
+        if self.roi == "off" or not tracking or full_due:
+            return "full"
+        if self.roi == "auto" and (not self.period or self.cost["full"] <= self.period * self.headroom):
+            return "full"
+        return "roi"
+
+    def record(self, mode: str, seconds: float):
+        self.counts[mode] += 1
+        self.busy += seconds
+        cost = self.cost[mode]
+        self.cost[mode] = seconds if not cost else cost + self.alpha * (seconds - cost)
+
+    def summary(self, now: float) -> str:
+        published = sum(self.counts.values())
+        per_detection = self.busy / published * 1000 if published else 0.0
+        rate = published / (now - self.started) if self.started and now > self.started else 0.0
+        modes = ", ".join(f"{m} {self.counts[m]} ({self.cost[m] * 1000:.1f} ms)" for m in MODES)
+        return f"{modes} | {rate:.1f} дет/с | CPU/детекцію {per_detection:.1f} ms"
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Офлайн-бенчмарк детектора без камери і брокера: той самий SimpleDetector,
+джерело - відео / тека / синтетика, приймач - null або JSONL.
+
+Звіт - латентність стадій (p50/p90/p99, середнє) і пропускна здатність:
+decode, preprocess, inference, postprocess (YoloEngine), detect (увесь
+інференс з гейтом/ROI), track, publish (серіалізація), total.
+Результат зберігається в JSON; --compare порівнює з попереднім (напр.
+з іншого коміту) і з --fail-on ненульовий код виходу при регресії.
+
+    python bench.py --source synthetic --frames 500 --out bench.json
+    python bench.py --source video:clip.mp4 --model models/yolov8n.tflite --compare bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import subprocess
+
+# Адаптивні режими за замовчуванням вимкнені: міряється кожен кадр повністю
+BENCH_DEFAULTS = {
+    "TARGET_DPS": "0",
+    "MOTION_GATE": "0",
+    "ROI_MODE": "off",
+    "STATS_LOG_S": "1e9",
+    "CALIBRATION": "",
+}
+
+ENGINE_STAGES = ("preprocess", "inference", "postprocess")
+REPORT_STAGES = ("decode", "preprocess", "inference", "postprocess", "detect", "track", "map", "publish", "total")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def run(args) -> dict:
+    import yolo_detector
+
+    detector = yolo_detector.SimpleDetector(source=args.source, sink=args.sink,
+                                            timer_history=None, verbose=False, realtime=False)
+    if args.warmup:
+        detector.detect_loop(max_frames=args.warmup, close=False)
+        # Лічильники і таймери - лише виміряна частина
+        detector.running = True
+        detector.budget.counts = dict.fromkeys(detector.budget.counts, 0)
+        detector.timer = yolo_detector.StageTimer(yolo_detector.STAGES, history=None)
+        if detector.engine is not None:
+            detector.engine.timer = yolo_detector.StageTimer(ENGINE_STAGES, history=None)
+
+    started = time.perf_counter()
+    frames = detector.detect_loop(max_frames=args.frames)
+    wall = time.perf_counter() - started
+
+    stages = dict(detector.timer.percentiles())
+    if detector.engine is not None:
+        stages.update(detector.engine.timer.percentiles())
+    for stats in stages.values():
+        stats["throughput_fps"] = round(1000.0 / stats["mean_ms"], 1) if stats["mean_ms"] else None
+
+    return {
+        "commit": git_commit(),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+        "config": {
+            "source": args.source,
+            "sink": args.sink,
+            "model": os.getenv("YOLO_MODEL"),
+            "backend": "tflite" if detector.engine is not None else "emulate",
+            "threads": yolo_detector.YOLO_THREADS,
+            "tracker": yolo_detector.TRACKER,
+            "format": yolo_detector.DETECTION_FORMAT,
+            "calibration": yolo_detector.CALIBRATION,
+        },
+        "frames": frames,
+        "wall_s": round(wall, 3),
+        "fps": round(frames / wall, 1) if wall else 0.0,
+        "stages": {stage: stages[stage] for stage in REPORT_STAGES if stage in stages},
+        "modes": dict(detector.budget.counts),
+    }
+
+
+def print_report(report: dict):
+    print(f"\n📊 {report['frames']} кадрів за {report['wall_s']} с → {report['fps']} FPS "
+          f"({report['config']['backend']}, commit {report['commit'] or '?'})")
+    print(f"{'стадія':<12} {'p50':>8} {'p90':>8} {'p99':>8} {'mean':>8} {'FPS':>8}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<12} {s['p50_ms']:>8.2f} {s['p90_ms']:>8.2f} {s['p99_ms']:>8.2f} "
+              f"{s['mean_ms']:>8.2f} {s['throughput_fps'] or 0:>8.1f}")
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list:
+    """Стадії, чий p50 виріс більше ніж на threshold (частка), і падіння FPS"""
+    regressions = []
+    print(f"\n🔍 Порівняння з {baseline.get('commit') or 'baseline'} (p50, ms):")
+    for stage, s in report["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base or not base["p50_ms"]:
+            continue
+        change = s["p50_ms"] / base["p50_ms"] - 1.0
+        flag = " ⚠️" if change > threshold else ""
+        print(f"  {stage:<12} {base['p50_ms']:>8.2f} → {s['p50_ms']:>8.2f} ({change:+.0%}){flag}")
+        if change > threshold:
+            regressions.append(stage)
+    if baseline.get("fps"):
+        change = report["fps"] / baseline["fps"] - 1.0
+        print(f"  {'fps':<12} {baseline['fps']:>8.1f} → {report['fps']:>8.1f} ({change:+.0%})")
+        if change < -threshold:
+            regressions.append("fps")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк детектора")
+    parser.add_argument("--source", default="synthetic",
+                        help="video:файл | images:тека | synthetic[:WxH] | шлях")
+    parser.add_argument("--sink", default="null", help="null | jsonl:файл | mqtt")
+    parser.add_argument("--frames", type=int, default=300, help="кадрів для вимірювання (0 - усе джерело)")
+    parser.add_argument("--warmup", type=int, default=10, help="кадрів прогріву (не враховуються)")
+    parser.add_argument("--model", default=None, help="YOLO_MODEL")
+    parser.add_argument("--backend", default=None, choices=("auto", "tflite", "emulate"), help="YOLO_BACKEND")
+    parser.add_argument("--threads", type=int, default=None, help="YOLO_THREADS")
+    parser.add_argument("--out", default=None, help="зберегти результат у JSON")
+    parser.add_argument("--compare", default=None, help="JSON попереднього запуску")
+    parser.add_argument("--fail-on", type=float, default=None,
+                        help="код виходу 1, якщо p50 стадії гірший більше ніж на частку (напр. 0.1)")
+    args = parser.parse_args()
+    if not args.frames and args.source.startswith("synthetic"):
+        parser.error("synthetic не має кінця - вкажіть --frames")
+
+    for name, value in BENCH_DEFAULTS.items():
+        os.environ.setdefault(name, value)
+    for name, value in (("YOLO_MODEL", args.model), ("YOLO_BACKEND", args.backend), ("YOLO_THREADS", args.threads)):
+        if value is not None:
+            os.environ[name] = str(value)
+    logging.basicConfig(level=logging.INFO)
+
+    report = run(args)
+    print_report(report)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.fail_on or 0.1)
+        if regressions and args.fail_on is not None:
+            print(f"❌ Регресія: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
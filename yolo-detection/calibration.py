@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Калібрування камери і відображення детекцій на стіл.
+
+Calibration - інтрінсики (K, дисторсія) і гомографія «неспотворений піксель
+→ точка на столі в системі бази, м»; зберігається в JSON (calibrate.py).
+
+WorkspaceMapper - у рантаймі кадр не ремапиться: undistortPoints і
+гомографія один раз рахуються для сітки точок кадру (таблиця wx, wy), а
+точки детекцій - білінійна інтерполяція таблиці одним cv2.remap на всі
+детекції кадру (точки, не пікселі зображення).
+"""
+
+import json
+import time
+import logging
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from yolo_engine import DETECTION_RECORD
+from tracker import TRACK_RECORD
+
+logger = logging.getLogger(__name__)
+
+# Запис схеми v3 (розкладка = RECORD_V3 у app/detection_schema.py): v2 + точка на столі
+WORLD_RECORD = np.dtype(TRACK_RECORD.descr + [
+    ("wx", "<f4"),   # м, система бази (app/workspace.py)
+    ("wy", "<f4"),
+    ("wvx", "<f4"),  # м/с
+    ("wvy", "<f4"),
+])
+
+ANCHORS = ("center", "bottom")
+
+
+class Calibration:
+    def __init__(self, camera_matrix: np.ndarray, dist_coeffs: np.ndarray, image_size: tuple,
+                 homography: Optional[np.ndarray] = None, rms: float = 0.0, homography_error: float = 0.0):
+        self.camera_matrix = np.asarray(camera_matrix, dtype=np.float64).reshape(3, 3)
+        self.dist_coeffs = np.asarray(dist_coeffs, dtype=np.float64).ravel()
+        self.image_size = tuple(int(v) for v in image_size)  # (w, h) кадру калібрування
+        self.homography = None if homography is None else np.asarray(homography, dtype=np.float64).reshape(3, 3)
+        self.rms = rms                            # px, похибка репроєкції інтрінсиків
+        self.homography_error = homography_error  # м, середня похибка на точках стола
+
+    @classmethod
+    def load(cls, path: str) -> "Calibration":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["camera_matrix"], data["dist_coeffs"], data["image_size"],
+                   data.get("homography"), data.get("rms", 0.0), data.get("homography_error", 0.0))
+
+    def save(self, path: str):
+        data = {
+            "image_size": list(self.image_size),
+            "camera_matrix": self.camera_matrix.tolist(),
+            "dist_coeffs": self.dist_coeffs.tolist(),
+            "homography": None if self.homography is None else self.homography.tolist(),
+            "rms": self.rms,
+            "homography_error": self.homography_error,
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+    def undistort(self, pixels: np.ndarray) -> np.ndarray:
+        """Пікселі кадру калібрування (N, 2) → неспотворені пікселі (та сама K)"""
+        points = np.asarray(pixels, dtype=np.float64).reshape(-1, 1, 2)
+        return cv2.undistortPoints(points, self.camera_matrix, self.dist_coeffs,
+                                   P=self.camera_matrix).reshape(-1, 2)
+
+    def pixel_to_world(self, pixels: np.ndarray) -> np.ndarray:
+        """Точне відображення (без таблиці): пікселі (N, 2) → точки стола (N, 2), м"""
+        if self.homography is None:
+            raise ValueError("немає гомографії стола - calibrate.py homography")
+        undistorted = self.undistort(pixels).reshape(-1, 1, 2)
+        return cv2.perspectiveTransform(undistorted, self.homography).reshape(-1, 2)
+
+
+class WorkspaceMapper:
+    """
+    map(x, y) - нормовані координати кадру (0..1) → wx, wy (м).
+    apply(detections) → записи WORLD_RECORD (view внутрішнього буфера,
+    дійсний до наступного виклику). Нормовані координати не залежать від
+    роздільності, якщо кадр має те ж поле зору, що й при калібруванні.
+
+    anchor - точка боксу на столі: center, або bottom (середина нижнього
+    краю - для камери під кутом, коли видно бік предмета).
+    """
+
+    def __init__(self, calibration: Calibration, step: int = 8, anchor: str = "center",
+                 velocity_dt: float = 0.1, max_detections: int = 64):
+        if anchor not in ANCHORS:
+            raise ValueError(f"anchor має бути одним з {ANCHORS}")
+        self.calibration = calibration
+        self.anchor = anchor
+        self.velocity_dt = velocity_dt  # с, крок для переводу швидкості кадру в м/с
+        w, h = calibration.image_size
+        self.grid = (int(np.ceil(h / step)) + 1, int(np.ceil(w / step)) + 1)  # (рядки, стовпці)
+
+        started = time.perf_counter()
+        gh, gw = self.grid
+        u, v = np.meshgrid(np.linspace(0.0, 1.0, gw), np.linspace(0.0, 1.0, gh))
+        pixels = np.stack([u.ravel() * w, v.ravel() * h], axis=1)
+        self.table = calibration.pixel_to_world(pixels).reshape(gh, gw, 2).astype(np.float32)
+        self._out = np.zeros(max_detections, dtype=WORLD_RECORD)
+        # v1/v2 - префікс розкладки v3: поля копіюються одним блоком байтів
+        self._bytes = self._out.view(np.uint8).reshape(max_detections, WORLD_RECORD.itemsize)
+        self._points = np.zeros((2, 1, 2 * max_detections), dtype=np.float32)  # gx, gy: точки і точки + v * dt
+        logger.info(f"✅ Таблиця стола {gw}x{gh} (крок {step} px, {self.table.nbytes / 1024:.0f} KB) "
+                    f"за {(time.perf_counter() - started) * 1000:.0f} ms | anchor={anchor}")
+
+    def _remap(self, gx: np.ndarray, gy: np.ndarray) -> np.ndarray:
+        """Білінійна інтерполяція в координатах сітки (1, N); поза кадром - край таблиці"""
+        return cv2.remap(self.table, gx, gy, cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)[0]
+
+    def map(self, x: np.ndarray, y: np.ndarray) -> tuple:
+        gh, gw = self.grid
+        gx = (np.asarray(x, dtype=np.float32) * (gw - 1)).reshape(1, -1)
+        gy = (np.asarray(y, dtype=np.float32) * (gh - 1)).reshape(1, -1)
+        world = self._remap(gx, gy)
+        return world[:, 0], world[:, 1]
+
+    def apply(self, detections: np.ndarray) -> np.ndarray:
+        if detections.dtype not in (DETECTION_RECORD, TRACK_RECORD):
+            raise TypeError(f"очікувались записи v1/v2, отримано {detections.dtype}")
+        n = min(len(detections), len(self._out))
+        out = self._out[:n]
+        if not n:
+            return out
+        size = detections.dtype.itemsize
+        self._bytes[:n, :size] = np.ascontiguousarray(detections[:n]).view(np.uint8).reshape(n, size)
+        self._bytes[:n, size:] = 0
+
+        gh, gw = self.grid
+        gx, gy = self._points[0, :, :2 * n], self._points[1, :, :2 * n]
+        gx[0, :n] = out["x"]
+        gy[0, :n] = out["y"] + out["h"] / 2 if self.anchor == "bottom" else out["y"]
+        # Швидкість кадру → м/с: різниця відображень точки і зсунутої на v * dt (v1 - нулі)
+        gx[0, n:] = gx[0, :n] + out["vx"] * self.velocity_dt
+        gy[0, n:] = gy[0, :n] + out["vy"] * self.velocity_dt
+        gx *= gw - 1
+        gy *= gh - 1
+        world = self._remap(gx, gy)
+        out["wx"], out["wy"] = world[:n, 0], world[:n, 1]
+        out["wvx"] = (world[n:, 0] - world[:n, 0]) / self.velocity_dt
+        out["wvy"] = (world[n:, 1] - world[:n, 1]) / self.velocity_dt
+        return out
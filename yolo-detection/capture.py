@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Захоплення кадрів в окремому потоці з семантикою «лише останній кадр».
+
+Потік безперервно вичитує камеру (драйвер тримає мінімум буферів), а
+споживач завжди отримує найсвіжіший кадр; кадри, які споживач не встиг
+забрати, відкидаються і рахуються. Між захопленням і детекцією лишається
+тільки час інференсу.
+"""
+
+import time
+import logging
+import threading
+from typing import Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FOURCC = {
+    "mjpeg": "MJPG",
+    "mjpg": "MJPG",
+    "yuyv": "YUYV",
+}
+
+
+def notify(listeners: list, frame: "Frame"):
+    """Колбеки кадру; помилка одного не зупиняє захоплення"""
+    for callback in listeners:
+        try:
+            callback(frame)
+        except Exception as e:
+            logger.warning(f"⚠️ Обробник кадру {getattr(callback, '__qualname__', callback)}: {e}")
+
+
+class Frame:
+    """Кадр з моментом захоплення і порядковим номером"""
+
+    __slots__ = ("image", "seq", "timestamp", "monotonic", "decode_s")
+
+    def __init__(self, image: np.ndarray, seq: int, timestamp: float, monotonic: float,
+                 decode_s: float = 0.0):
+        self.image = image
+        self.seq = seq
+        self.timestamp = timestamp    # time.time() захоплення - для заголовка повідомлення
+        self.monotonic = monotonic    # time.monotonic() захоплення - для віку кадру
+        self.decode_s = decode_s      # декодування кадру (MJPEG/YUYV → BGR), с
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.monotonic
+
+
+class FrameGrabber:
+    """
+    Потік захоплення: grab() + retrieve() у циклі (retrieve - декодування,
+    його час іде в кадр), слот з останнім кадром під Condition.
+
+    latest(after_seq, timeout) повертає кадр, новіший за after_seq, або None
+    за таймаутом. Після N невдалих read() поспіль камера перевідкривається.
+    subscribe(callback) - callback(frame) для кожного захопленого кадру в
+    потоці захоплення (кільце кадрів); має бути швидким.
+    """
+
+    def __init__(self, device="/dev/video0", width: int = 320, height: int = 240,
+                 fps: int = 30, pixel_format: str = "mjpeg", buffer_size: int = 1,
+                 reopen_after: int = 30):
+        self.device = device
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.pixel_format = pixel_format.lower()
+        self.buffer_size = buffer_size
+        self.reopen_after = reopen_after
+
+        self.cap: Optional[cv2.VideoCapture] = None
+        self.running = False
+        self._thread: Optional[threading.Thread] = None
+        self._cond = threading.Condition()
+        self._frame: Optional[Frame] = None
+        self._consumed = 0            # seq останнього виданого кадру
+        self._listeners = []
+
+        # Лічильники
+        self.captured = 0
+        self.dropped = 0              # захоплені, але не видані споживачу
+        self.failures = 0
+        self.reopens = 0
+        self._interval_ewma = 0.0     # період захоплення, с
+
+    def open(self) -> bool:
+        if self.cap is not None:
+            self.cap.release()
+        if isinstance(self.device, str) and self.device.startswith("/dev/video"):
+            self.cap = cv2.VideoCapture(self.device, cv2.CAP_V4L2)
+        else:
+            self.cap = cv2.VideoCapture(self.device)  # індекс камери або файл/URL
+        if not self.cap.isOpened():
+            logger.error(f"❌ Камеру {self.device} не відкрито")
+            return False
+
+        fourcc = FOURCC.get(self.pixel_format)
+        if fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        # Мінімум буферів V4L2: старі кадри не накопичуються в драйвері
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, self.buffer_size)
+
+        logger.info(f"✅ Камера {self.device}: {self.describe()}")
+        return True
+
+    def describe(self) -> str:
+        if self.cap is None:
+            return "закрита"
+        code = int(self.cap.get(cv2.CAP_PROP_FOURCC))
+        fourcc = "".join(chr((code >> 8 * i) & 0xFF) for i in range(4)).strip("\x00") or "?"
+        return (f"{int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))} "
+                f"{fourcc} @ {self.cap.get(cv2.CAP_PROP_FPS):g} FPS, "
+                f"buffers={int(self.cap.get(cv2.CAP_PROP_BUFFERSIZE))}")
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def start(self) -> "FrameGrabber":
+        if self.running:
+            # Вже працює: повторне open() звільнило б cap під потоком захоплення
+            return self
+        self.open()
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="capture", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def latest(self, after_seq: int = 0, timeout: float = 1.0) -> Optional[Frame]:
+        """Найсвіжіший кадр з seq > after_seq (чекає не довше timeout)"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self.running and (self._frame is None or self._frame.seq <= after_seq):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            frame = self._frame
+            if frame is None or frame.seq <= after_seq:
+                return None
+            if self._consumed:
+                self.dropped += frame.seq - self._consumed - 1
+            self._consumed = frame.seq
+            return frame
+
+    def stats(self) -> dict:
+        return {
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "failures": self.failures,
+            "reopens": self.reopens,
+            "capture_fps": round(1.0 / self._interval_ewma, 1) if self._interval_ewma else 0.0,
+        }
+
+    def _run(self):
+        consecutive_failures = 0
+        last = 0.0
+        while self.running:
+            if self.cap is None or not self.cap.isOpened():
+                time.sleep(1.0)
+                self.reopens += 1
+                self.open()
+                continue
+
+            ok = self.cap.grab()
+            now = time.monotonic()
+            if ok:
+                ok, image = self.cap.retrieve()
+            decode_s = time.monotonic() - now
+            if not ok:
+                self.failures += 1
+                consecutive_failures += 1
+                if consecutive_failures >= self.reopen_after:
+                    logger.warning(f"⚠️ {consecutive_failures} невдалих кадрів - перевідкриваю {self.device}")
+                    consecutive_failures = 0
+                    self.reopens += 1
+                    self.open()
+                else:
+                    time.sleep(0.01)
+                continue
+            consecutive_failures = 0
+
+            if last:
+                interval = now - last
+                self._interval_ewma = interval if not self._interval_ewma \
+                    else 0.9 * self._interval_ewma + 0.1 * interval
+            last = now
+
+            self.captured += 1
+            # retrieve() щоразу повертає новий масив - слот можна просто перепризначити
+            frame = Frame(image, self.captured, time.time(), now, decode_s)
+            with self._cond:
+                self._frame = frame
+                self._cond.notify_all()
+            notify(self._listeners, frame)
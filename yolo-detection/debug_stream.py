@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+MJPEG-потік для налагодження: кадр з боксами, id треків, вікном ROI і
+режимом інференсу.
+
+Детектор лише передає посилання на кадр і детекції в offer() - малювання
+і JPEG-кодування робить окремий потік і тільки поки підключений хоча б
+один клієнт; без глядачів потік спить і нічого не коштує. Кадр кодується
+один раз для всіх клієнтів, не частіше max_fps.
+
+    http://<orange-pi-pc>:8090/            - сторінка з потоком
+    http://<orange-pi-pc>:8090/stream.mjpg - multipart/x-mixed-replace
+    http://<orange-pi-pc>:8090/snapshot.jpg
+"""
+
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BOUNDARY = "frame"
+PAGE = b"""<!doctype html><html><head><title>yolo-detector</title></head>
+<body style="margin:0;background:#111"><img src="/stream.mjpg" style="width:100%"></body></html>"""
+MODE_COLORS = {"full": (0, 200, 0), "roi": (0, 200, 255), "gated": (160, 160, 160)}
+
+
+def annotate(image: np.ndarray, detections: np.ndarray, class_names: tuple, mode: str = "",
+             window: Optional[tuple] = None, text: str = "") -> np.ndarray:
+    """Копія кадру з боксами (нормовані x, y, w, h центру), точкою на столі, ROI і підписом"""
+    out = image.copy()
+    fh, fw = out.shape[:2]
+    color = MODE_COLORS.get(mode, (0, 200, 0))
+    tracked = detections.dtype.names is not None and "track_id" in detections.dtype.names
+    world = detections.dtype.names is not None and "wx" in detections.dtype.names
+    for d in detections:
+        x0, y0 = int((d["x"] - d["w"] / 2) * fw), int((d["y"] - d["h"] / 2) * fh)
+        x1, y1 = int((d["x"] + d["w"] / 2) * fw), int((d["y"] + d["h"] / 2) * fh)
+        cv2.rectangle(out, (x0, y0), (x1, y1), color, 2)
+        class_id = int(d["class_id"])
+        label = class_names[class_id] if class_id < len(class_names) else str(class_id)
+        if tracked:
+            label = f"#{int(d['track_id'])} {label}"
+        cv2.putText(out, f"{label} {float(d['confidence']):.2f}", (x0, max(y0 - 4, 10)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1, cv2.LINE_AA)
+        if world:
+            cv2.putText(out, f"{float(d['wx']) * 100:.1f}, {float(d['wy']) * 100:.1f} cm", (x0, min(y1 + 12, fh - 2)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.4, color, 1, cv2.LINE_AA)
+    if window is not None:
+        wx0, wy0, wx1, wy1 = window
+        cv2.rectangle(out, (int(wx0 * fw), int(wy0 * fh)), (int(wx1 * fw), int(wy1 * fh)), (255, 160, 0), 1)
+    if text:
+        cv2.putText(out, text, (4, fh - 6), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1, cv2.LINE_AA)
+    return out
+
+
+class DebugStream:
+    """
+    offer(image, detections, mode, window, text) - з циклу детекції; без
+    клієнтів повертається одразу. start() піднімає HTTP-сервер і потік
+    кодування, stop() - зупиняє.
+    """
+
+    def __init__(self, port: int = 8090, host: str = "0.0.0.0", quality: int = 70,
+                 max_fps: float = 10.0, class_names: tuple = ()):
+        self.port = port
+        self.host = host
+        self.quality = quality
+        self.max_fps = max_fps
+        self.class_names = class_names
+        self.running = False
+
+        self._cond = threading.Condition()
+        self._pending = None          # (image, detections, mode, window, text) - найсвіжіше
+        self._jpeg: Optional[bytes] = None
+        self._jpeg_seq = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._threads = []
+
+        # Лічильники
+        self.clients = 0
+        self.encoded = 0
+        self.encode_ms = 0.0          # EWMA малювання + кодування
+
+    @property
+    def watched(self) -> bool:
+        return self.clients > 0
+
+    def offer(self, image: np.ndarray, detections: np.ndarray, mode: str = "",
+              window: Optional[tuple] = None, text: str = ""):
+        if not self.clients:
+            return
+        # Кадр джерела не перевикористовується - досить посилання; детекції - view буфера
+        with self._cond:
+            self._pending = (image, detections.copy(), mode, window, text)
+            self._cond.notify_all()
+
+    def start(self) -> "DebugStream":
+        stream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                logger.debug(f"debug-stream {self.address_string()} {fmt % args}")
+
+            def do_GET(self):
+                if self.path in ("/", "/index.html"):
+                    self._send(200, "text/html", PAGE)
+                elif self.path.startswith("/stream.mjpg"):
+                    stream._serve_mjpeg(self)
+                elif self.path.startswith("/snapshot.jpg"):
+                    jpeg = stream._wait_jpeg(stream._jpeg_seq, timeout=2.0, viewer=True)
+                    if jpeg is None:
+                        self._send(503, "text/plain", "немає кадрів".encode())
+                    else:
+                        self._send(200, "image/jpeg", jpeg[1])
+                else:
+                    self._send(404, "text/plain", b"not found")
+
+            def _send(self, status: int, content_type: str, body: bytes):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.running = True
+        self._threads = [
+            threading.Thread(target=self._server.serve_forever, name="debug-http", daemon=True),
+            threading.Thread(target=self._encode_loop, name="debug-encode", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"✅ Debug MJPEG: http://{self.host}:{self.port}/ (кодування лише з клієнтами)")
+        return self
+
+    def stop(self):
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+
+    def _encode_loop(self):
+        interval = 1.0 / self.max_fps if self.max_fps else 0.0
+        next_encode = 0.0
+        while self.running:
+            with self._cond:
+                while self.running and (not self.clients or self._pending is None):
+                    self._cond.wait(1.0)
+                if not self.running:
+                    return
+            delay = next_encode - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)  # тим часом offer() замінює кадр найсвіжішим
+            with self._cond:
+                pending, self._pending = self._pending, None
+            if pending is None:
+                continue
+            next_encode = time.monotonic() + interval
+
+            started = time.perf_counter()
+            image, detections, mode, window, text = pending
+            annotated = annotate(image, detections, self.class_names, mode, window, text)
+            ok, jpeg = cv2.imencode(".jpg", annotated, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if not ok:
+                continue
+            ms = (time.perf_counter() - started) * 1000
+            self.encode_ms = ms if not self.encode_ms else 0.9 * self.encode_ms + 0.1 * ms
+            with self._cond:
+                self._jpeg = jpeg.tobytes()
+                self._jpeg_seq += 1
+                self.encoded += 1
+                self._cond.notify_all()
+
+    def _wait_jpeg(self, after_seq: int, timeout: float, viewer: bool = False) -> Optional[tuple]:
+        """(seq, jpeg) новіший за after_seq; viewer - на час очікування рахується клієнтом"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if viewer:
+                self.clients += 1
+                self._cond.notify_all()
+            try:
+                while self.running and self._jpeg_seq <= after_seq:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+                return (self._jpeg_seq, self._jpeg) if self._jpeg_seq > after_seq else None
+            finally:
+                if viewer:
+                    self.clients -= 1
+
+    def _serve_mjpeg(self, handler: BaseHTTPRequestHandler):
+        handler.send_response(200)
+        handler.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.end_headers()
+        with self._cond:
+            self.clients += 1
+            self._cond.notify_all()
+        logger.info(f"👀 Debug-клієнт {handler.address_string()} (усього {self.clients})")
+        seq = self._jpeg_seq
+        try:
+            while self.running:
+                jpeg = self._wait_jpeg(seq, timeout=5.0)
+                if jpeg is None:
+                    continue
+                seq, body = jpeg
+                handler.wfile.write(
+                    f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+                )
+                handler.wfile.write(body)
+                handler.wfile.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self._cond:
+                self.clients -= 1
+            logger.info(f"👋 Debug-клієнт відключився (лишилось {self.clients})")
+
+    def stats(self) -> dict:
+        return {"clients": self.clients, "encoded": self.encoded, "encode_ms": round(self.encode_ms, 2)}
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Кільце кадрів у /dev/shm: детектор пише кожен захоплений кадр, інші
+процеси (запис, калібрування, налагодження) читають без копіювання і без
+блокування детектора.
+
+Файл /dev/shm/<name> (mmap):
+  заголовок - magic, version, slots, height, width, channels, slot_stride,
+              state (1 - активне, 0 - закрите) і latest u64 (останній seq);
+  слоти     - seq_begin u64, seq_end u64, timestamp f64, monotonic f64,
+              далі пікселі (h, w, c) uint8, вирівняно на 64 байти.
+
+Запис - seqlock: seq_begin = seq, пікселі, seq_end = seq, latest = seq.
+Читач бере view слота, якщо seq_end == seq_begin == seq, і після
+використання перевіряє valid(frame): кадр міг бути перезаписаний, коли
+письменник обійшов кільце (через slots кадрів).
+"""
+
+import os
+import mmap
+import time
+import struct
+import logging
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SHM_DIR = "/dev/shm"
+RING_MAGIC = b"FRNG"
+RING_VERSION = 1
+RING_HEADER = struct.Struct("<4sHHIIIII")
+LATEST_OFFSET = 32
+DATA_OFFSET = 64
+SLOT_HEADER = np.dtype([
+    ("seq_begin", "<u8"),
+    ("seq_end", "<u8"),
+    ("timestamp", "<f8"),   # time.time() захоплення
+    ("monotonic", "<f8"),   # time.monotonic() захоплення (спільний для процесів)
+])
+SLOT_PIXELS = 64  # зміщення пікселів у слоті
+
+
+def ring_path(name: str) -> str:
+    return name if os.path.isabs(name) else os.path.join(SHM_DIR, name)
+
+
+def _release(buf: mmap.mmap):
+    """Закрити mmap; поки живі views кадрів - звільниться разом з ними (GC)"""
+    try:
+        buf.close()
+    except BufferError:
+        pass
+
+
+class _RingMap:
+    """Розмітка відображеного файлу: views заголовка, слотів і пікселів"""
+
+    def __init__(self, buf, slots: int, shape: tuple, stride: int):
+        self.slots = slots
+        self.shape = shape
+        self.latest = np.frombuffer(buf, dtype="<u8", count=1, offset=LATEST_OFFSET)
+        self.headers = [np.frombuffer(buf, dtype=SLOT_HEADER, count=1, offset=DATA_OFFSET + i * stride)[0]
+                        for i in range(slots)]
+        self.pixels = [np.frombuffer(buf, dtype=np.uint8, count=int(np.prod(shape)),
+                                     offset=DATA_OFFSET + i * stride + SLOT_PIXELS).reshape(shape)
+                       for i in range(slots)]
+
+
+class FrameRing:
+    """
+    Письменник. write(frame) - одна копія пікселів у слот; розмір кадру
+    змінився (перевідкриття камери) - кільце створюється наново, старі
+    читачі бачать state=0 і підключаються знову.
+    """
+
+    def __init__(self, name: str = "opi-frames", slots: int = 4):
+        self.path = ring_path(name)
+        self.slots = slots
+        self.shape = None
+        self._mmap = None
+        self._map: Optional[_RingMap] = None
+        self.written = 0
+
+    def _create(self, shape: tuple):
+        self.close()
+        h, w, c = shape
+        stride = -(-(SLOT_PIXELS + h * w * c) // 64) * 64
+        size = DATA_OFFSET + self.slots * stride
+        # Новий файл під тимчасовим ім'ям і rename - читач не побачить напівготовий заголовок
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_CREAT | os.O_TRUNC | os.O_RDWR, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            self._mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        RING_HEADER.pack_into(self._mmap, 0, RING_MAGIC, RING_VERSION, self.slots, h, w, c, stride, 1)
+        os.replace(tmp, self.path)
+        self._map = _RingMap(self._mmap, self.slots, shape, stride)
+        self.shape = shape
+        logger.info(f"✅ Кільце кадрів {self.path}: {self.slots} x {w}x{h}x{c} ({size / 1024:.0f} KB)")
+
+    def write(self, image: np.ndarray, seq: int, timestamp: float, monotonic: float):
+        shape = image.shape if image.ndim == 3 else (*image.shape, 1)
+        if shape != self.shape:
+            self._create(shape)
+        ring = self._map
+        slot = seq % ring.slots
+        header = ring.headers[slot]
+        header["seq_begin"] = seq
+        np.copyto(ring.pixels[slot], image.reshape(shape))
+        header["timestamp"] = timestamp
+        header["monotonic"] = monotonic
+        header["seq_end"] = seq
+        ring.latest[0] = seq
+        self.written += 1
+
+    def write_frame(self, frame):
+        """Колбек джерела кадрів (capture.Frame)"""
+        self.write(frame.image, frame.seq, frame.timestamp, frame.monotonic)
+
+    def close(self, unlink: bool = False):
+        if self._mmap is None:
+            return
+        self._map = None
+        struct.pack_into("<I", self._mmap, RING_HEADER.size - 4, 0)  # state = закрите
+        _release(self._mmap)
+        self._mmap = None
+        if unlink:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class RingFrame:
+    """Кадр з кільця: image - view у спільну пам'ять (лише читання)"""
+
+    __slots__ = ("image", "seq", "timestamp", "monotonic")
+
+    def __init__(self, image: np.ndarray, seq: int, timestamp: float, monotonic: float):
+        self.image = image
+        self.seq = seq
+        self.timestamp = timestamp
+        self.monotonic = monotonic
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.monotonic
+
+
+class FrameRingReader:
+    """
+    Читач: latest() - найсвіжіший кадр, next() - кожен кадр по черзі
+    (пропущені через відставання рахуються в lost). Детектор не чекає на
+    читачів - повільний читач просто втрачає кадри.
+
+        reader = FrameRingReader("opi-frames")
+        frame = reader.wait(after_seq=0, timeout=1.0)
+        ...  # frame.image - view, без копії
+        if reader.valid(frame): ...  # не перезаписаний під час обробки
+    """
+
+    def __init__(self, name: str = "opi-frames", poll_s: float = 0.002):
+        self.path = ring_path(name)
+        self.poll_s = poll_s
+        self._mmap = None
+        self._map: Optional[_RingMap] = None
+        self.last_seq = 0
+        self.lost = 0
+
+    @property
+    def attached(self) -> bool:
+        return self._map is not None
+
+    def attach(self) -> bool:
+        self.detach()
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            return False
+        try:
+            size = os.fstat(fd).st_size
+            if size < DATA_OFFSET:
+                return False
+            self._mmap = mmap.mmap(fd, size, prot=mmap.PROT_READ)
+        finally:
+            os.close(fd)
+        magic, version, slots, h, w, c, stride, state = RING_HEADER.unpack_from(self._mmap, 0)
+        if magic != RING_MAGIC or version != RING_VERSION or not state:
+            self.detach()
+            return False
+        self._map = _RingMap(self._mmap, slots, (h, w, c), stride)
+        return True
+
+    def detach(self):
+        self._map = None
+        if self._mmap is not None:
+            _release(self._mmap)
+            self._mmap = None
+
+    def _alive(self) -> bool:
+        if self._map is None:
+            return self.attach()
+        if not struct.unpack_from("<I", self._mmap, RING_HEADER.size - 4)[0]:
+            # Письменник закрив або пересоздав кільце
+            return self.attach()
+        return True
+
+    def read(self, seq: int) -> Optional[RingFrame]:
+        """Кадр seq, якщо він ще в кільці і не пишеться зараз"""
+        ring = self._map
+        if ring is None or seq <= 0:
+            return None
+        slot = seq % ring.slots
+        header = ring.headers[slot]
+        if int(header["seq_end"]) != seq:
+            return None
+        frame = RingFrame(ring.pixels[slot], seq, float(header["timestamp"]), float(header["monotonic"]))
+        if int(header["seq_begin"]) != seq:
+            return None
+        return frame
+
+    def latest(self, after_seq: int = 0) -> Optional[RingFrame]:
+        """Найсвіжіший кадр з seq > after_seq або None (не чекає)"""
+        if not self._alive():
+            return None
+        seq = int(self._map.latest[0])
+        if seq <= after_seq:
+            return None
+        frame = self.read(seq)
+        if frame is not None:
+            self.last_seq = seq
+        return frame
+
+    def next(self) -> Optional[RingFrame]:
+        """Наступний кадр після last_seq; якщо відстали більше ніж на кільце - найстаріший доступний"""
+        if not self._alive():
+            return None
+        latest = int(self._map.latest[0])
+        if latest < self.last_seq:
+            self.last_seq = 0  # кільце пересоздано, нумерація з початку
+        if latest <= self.last_seq:
+            return None
+        seq = max(self.last_seq + 1, latest - self._map.slots + 2)  # +2: слот latest+1 може вже писатись
+        if self.last_seq:
+            self.lost += seq - self.last_seq - 1
+        frame = self.read(seq)
+        self.last_seq = seq
+        return frame
+
+    def wait(self, after_seq: int = 0, timeout: float = 1.0) -> Optional[RingFrame]:
+        """latest() з опитуванням до timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            frame = self.latest(after_seq)
+            if frame is not None or time.monotonic() >= deadline:
+                return frame
+            time.sleep(self.poll_s)
+
+    def valid(self, frame: RingFrame) -> bool:
+        """True - пікселі кадру ще не перезаписані"""
+        ring = self._map
+        if ring is None:
+            return False
+        return int(ring.headers[frame.seq % ring.slots]["seq_begin"]) == frame.seq
+
+    def copy(self, frame: RingFrame) -> Optional[np.ndarray]:
+        """Копія пікселів, якщо кадр лишився цілим під час копіювання"""
+        image = frame.image.copy()
+        return image if self.valid(frame) else None
+
+    def close(self):
+        self.detach()
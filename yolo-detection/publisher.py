@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Публікація детекцій у MQTT з політиками для слабкого брокера і Wi-Fi.
+
+- every: кожен кадр, як раніше (QoS з конфігу);
+- latest: QoS 0, лише останнє значення: поки попередній пакет не пішов у
+  сокет, новий кадр замінює відкладений (старий рахується як coalesced);
+- change: latest, але кадр публікується лише коли детекції змінились
+  більше ніж на deadband, і не рідше ніж раз на heartbeat_s.
+
+Окремо, не частіше ніж раз на retain_s, остання детекція йде з retain у
+retain_topic - новий підписник отримує стан одразу.
+"""
+
+import time
+import logging
+import threading
+from typing import Callable, Optional, Union
+
+import numpy as np
+import paho.mqtt.client as mqtt
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("every", "latest", "change")
+
+
+def detections_changed(previous: Optional[np.ndarray], current: np.ndarray, deadband: float) -> bool:
+    """Кількість, класи, треки або бокс (x, y, w, h) більше ніж на deadband"""
+    if previous is None or len(previous) != len(current):
+        return True
+    if not len(current):
+        return False
+    if "track_id" in current.dtype.names:
+        # Порядок треків між кадрами не гарантовано - зіставлення за id
+        order_prev = np.argsort(previous["track_id"], kind="stable")
+        order_cur = np.argsort(current["track_id"], kind="stable")
+        previous, current = previous[order_prev], current[order_cur]
+        if np.any(previous["track_id"] != current["track_id"]):
+            return True
+    if np.any(previous["class_id"] != current["class_id"]):
+        return True
+    delta = 0.0
+    for field in ("x", "y", "w", "h"):
+        delta = max(delta, float(np.abs(previous[field] - current[field]).max()))
+    return delta > deadband
+
+
+class DetectionPublisher:
+    """
+    offer(detections, encode) вирішує, чи публікувати кадр; encode()
+    викликається лише тоді, коли payload справді потрібен.
+    """
+
+    def __init__(self, client: mqtt.Client, topic: str = "arm/vision/objects",
+                 policy: str = "latest", qos: int = 0, deadband: float = 0.01,
+                 heartbeat_s: float = 0.2, retain_topic: str = "", retain_s: float = 1.0):
+        if policy not in POLICIES:
+            raise ValueError(f"policy має бути одним з {POLICIES}")
+        self.client = client
+        self.topic = topic
+        self.policy = policy
+        self.qos = qos if policy == "every" else 0
+        self.deadband = deadband
+        self.heartbeat_s = heartbeat_s
+        self.retain_topic = retain_topic
+        self.retain_s = retain_s
+
+        self._lock = threading.Lock()
+        self._pending: Optional[bytes] = None
+        self._previous: Optional[np.ndarray] = None
+        self._last_publish = 0.0
+        self._last_retain = 0.0
+
+        # Лічильники
+        self.offered = 0
+        self.published = 0
+        self.bytes = 0
+        self.coalesced = 0      # замінені новішим кадром, поки клієнт зайнятий
+        self.suppressed = 0     # у межах deadband
+        self.heartbeats = 0
+        self.retained = 0
+        self.errors = 0         # відхилені клієнтом (немає з'єднання тощо)
+
+        client.on_publish = self._on_publish
+
+    def offer(self, detections: np.ndarray, encode: Callable[[], Union[bytes, str]]) -> bool:
+        """True - кадр опубліковано або відкладено до звільнення клієнта"""
+        self.offered += 1
+        now = time.monotonic()
+
+        if self.policy == "change":
+            if detections_changed(self._previous, detections, self.deadband):
+                self._previous = detections.copy()
+            elif now - self._last_publish >= self.heartbeat_s:
+                self.heartbeats += 1
+            else:
+                self.suppressed += 1
+                return False
+
+        payload = encode()
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self._last_publish = now
+
+        if self.policy == "every":
+            self._publish(self.topic, payload)
+        else:
+            with self._lock:
+                if self._pending is not None:
+                    self.coalesced += 1
+                    self._pending = None
+                if self.client.want_write():
+                    # Попередній пакет ще в черзі клієнта - лишаємо тільки найновіший
+                    self._pending = payload
+                else:
+                    self._publish(self.topic, payload)
+
+        if self.retain_topic and now - self._last_retain >= self.retain_s:
+            self._last_retain = now
+            self._publish(self.retain_topic, payload, retain=True)
+        return True
+
+    def _publish(self, topic: str, payload: bytes, retain: bool = False):
+        info = self.client.publish(topic, payload, qos=self.qos, retain=retain)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            self.errors += 1
+            return
+        if retain:
+            self.retained += 1
+        else:
+            self.published += 1
+            self.bytes += len(payload)
+
+    def _on_publish(self, client, userdata, mid):
+        """Мережевий потік paho: пакет пішов - відправити відкладений кадр"""
+        with self._lock:
+            payload, self._pending = self._pending, None
+        if payload is not None:
+            self._publish(self.topic, payload)
+
+    def stats(self) -> dict:
+        return {
+            "policy": self.policy,
+            "offered": self.offered,
+            "published": self.published,
+            "bytes": self.bytes,
+            "coalesced": self.coalesced,
+            "suppressed": self.suppressed,
+            "heartbeats": self.heartbeats,
+            "retained": self.retained,
+            "errors": self.errors,
+        }
+
+    def summary(self) -> str:
+        s = self.stats()
+        return (f"{s['policy']}: опубліковано {s['published']}/{s['offered']} ({s['bytes'] / 1024:.1f} KiB) | "
+                f"coalesced {s['coalesced']} | deadband {s['suppressed']} | heartbeat {s['heartbeats']} | "
+                f"retained {s['retained']} | помилок {s['errors']}")
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+INT8-квантизація YOLO на власних кадрах камери.
+
+    collect  - кадри з джерела детектора (FRAME_SOURCE) у теку: лише ті, що
+               помітно відрізняються від попереднього збереженого; останні
+               --holdout частка - окремо, для перевірки (не для калібрування);
+    quantize - full-integer квантизація SavedModel (ultralytics
+               `yolo export format=saved_model imgsz=320`) з калібруванням
+               на зібраних кадрах, той самий letterbox, що в YoloEngine;
+    report   - float і int8 TFLite на відкладених кадрах: латентність стадій
+               і узгодженість детекцій (IoU-збіг, mAP@0.5 відносно float).
+
+collect і report - на Orange Pi PC (камера, tflite_runtime, латентність саме
+цієї плати); quantize - на ПК, TensorFlow імпортується лише там.
+
+    python quantize.py collect --source camera --frames 400 --out calib/
+    python quantize.py quantize --saved-model yolov8n_saved_model --calib calib/train --out models/yolov8n_int8.tflite
+    python quantize.py report --float models/yolov8n.tflite --int8 models/yolov8n_int8.tflite --frames calib/holdout
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+
+import cv2
+import numpy as np
+
+from yolo_engine import LETTERBOX_FILL, StageTimer
+from adaptive import MotionGate
+from tracker import iou_matrix, greedy_assign
+from sources import list_images
+
+logger = logging.getLogger(__name__)
+
+YOLO_THREADS = int(os.getenv("YOLO_THREADS", 4))  # як у yolo_detector.py
+
+
+# ---------------------------------------------------------------- collect
+
+def collect(args):
+    from sources import open_source
+
+    source = open_source(args.source, frames=args.frames * args.stride,
+                         width=int(os.getenv("CAMERA_WIDTH", 320)),
+                         height=int(os.getenv("CAMERA_HEIGHT", 240)),
+                         fps=int(os.getenv("CAMERA_FPS", 30)),
+                         pixel_format=os.getenv("CAMERA_FORMAT", "mjpeg"),
+                         device=os.getenv("CAMERA_DEVICE", "/dev/video0"))
+    logger.info(f"🎥 {source.describe()}")
+    # Майже однакові кадри статичної сцени калібрування не покращують
+    gate = MotionGate(min_fraction=args.min_change, max_skip_s=float("inf"))
+
+    frames, seq, seen = [], 0, 0
+    source.start()
+    try:
+        deadline = time.monotonic() + args.timeout if args.timeout else float("inf")
+        while len(frames) < args.frames and time.monotonic() < deadline:
+            frame = source.latest(after_seq=seq, timeout=1.0)
+            if frame is None:
+                if getattr(source, "exhausted", False):
+                    break
+                continue
+            seq = frame.seq
+            seen += 1
+            if seen % args.stride or not gate.changed(frame.image, frame.monotonic):
+                continue
+            gate.update_reference(frame.monotonic)
+            frames.append(frame.image.copy())
+    finally:
+        source.stop()
+
+    if not frames:
+        raise SystemExit("❌ Жодного кадру з джерела")
+    # Відкладена частина - суцільний хвіст: сусідні кадри майже однакові,
+    # тож перемішування завищило б узгодженість
+    split = len(frames) - max(1, int(round(len(frames) * args.holdout))) if args.holdout else len(frames)
+    for name, part in (("train", frames[:split]), ("holdout", frames[split:])):
+        directory = os.path.join(args.out, name)
+        os.makedirs(directory, exist_ok=True)
+        for i, image in enumerate(part):
+            cv2.imwrite(os.path.join(directory, f"{i:05d}.jpg"), image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        logger.info(f"💾 {len(part)} кадрів → {directory}")
+    logger.info(f"✅ Зібрано {len(frames)} з {seen} кадрів (відкинуто схожих: {gate.skipped})")
+
+
+# --------------------------------------------------------------- quantize
+
+def letterbox(image: np.ndarray, size: tuple) -> np.ndarray:
+    """Як YoloEngine.letterbox: float32 RGB 0..1 (h, w, 3)"""
+    h, w = size
+    fh, fw = image.shape[:2]
+    scale = min(h / fh, w / fw)
+    nh, nw = int(round(fh * scale)), int(round(fw * scale))
+    pad_y, pad_x = (h - nh) // 2, (w - nw) // 2
+    canvas = np.full((h, w, 3), LETTERBOX_FILL, dtype=np.uint8)
+    canvas[pad_y:pad_y + nh, pad_x:pad_x + nw] = cv2.resize(image, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    return canvas[..., ::-1].astype(np.float32) / 255.0
+
+
+def saved_model_input_size(tf, path: str, fallback: int) -> tuple:
+    try:
+        signature = tf.saved_model.load(path).signatures["serving_default"]
+        spec = next(iter(signature.structured_input_signature[1].values()))
+        _, h, w, _ = spec.shape
+        if h and w:
+            return int(h), int(w)
+    except (KeyError, StopIteration, ValueError, TypeError) as e:
+        logger.warning(f"⚠️ Розмір входу не визначено з сигнатури ({e}), imgsz={fallback}")
+    return fallback, fallback
+
+
+def quantize(args):
+    try:
+        import tensorflow as tf
+    except ImportError:
+        raise SystemExit("❌ Потрібен TensorFlow (ПК / контейнер training): pip install tensorflow")
+
+    files = list_images(args.calib)
+    if not files:
+        raise SystemExit(f"❌ Немає кадрів у {args.calib} - спершу collect")
+    if len(files) > args.max_calib:
+        files = [files[i] for i in np.linspace(0, len(files) - 1, args.max_calib).astype(int)]
+    size = saved_model_input_size(tf, args.saved_model, args.imgsz)
+    logger.info(f"🔧 Калібрування: {len(files)} кадрів, вхід {size[1]}x{size[0]}")
+
+    def representative_dataset():
+        for path in files:
+            image = cv2.imread(path, cv2.IMREAD_COLOR)
+            if image is not None:
+                yield [letterbox(image, size)[None]]
+
+    converter = tf.lite.TFLiteConverter.from_saved_model(args.saved_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    if args.allow_float_ops:
+        # Оператори без int8-ядра лишаються float (повільніше, але конвертується)
+        converter.target_spec.supported_ops.append(tf.lite.OpsSet.TFLITE_BUILTINS)
+    # Вхід uint8 - пікселі камери напряму (таблиця YoloEngine); вихід float -
+    # бокси і бали класів в одному тензорі погано ділять одну шкалу int8
+    converter.inference_input_type = {"uint8": tf.uint8, "int8": tf.int8, "float32": tf.float32}[args.input_type]
+    converter.inference_output_type = {"int8": tf.int8, "float32": tf.float32}[args.output_type]
+
+    started = time.monotonic()
+    model = converter.convert()
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "wb") as f:
+        f.write(model)
+    logger.info(f"✅ INT8 модель: {args.out} ({len(model) / 1024:.0f} KB, {time.monotonic() - started:.0f} с)")
+
+
+# ----------------------------------------------------------------- report
+
+def average_precision(confidence: np.ndarray, tp: np.ndarray, positives: int) -> float:
+    """AP з усіма точками інтерполяції (як у COCO/VOC2010+)"""
+    if positives == 0:
+        return float("nan")
+    if len(confidence) == 0:
+        return 0.0
+    order = np.argsort(-confidence, kind="stable")
+    hits = np.cumsum(tp[order])
+    recall = hits / positives
+    precision = hits / np.arange(1, len(order) + 1)
+    recall = np.concatenate([[0.0], recall, [recall[-1]]])
+    precision = np.concatenate([[1.0], precision, [0.0]])
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    steps = np.flatnonzero(recall[1:] != recall[:-1])
+    return float(np.sum((recall[steps + 1] - recall[steps]) * precision[steps + 1]))
+
+
+def boxes_of(detections: np.ndarray) -> np.ndarray:
+    return np.stack([detections["x"], detections["y"], detections["w"], detections["h"]], axis=1) \
+        if len(detections) else np.zeros((0, 4), dtype=np.float32)
+
+
+class Agreement:
+    """
+    Узгодженість int8 з float (float - еталон): жадібне зіставлення за IoU
+    з однаковим класом; match_rate - частка float-детекцій, знайдених int8.
+    """
+
+    def __init__(self, iou_threshold: float = 0.5):
+        self.iou_threshold = iou_threshold
+        self.reference = 0
+        self.candidates = 0
+        self.matched_iou = []
+        self.confidence_delta = []
+        self.frames_equal = 0
+        self.frames = 0
+        self._scores = {}    # клас → [(впевненість int8, tp)]
+        self._positives = {}
+
+    def add(self, reference: np.ndarray, candidate: np.ndarray):
+        self.frames += 1
+        self.reference += len(reference)
+        self.candidates += len(candidate)
+        iou = iou_matrix(boxes_of(reference), boxes_of(candidate))
+        iou[reference["class_id"][:, None] != candidate["class_id"][None]] = 0.0
+        # greedy_assign бере IoU > порогу; межа 0.5 включно
+        pairs = greedy_assign(iou, self.iou_threshold - 1e-6)
+        tp = np.zeros(len(candidate), dtype=bool)
+        for row, col in pairs:
+            tp[col] = True
+            self.matched_iou.append(float(iou[row, col]))
+            self.confidence_delta.append(float(candidate["confidence"][col] - reference["confidence"][row]))
+        if len(pairs) == len(reference) == len(candidate):
+            self.frames_equal += 1
+
+        for class_id in np.unique(reference["class_id"]):
+            self._positives[int(class_id)] = self._positives.get(int(class_id), 0) + \
+                int(np.count_nonzero(reference["class_id"] == class_id))
+        for class_id, confidence, hit in zip(candidate["class_id"], candidate["confidence"], tp):
+            self._scores.setdefault(int(class_id), []).append((float(confidence), hit))
+
+    def summary(self) -> dict:
+        matched = len(self.matched_iou)
+        ap = {}
+        for class_id, positives in self._positives.items():
+            scores = np.array(self._scores.get(class_id, []), dtype=np.float64).reshape(-1, 2)
+            ap[class_id] = average_precision(scores[:, 0], scores[:, 1].astype(bool), positives)
+        return {
+            "frames": self.frames,
+            "reference_detections": self.reference,
+            "int8_detections": self.candidates,
+            "match_rate": matched / self.reference if self.reference else 1.0,
+            "precision": matched / self.candidates if self.candidates else 1.0,
+            "mean_iou": float(np.mean(self.matched_iou)) if matched else None,
+            "mean_confidence_delta": float(np.mean(self.confidence_delta)) if matched else None,
+            "frames_identical": self.frames_equal / self.frames if self.frames else None,
+            "map50": float(np.mean(list(ap.values()))) if ap else None,
+            "ap50": {str(k): round(v, 4) for k, v in sorted(ap.items())},
+        }
+
+
+def run_engine(engine, images: list) -> list:
+    for image in images[:3]:  # прогрів кешів
+        engine.detect(image)
+    engine.timer = StageTimer(history=None)
+    return [engine.detect(image).copy() for image in images]
+
+
+def report(args):
+    from yolo_engine import YoloEngine
+
+    files = list_images(args.frames)
+    if not files:
+        raise SystemExit(f"❌ Немає кадрів у {args.frames}")
+    images = [image for image in (cv2.imread(path, cv2.IMREAD_COLOR) for path in files) if image is not None]
+
+    results, detections = {}, {}
+    for name, path in (("float", args.float_model), ("int8", args.int8_model)):
+        engine = YoloEngine(path, num_threads=args.threads, conf_threshold=args.conf,
+                            max_detections=args.max_detections)
+        engine.load()
+        detections[name] = run_engine(engine, images)
+        results[name] = {
+            "model": path,
+            "size_kb": round(os.path.getsize(path) / 1024, 1),
+            "stages": engine.timer.percentiles(),
+        }
+        engine.interpreter = None
+
+    agreement = Agreement(args.iou)
+    for reference, candidate in zip(detections["float"], detections["int8"]):
+        agreement.add(reference, candidate)
+
+    inference = {name: r["stages"]["inference"]["p50_ms"] for name, r in results.items()}
+    out = {
+        "frames": len(images),
+        "threads": args.threads,
+        "models": results,
+        "speedup": inference["float"] / inference["int8"] if inference["int8"] else None,
+        "agreement": agreement.summary(),
+    }
+    print_report(out)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(out, f, indent=2)
+        print(f"\n💾 {args.out}")
+    if args.min_match is not None and out["agreement"]["match_rate"] < args.min_match:
+        print(f"❌ match_rate {out['agreement']['match_rate']:.3f} < {args.min_match}")
+        sys.exit(1)
+
+
+def print_report(out: dict):
+    print(f"\n📊 {out['frames']} відкладених кадрів, {out['threads']} потоків")
+    print(f"{'модель':<8} {'KB':>8} {'pre p50':>8} {'inf p50':>8} {'inf p99':>8} {'post p50':>9}")
+    for name, r in out["models"].items():
+        s = r["stages"]
+        print(f"{name:<8} {r['size_kb']:>8.0f} {s['preprocess']['p50_ms']:>8.2f} "
+              f"{s['inference']['p50_ms']:>8.2f} {s['inference']['p99_ms']:>8.2f} {s['postprocess']['p50_ms']:>9.2f}")
+    a = out["agreement"]
+    print(f"⚡ Прискорення інференсу: x{out['speedup'] or 0:.2f}")
+    print(f"🎯 Узгодженість з float: збіг {a['match_rate']:.1%}, точність {a['precision']:.1%}, "
+          f"mAP@0.5 {a['map50'] if a['map50'] is not None else float('nan'):.3f}, "
+          f"IoU {a['mean_iou'] or 0:.3f}, Δconf {a['mean_confidence_delta'] or 0:+.3f} "
+          f"({a['reference_detections']} → {a['int8_detections']} детекцій)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="INT8-квантизація YOLO на власних кадрах")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("collect", help="зібрати кадри з джерела детектора")
+    p.add_argument("--source", default=os.getenv("FRAME_SOURCE", "camera"),
+                   help="camera[:пристрій] | ring[:ім'я] (працюючий детектор) | video:файл | images:тека")
+    p.add_argument("--frames", type=int, default=400, help="скільки кадрів зберегти")
+    p.add_argument("--stride", type=int, default=5, help="розглядати кожен N-й кадр")
+    p.add_argument("--min-change", type=float, default=0.02, help="частка змінених пікселів (64x48)")
+    p.add_argument("--holdout", type=float, default=0.2, help="частка для перевірки (report)")
+    p.add_argument("--timeout", type=float, default=600, help="с; 0 - без обмеження")
+    p.add_argument("--out", default="calib")
+    p.set_defaults(func=collect)
+
+    p = commands.add_parser("quantize", help="full-integer квантизація SavedModel")
+    p.add_argument("--saved-model", required=True, help="тека ultralytics export format=saved_model")
+    p.add_argument("--calib", default="calib/train")
+    p.add_argument("--max-calib", type=int, default=300, help="кадрів калібрування (рівномірна вибірка)")
+    p.add_argument("--imgsz", type=int, default=320, help="якщо розмір не видно із сигнатури")
+    p.add_argument("--input-type", default="uint8", choices=("uint8", "int8", "float32"))
+    p.add_argument("--output-type", default="float32", choices=("float32", "int8"))
+    p.add_argument("--allow-float-ops", action="store_true", help="float для операторів без int8")
+    p.add_argument("--out", default="models/yolov8n_int8.tflite")
+    p.set_defaults(func=quantize)
+
+    p = commands.add_parser("report", help="float vs int8: латентність і узгодженість")
+    p.add_argument("--float", dest="float_model", default=os.getenv("YOLO_MODEL", "models/yolov8n.tflite"))
+    p.add_argument("--int8", dest="int8_model", required=True)
+    p.add_argument("--frames", default="calib/holdout", help="тека відкладених кадрів")
+    p.add_argument("--threads", type=int, default=YOLO_THREADS)
+    p.add_argument("--conf", type=float, default=float(os.getenv("YOLO_CONF", 0.25)))
+    p.add_argument("--max-detections", type=int, default=int(os.getenv("MAX_DETECTIONS", 32)))
+    p.add_argument("--iou", type=float, default=0.5, help="IoU збігу детекцій")
+    p.add_argument("--min-match", type=float, default=None, help="код виходу 1, якщо match_rate нижче")
+    p.add_argument("--out", default=None, help="зберегти звіт у JSON")
+    p.set_defaults(func=report)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
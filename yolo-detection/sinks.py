@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Приймачі детекцій: offer(detections, timestamp, inference_ms), stats(),
+summary(), close().
+
+- mqtt - arm/vision/objects через DetectionPublisher (політики публікації);
+- null - лише серіалізація (для бенчмарку вартості кодування);
+- jsonl - рядок JSON на кадр у файл (еталон для порівняння детекцій).
+
+Специфікація: "mqtt", "null", "jsonl:detections.jsonl".
+Тут же серіалізація бінарної схеми arm/vision/objects.
+"""
+
+import json
+import struct
+import logging
+
+import numpy as np
+import paho.mqtt.client as mqtt
+
+from yolo_engine import DETECTION_RECORD
+from tracker import TRACK_RECORD
+from calibration import WORLD_RECORD
+from publisher import DetectionPublisher
+
+logger = logging.getLogger(__name__)
+
+# Бінарна схема arm/vision/objects (розкладка = app/detection_schema.py):
+# заголовок magic u8 | version u8 | count u16 | timestamp f64 | inference_ms f32,
+# далі count записів x, y, w, h, confidence (f32), class_id u16, reserved u16 (v1)
+# або ... class_id u16, track_id u16, vx, vy, age (f32) (v2, з трекером)
+# або v2 + wx, wy, wvx, wvy (f32, м і м/с на столі) (v3, з калібруванням камери)
+SCHEMA_MAGIC = 0xD7
+SCHEMA_VERSIONS = {DETECTION_RECORD: 1, TRACK_RECORD: 2, WORLD_RECORD: 3}
+SCHEMA_HEADER = struct.Struct("<BBHdf")
+CLASS_NAMES = ("object",)  # емуляція; з моделлю - класи YoloEngine
+
+
+class DetectionEncoder:
+    """
+    Серіалізація детекцій у попередньо виділений буфер: заголовок через
+    struct.pack_into, записи - копія структурованого масиву у view буфера.
+    """
+
+    def __init__(self, max_detections: int = 32, record: np.dtype = DETECTION_RECORD):
+        self.max_detections = max_detections
+        self.record = record
+        self.version = SCHEMA_VERSIONS[record]
+        self._buf = bytearray(SCHEMA_HEADER.size + max_detections * record.itemsize)
+        self._records = np.frombuffer(self._buf, dtype=record,
+                                      count=max_detections, offset=SCHEMA_HEADER.size)
+
+    def encode(self, detections: np.ndarray, timestamp: float, inference_ms: float) -> bytes:
+        count = min(len(detections), self.max_detections)
+        SCHEMA_HEADER.pack_into(self._buf, 0, SCHEMA_MAGIC, self.version, count, timestamp, inference_ms)
+        self._records[:count] = detections[:count]
+        return bytes(self._buf[:SCHEMA_HEADER.size + count * self.record.itemsize])
+
+
+def encode_json(detections: np.ndarray, timestamp: float, inference_ms: float,
+                class_names: tuple = CLASS_NAMES) -> str:
+    """Старий JSON-формат для сумісності (з трекером - плюс track_id, vx, vy, age; з калібруванням - wx, wy, wvx, wvy)"""
+    tracked = "track_id" in detections.dtype.names
+    world = "wx" in detections.dtype.names
+    objects = []
+    for d in detections:
+        obj = {
+            "class": class_names[d["class_id"]] if d["class_id"] < len(class_names) else str(d["class_id"]),
+            "x": float(d["x"]),
+            "y": float(d["y"]),
+            "w": float(d["w"]),
+            "h": float(d["h"]),
+            "confidence": float(d["confidence"])
+        }
+        if tracked:
+            obj["track_id"] = int(d["track_id"])
+            obj["vx"] = float(d["vx"])
+            obj["vy"] = float(d["vy"])
+            obj["age"] = float(d["age"])
+        if world:
+            obj["wx"] = float(d["wx"])
+            obj["wy"] = float(d["wy"])
+            obj["wvx"] = float(d["wvx"])
+            obj["wvy"] = float(d["wvy"])
+        objects.append(obj)
+    return json.dumps({
+        "timestamp": timestamp,
+        "objects": objects,
+        "inference_time_ms": inference_ms
+    })
+
+
+class MqttSink:
+    def __init__(self, host: str = "mqtt", port: int = 1883, fmt: str = "binary",
+                 record: np.dtype = DETECTION_RECORD, max_detections: int = 32,
+                 class_names: tuple = CLASS_NAMES, **publisher):
+        self.fmt = fmt
+        self.class_names = class_names
+        self.encoder = DetectionEncoder(max_detections, record)
+        self.client = mqtt.Client()
+        self.client.connect(host, port, 60)
+        self.client.loop_start()
+        self.publisher = DetectionPublisher(self.client, **publisher)
+
+    def offer(self, detections: np.ndarray, timestamp: float, inference_ms: float) -> bool:
+        if self.fmt == "json":
+            encode = lambda: encode_json(detections, timestamp, inference_ms, self.class_names)
+        else:
+            encode = lambda: self.encoder.encode(detections, timestamp, inference_ms)
+        return self.publisher.offer(detections, encode)
+
+    def stats(self) -> dict:
+        return self.publisher.stats()
+
+    def summary(self) -> str:
+        return self.publisher.summary()
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+class NullSink:
+    """Серіалізує (щоб вартість кодування була в бенчмарку) і відкидає"""
+
+    def __init__(self, fmt: str = "binary", record: np.dtype = DETECTION_RECORD,
+                 max_detections: int = 32, class_names: tuple = CLASS_NAMES):
+        self.fmt = fmt
+        self.class_names = class_names
+        self.encoder = DetectionEncoder(max_detections, record)
+        self.published = 0
+        self.bytes = 0
+
+    def offer(self, detections: np.ndarray, timestamp: float, inference_ms: float) -> bool:
+        if self.fmt == "json":
+            payload = encode_json(detections, timestamp, inference_ms, self.class_names)
+        else:
+            payload = self.encoder.encode(detections, timestamp, inference_ms)
+        self.published += 1
+        self.bytes += len(payload)
+        return True
+
+    def stats(self) -> dict:
+        return {"published": self.published, "bytes": self.bytes}
+
+    def summary(self) -> str:
+        return f"null: {self.published} кадрів ({self.bytes / 1024:.1f} KiB)"
+
+    def close(self):
+        pass
+
+
+class JsonlSink:
+    def __init__(self, path: str, class_names: tuple = CLASS_NAMES):
+        self.path = path
+        self.class_names = class_names
+        self._file = open(path, "w")
+        self.published = 0
+
+    def offer(self, detections: np.ndarray, timestamp: float, inference_ms: float) -> bool:
+        self._file.write(encode_json(detections, timestamp, inference_ms, self.class_names))
+        self._file.write("\n")
+        self.published += 1
+        return True
+
+    def stats(self) -> dict:
+        return {"published": self.published, "path": self.path}
+
+    def summary(self) -> str:
+        return f"jsonl: {self.published} кадрів → {self.path}"
+
+    def close(self):
+        self._file.close()
+
+
+def open_sink(spec: str, fmt: str = "binary", record: np.dtype = DETECTION_RECORD,
+              max_detections: int = 32, class_names: tuple = CLASS_NAMES, **mqtt_options):
+    """Приймач за специфікацією; mqtt_options - host, port і параметри DetectionPublisher"""
+    kind, _, arg = spec.partition(":")
+    if kind == "null":
+        return NullSink(fmt, record, max_detections, class_names)
+    if kind == "jsonl":
+        return JsonlSink(arg or "detections.jsonl", class_names)
+    if kind == "mqtt":
+        return MqttSink(fmt=fmt, record=record, max_detections=max_detections,
+                        class_names=class_names, **mqtt_options)
+    raise ValueError(f"невідомий приймач: {spec} (mqtt | null | jsonl:шлях)")
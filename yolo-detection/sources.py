@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Джерела кадрів детектора з інтерфейсом FrameGrabber: start(), stop(),
+latest(after_seq, timeout) → Frame | None, subscribe(callback), stats(),
+describe().
+
+- camera - FrameGrabber (окремий потік, лише останній кадр);
+- ring - кадри працюючого детектора з кільця /dev/shm (FRAME_RING), без
+  другого відкриття камери;
+- video - відеофайл, images - тека зображень, synthetic - генератор рухомих
+  прямокутників. Офлайн-джерела віддають кожен кадр по черзі в потоці
+  споживача (без пропусків) - для бенчмарків; exhausted=True після
+  останнього кадру (якщо не loop).
+
+Специфікація: "camera", "camera:/dev/video1", "ring:opi-frames", "video:clip.mp4",
+"images:frames/", "synthetic", "synthetic:640x480" або просто шлях
+(тека → images, /dev/video* → camera, інше → video).
+"""
+
+import os
+import time
+import logging
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from capture import Frame, FrameGrabber, notify
+from frame_ring import FrameRingReader
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def list_images(path: str) -> list:
+    """Зображення теки у порядку імен"""
+    return sorted(os.path.join(path, name) for name in os.listdir(path)
+                  if name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+class OfflineSource:
+    """Основа для джерел без камери: кадр читається в latest()"""
+
+    def __init__(self, loop: bool = False, realtime: bool = False, fps: float = 30.0):
+        self.loop = loop
+        self.realtime = realtime  # видавати кадри з частотою fps, а не якнайшвидше
+        self.fps = fps
+        self.running = False
+        self.exhausted = False
+        self.captured = 0
+        self._next = 0.0
+        self._listeners = []
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self._next = time.monotonic()
+        return self
+
+    def stop(self):
+        self.running = False
+
+    def _read(self) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+    def _rewind(self) -> bool:
+        return False
+
+    def latest(self, after_seq: int = 0, timeout: float = 1.0) -> Optional[Frame]:
+        if not self.running or self.exhausted:
+            return None
+        if self.realtime:
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next = max(self._next + 1.0 / self.fps, time.monotonic())
+
+        started = time.monotonic()
+        image = self._read()
+        if image is None and self.loop and self._rewind():
+            image = self._read()
+        if image is None:
+            self.exhausted = True
+            return None
+        decode_s = time.monotonic() - started
+        self.captured += 1
+        frame = Frame(image, self.captured, time.time(), started, decode_s)
+        notify(self._listeners, frame)
+        return frame
+
+    def stats(self) -> dict:
+        return {
+            "captured": self.captured,
+            "dropped": 0,
+            "failures": 0,
+            "reopens": 0,
+            "capture_fps": self.fps if self.realtime else 0.0,
+        }
+
+
+class VideoFileSource(OfflineSource):
+    def __init__(self, path: str, loop: bool = False, realtime: bool = False):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise FileNotFoundError(f"відео не відкрито: {path}")
+        super().__init__(loop, realtime, self.cap.get(cv2.CAP_PROP_FPS) or 30.0)
+
+    def _read(self):
+        ok, image = self.cap.read()
+        return image if ok else None
+
+    def _rewind(self) -> bool:
+        return self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def stop(self):
+        super().stop()
+        self.cap.release()
+
+    def describe(self) -> str:
+        frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        return (f"відео {self.path}: {int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x"
+                f"{int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))}, {frames} кадрів @ {self.fps:g} FPS")
+
+
+class ImageDirSource(OfflineSource):
+    def __init__(self, path: str, loop: bool = False, realtime: bool = False, fps: float = 30.0):
+        self.path = path
+        self.files = list_images(path)
+        if not self.files:
+            raise FileNotFoundError(f"немає зображень у {path}")
+        self._index = 0
+        super().__init__(loop, realtime, fps)
+
+    def _read(self):
+        while self._index < len(self.files):
+            image = cv2.imread(self.files[self._index], cv2.IMREAD_COLOR)
+            self._index += 1
+            if image is not None:
+                return image
+            logger.warning(f"⚠️ Не вдалося прочитати {self.files[self._index - 1]}")
+        return None
+
+    def _rewind(self) -> bool:
+        self._index = 0
+        return True
+
+    def describe(self) -> str:
+        return f"зображення {self.path}: {len(self.files)} файлів"
+
+
+class SyntheticSource(OfflineSource):
+    """
+    Шум + рухомі прямокутники (детерміновано за seed). frames=0 - без кінця.
+    Для бенчмарку конвеєра; детекцій справжньої моделі на таких кадрах мало.
+    """
+
+    def __init__(self, width: int = 320, height: int = 240, frames: int = 0, objects: int = 2,
+                 loop: bool = False, realtime: bool = False, fps: float = 30.0, seed: int = 0):
+        self.width = width
+        self.height = height
+        self.frames = frames
+        rng = np.random.default_rng(seed)
+        self._background = rng.integers(0, 256, (height, width, 3), dtype=np.uint8) // 4 + 96
+        self._colors = rng.integers(0, 256, (objects, 3))
+        self._phase = rng.uniform(0, 2 * np.pi, objects)
+        self._index = 0
+        super().__init__(loop, realtime, fps)
+
+    def _read(self):
+        if self.frames and self._index >= self.frames:
+            return None
+        image = self._background.copy()
+        t = self._index / self.fps
+        size = min(self.width, self.height) // 5
+        for color, phase in zip(self._colors, self._phase):
+            cx = int((0.5 + 0.35 * np.cos(t + phase)) * self.width)
+            cy = int((0.5 + 0.35 * np.sin(1.3 * t + phase)) * self.height)
+            cv2.rectangle(image, (cx - size // 2, cy - size // 2), (cx + size // 2, cy + size // 2),
+                          tuple(int(c) for c in color), -1)
+        self._index += 1
+        return image
+
+    def _rewind(self) -> bool:
+        self._index = 0
+        return True
+
+    def describe(self) -> str:
+        return f"синтетика {self.width}x{self.height}, {self.frames or '∞'} кадрів"
+
+
+class RingSource:
+    """Найсвіжіший кадр з кільця іншого процесу (копія - слот перезапишеться)"""
+
+    def __init__(self, name: str = "opi-frames"):
+        self.reader = FrameRingReader(name)
+        self.running = False
+        self.captured = 0
+        self.dropped = 0
+        self._last_seq = 0
+        self._listeners = []
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def start(self):
+        self.running = True
+        return self
+
+    def stop(self):
+        self.running = False
+        self.reader.close()
+
+    def latest(self, after_seq: int = 0, timeout: float = 1.0) -> Optional[Frame]:
+        deadline = time.monotonic() + timeout
+        while self.running:
+            ring_frame = self.reader.wait(after_seq, max(0.0, deadline - time.monotonic()))
+            if ring_frame is None:
+                return None
+            started = time.monotonic()
+            image = self.reader.copy(ring_frame)
+            if image is None:
+                continue  # перезаписано під час копіювання - беремо новіший
+            if self.captured:
+                self.dropped += max(0, ring_frame.seq - self._last_seq - 1)
+            self._last_seq = ring_frame.seq
+            self.captured += 1
+            frame = Frame(image, ring_frame.seq, ring_frame.timestamp, ring_frame.monotonic,
+                          time.monotonic() - started)
+            notify(self._listeners, frame)
+            return frame
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "failures": 0,
+            "reopens": 0,
+            "capture_fps": 0.0,
+        }
+
+    def describe(self) -> str:
+        return f"кільце {self.reader.path}" + ("" if self.reader.attached else " (ще не підключено)")
+
+
+def open_source(spec: str, loop: bool = False, realtime: bool = False, frames: int = 0, **camera):
+    """Джерело за специфікацією (див. docstring модуля); camera - параметри FrameGrabber"""
+    kind, _, arg = spec.partition(":")
+    if kind not in ("camera", "ring", "video", "images", "synthetic"):
+        kind, arg = ("images" if os.path.isdir(spec)
+                     else "camera" if spec.startswith("/dev/video") or spec.isdigit()
+                     else "video"), spec
+    if kind == "camera":
+        device = arg or camera.pop("device", "/dev/video0")
+        camera.pop("device", None)
+        return FrameGrabber(int(device) if str(device).isdigit() else device, **camera)
+    if kind == "ring":
+        return RingSource(arg or "opi-frames")
+    if kind == "video":
+        return VideoFileSource(arg, loop=loop, realtime=realtime)
+    if kind == "images":
+        return ImageDirSource(arg, loop=loop, realtime=realtime)
+    width, height = (int(v) for v in arg.split("x")) if arg else (320, 240)
+    return SyntheticSource(width, height, frames=frames, loop=loop, realtime=realtime)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Легкий мультиоб'єктний трекер (SORT / ByteTrack): стабільні id об'єктів
+між кадрами, швидкість і вік треку.
+
+Прогноз - стала швидкість; матриця IoU прогнозованих боксів і детекцій
+рахується векторно, призначення жадібне за спаданням IoU у два етапи:
+спочатку впевнені детекції, потім слабкі - до треків, що лишились
+(слабка детекція продовжує трек, але новий не створює).
+"""
+
+from typing import Optional
+
+import numpy as np
+
+# Запис схеми v2 (розкладка = RECORD_V2 у app/detection_schema.py):
+# перші 24 байти збігаються з v1, reserved став track_id
+TRACK_RECORD = np.dtype([
+    ("x", "<f4"),
+    ("y", "<f4"),
+    ("w", "<f4"),
+    ("h", "<f4"),
+    ("confidence", "<f4"),
+    ("class_id", "<u2"),
+    ("track_id", "<u2"),
+    ("vx", "<f4"),   # нормовані одиниці кадру за секунду
+    ("vy", "<f4"),
+    ("age", "<f4"),  # с від появи треку
+])
+
+TRACK_STATE = np.dtype([
+    ("box", "<f4", (4,)),     # cx, cy, w, h
+    ("vel", "<f4", (2,)),
+    ("confidence", "<f4"),
+    ("class_id", "<u2"),
+    ("track_id", "<u2"),
+    ("born", "<f8"),
+    ("seen", "<f8"),          # час останнього зіставлення
+    ("hits", "<i4"),
+])
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU боксів cx, cy, w, h: (N, 4) x (M, 4) → (N, M)"""
+    ax1, ay1 = a[:, 0] - a[:, 2] / 2, a[:, 1] - a[:, 3] / 2
+    ax2, ay2 = a[:, 0] + a[:, 2] / 2, a[:, 1] + a[:, 3] / 2
+    bx1, by1 = b[:, 0] - b[:, 2] / 2, b[:, 1] - b[:, 3] / 2
+    bx2, by2 = b[:, 0] + b[:, 2] / 2, b[:, 1] + b[:, 3] / 2
+    w = np.clip(np.minimum(ax2[:, None], bx2[None]) - np.maximum(ax1[:, None], bx1[None]), 0, None)
+    h = np.clip(np.minimum(ay2[:, None], by2[None]) - np.maximum(ay1[:, None], by1[None]), 0, None)
+    inter = w * h
+    union = (a[:, 2] * a[:, 3])[:, None] + (b[:, 2] * b[:, 3])[None] - inter
+    return inter / (union + 1e-9)
+
+
+def greedy_assign(cost: np.ndarray, threshold: float) -> list:
+    """Пари (рядок, стовпець) жадібно за спаданням cost, лише cost > threshold"""
+    pairs = []
+    if cost.size == 0:
+        return pairs
+    cost = cost.copy()
+    for _ in range(min(cost.shape)):
+        index = int(np.argmax(cost))
+        row, col = divmod(index, cost.shape[1])
+        if cost[row, col] <= threshold:
+            break
+        pairs.append((row, col))
+        cost[row, :] = -1.0
+        cost[:, col] = -1.0
+    return pairs
+
+
+class SortTracker:
+    """
+    update(detections, t, window) → записи TRACK_RECORD для підтверджених
+    треків, зіставлених на цьому кадрі (view внутрішнього буфера, дійсний
+    до наступного виклику).
+
+    window - (x0, y0, x1, y1) нормованої області, яку бачив детектор (ROI):
+    треки поза нею не вважаються пропущеними.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, high_confidence: float = 0.5,
+                 max_age: float = 1.0, min_hits: int = 2, velocity_smoothing: float = 0.5,
+                 max_tracks: int = 64):
+        self.iou_threshold = iou_threshold
+        self.high_confidence = high_confidence
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.beta = velocity_smoothing
+        self.max_tracks = max_tracks
+        self.tracks = np.zeros(0, dtype=TRACK_STATE)
+        self._out = np.zeros(max_tracks, dtype=TRACK_RECORD)
+        self._next_id = 1
+        self.created = 0
+        self.removed = 0
+
+    def _new_id(self) -> int:
+        track_id = self._next_id
+        self._next_id = self._next_id % 0xFFFF + 1  # 0 - «без треку»
+        return track_id
+
+    def update(self, detections: np.ndarray, t: float, window: Optional[tuple] = None) -> np.ndarray:
+        tracks = self.tracks
+        boxes = np.stack([detections["x"], detections["y"], detections["w"], detections["h"]], axis=1) \
+            if len(detections) else np.zeros((0, 4), dtype=np.float32)
+
+        # Прогноз зі сталою швидкістю
+        predicted = tracks["box"].copy()
+        predicted[:, :2] += tracks["vel"] * (t - tracks["seen"])[:, None].astype(np.float32)
+
+        iou = iou_matrix(predicted, boxes)
+        iou[tracks["class_id"][:, None] != detections["class_id"][None]] = 0.0
+
+        # Два етапи ByteTrack: впевнені детекції, потім слабкі
+        strong = detections["confidence"] >= self.high_confidence
+        matched_tracks = np.zeros(len(tracks), dtype=bool)
+        matched_dets = np.zeros(len(detections), dtype=bool)
+        pairs = []
+        for stage in (strong, ~strong):
+            cost = np.where(stage[None] & ~matched_tracks[:, None], iou, 0.0)
+            for row, col in greedy_assign(cost, self.iou_threshold):
+                pairs.append((row, col))
+                matched_tracks[row] = True
+                matched_dets[col] = True
+
+        for row, col in pairs:
+            track = tracks[row]
+            dt = t - track["seen"]
+            if dt > 0:
+                measured = (boxes[col, :2] - track["box"][:2]) / dt
+                track["vel"] += self.beta * (measured - track["vel"])
+            track["box"] = boxes[col]
+            track["confidence"] = detections["confidence"][col]
+            track["seen"] = t
+            track["hits"] += 1
+
+        # Треки без зіставлення: видалити застарілі; поза вікном ROI - не пропуск
+        if window is not None and len(tracks):
+            x0, y0, x1, y1 = window
+            cx, cy = predicted[:, 0], predicted[:, 1]
+            outside = (cx < x0) | (cx > x1) | (cy < y0) | (cy > y1)
+            tracks["seen"][~matched_tracks & outside] = t
+        keep = matched_tracks | (t - tracks["seen"] <= self.max_age)
+        self.removed += int(np.count_nonzero(~keep))
+        published = matched_tracks[keep]
+        tracks = tracks[keep]
+
+        # Нові треки - лише з впевнених незіставлених детекцій
+        new = np.flatnonzero(~matched_dets & strong)[:max(0, self.max_tracks - len(tracks))]
+        if len(new):
+            born = np.zeros(len(new), dtype=TRACK_STATE)
+            born["box"] = boxes[new]
+            born["confidence"] = detections["confidence"][new]
+            born["class_id"] = detections["class_id"][new]
+            born["track_id"] = [self._new_id() for _ in new]
+            born["born"] = t
+            born["seen"] = t
+            born["hits"] = 1
+            tracks = np.concatenate([tracks, born])
+            published = np.concatenate([published, np.ones(len(new), dtype=bool)])
+            self.created += len(new)
+        self.tracks = tracks
+
+        # Публікуються підтверджені треки, бачені на цьому кадрі
+        visible = tracks[published & (tracks["hits"] >= self.min_hits)]
+        out = self._out[:len(visible)]
+        out["x"], out["y"] = visible["box"][:, 0], visible["box"][:, 1]
+        out["w"], out["h"] = visible["box"][:, 2], visible["box"][:, 3]
+        out["confidence"] = visible["confidence"]
+        out["class_id"] = visible["class_id"]
+        out["track_id"] = visible["track_id"]
+        out["vx"], out["vy"] = visible["vel"][:, 0], visible["vel"][:, 1]
+        out["age"] = t - visible["born"]
+        return out
+
+    def stats(self) -> dict:
+        return {
+            "tracks": len(self.tracks),
+            "confirmed": int(np.count_nonzero(self.tracks["hits"] >= self.min_hits)),
+            "created": self.created,
+            "removed": self.removed,
+        }
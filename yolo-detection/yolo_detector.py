@@ -1,91 +1,382 @@
 #!/usr/bin/env python3
 """
-YOLO Detector - Спрощена версія (емуляція детекцій)
+YOLO Detector - YOLOv8n TFLite з джерела кадрів (камера, відео, тека,
+синтетика) у приймач (MQTT arm/vision/objects, null, JSONL)
+(емуляція детекцій, якщо моделі немає)
 """
 
-import cv2
-import json
 import time
 import logging
 import os
 import numpy as np
-import paho.mqtt.client as mqtt
+
+from yolo_engine import YoloEngine, StageTimer, DETECTION_RECORD
+from adaptive import MotionGate, RoiTracker, BudgetController
+from tracker import SortTracker, TRACK_RECORD
+from sources import open_source
+from sinks import open_sink, CLASS_NAMES
+from frame_ring import FrameRing
+from debug_stream import DebugStream
+from calibration import Calibration, WorkspaceMapper, WORLD_RECORD
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DETECTION_FORMAT = os.getenv("DETECTION_FORMAT", "binary")  # binary | json
+MAX_DETECTIONS = int(os.getenv("MAX_DETECTIONS", 32))
+YOLO_BACKEND = os.getenv("YOLO_BACKEND", "auto")  # auto | tflite | emulate
+YOLO_MODEL = os.getenv("YOLO_MODEL", "/detection/models/yolov8n.tflite")
+YOLO_THREADS = int(os.getenv("YOLO_THREADS", 4))  # потоки TFLite (Orange Pi PC - 4 ядра)
+YOLO_CONF = float(os.getenv("YOLO_CONF", 0.25))  # поріг впевненості
+YOLO_IOU = float(os.getenv("YOLO_IOU", 0.45))  # поріг IoU для NMS
+YOLO_CLASSES = [int(c) for c in os.getenv("YOLO_CLASSES", "").split(",") if c.strip()]  # id класів COCO, "" - усі
+STATS_LOG_S = float(os.getenv("STATS_LOG_S", 10))  # період рядка латентності стадій
+FRAME_SOURCE = os.getenv("FRAME_SOURCE", "camera")  # camera | video:файл | images:тека | synthetic[:WxH]
+DETECTION_SINK = os.getenv("DETECTION_SINK", "mqtt")  # mqtt | null | jsonl:файл
+CAMERA_DEVICE = os.getenv("CAMERA_DEVICE", "/dev/video0")  # шлях V4L2 або індекс
+CAMERA_WIDTH = int(os.getenv("CAMERA_WIDTH", 320))
+CAMERA_HEIGHT = int(os.getenv("CAMERA_HEIGHT", 240))
+CAMERA_FPS = int(os.getenv("CAMERA_FPS", 30))
+CAMERA_FORMAT = os.getenv("CAMERA_FORMAT", "mjpeg")  # mjpeg | yuyv
+CAMERA_BUFFERS = int(os.getenv("CAMERA_BUFFERS", 1))  # буфери V4L2 (більше - старіші кадри)
+TARGET_DPS = float(os.getenv("TARGET_DPS", 10))  # цільова частота детекцій; 0 - без обмеження
+MOTION_GATE = os.getenv("MOTION_GATE", "1") == "1"  # пропуск інференсу у статичній сцені
+MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", 0.002))  # частка змінених пікселів (64x48)
+MOTION_MAX_SKIP_S = float(os.getenv("MOTION_MAX_SKIP_S", 2.0))  # інференс хоча б раз за стільки секунд
+ROI_MODE = os.getenv("ROI_MODE", "auto")  # auto (коли full не вкладається в бюджет) | always | off
+ROI_SIZE = int(os.getenv("ROI_SIZE", 160))  # вхід моделі для вирізки навколо цілі
+ROI_MODEL = os.getenv("ROI_MODEL", "")  # експорт з imgsz=ROI_SIZE; "" - YOLO_MODEL зі зміненим входом
+ROI_REFRESH_S = float(os.getenv("ROI_REFRESH_S", 1.0))  # повний кадр не рідше ніж раз за стільки секунд
+TRACKER = os.getenv("TRACKER", "1") == "1"  # id треків, швидкість і вік (схема v2); 0 - схема v1
+TRACK_MAX_AGE = float(os.getenv("TRACK_MAX_AGE", 1.0))  # с без зіставлення до видалення треку
+TRACK_MIN_HITS = int(os.getenv("TRACK_MIN_HITS", 2))  # кадрів до публікації нового треку
+TRACK_IOU = float(os.getenv("TRACK_IOU", 0.3))  # мінімальний IoU прогнозу і детекції
+PUBLISH_POLICY = os.getenv("PUBLISH_POLICY", "change")  # change | latest | every
+PUBLISH_QOS = int(os.getenv("PUBLISH_QOS", 1))  # лише для every; latest/change - QoS 0
+PUBLISH_DEADBAND = float(os.getenv("PUBLISH_DEADBAND", 0.01))  # зміна боксу (частка кадру) для публікації
+PUBLISH_HEARTBEAT_S = float(os.getenv("PUBLISH_HEARTBEAT_S", 0.2))  # публікація без змін; < TARGET_MAX_AGE app
+RETAIN_TOPIC = os.getenv("RETAIN_TOPIC", "arm/vision/objects/last")  # "" - вимкнено
+RETAIN_S = float(os.getenv("RETAIN_S", 1.0))  # період оновлення retained-копії
+FRAME_RING = os.getenv("FRAME_RING", "")  # кільце кадрів у /dev/shm для інших процесів; "" - вимкнено
+FRAME_RING_SLOTS = int(os.getenv("FRAME_RING_SLOTS", 4))  # кадрів у кільці
+DEBUG_STREAM_PORT = int(os.getenv("DEBUG_STREAM_PORT", 0))  # MJPEG з боксами; 0 - вимкнено
+DEBUG_STREAM_FPS = float(os.getenv("DEBUG_STREAM_FPS", 10))  # кодування лише з клієнтами
+CALIBRATION = os.getenv("CALIBRATION", "/detection/models/calibration.json")  # calibrate.py; немає файлу - без wx, wy
+CALIB_ANCHOR = os.getenv("CALIB_ANCHOR", "center")  # точка боксу на столі: center | bottom (камера під кутом)
+CALIB_LUT_STEP = int(os.getenv("CALIB_LUT_STEP", 8))  # крок таблиці стола, px кадру калібрування
+
+EMULATE_BOX = 0.1    # розмір боксу емуляції, частки кадру
+EMULATE_STEP = 0.005  # крок блукання центру за кадр (IoU сусідніх кадрів ~0.9)
+
+STAGES = ("decode", "detect", "track", "map", "publish", "total")
+
+
 class SimpleDetector:
-    def __init__(self, mqtt_host="mqtt", mqtt_port=1883):
-        """Емуляція YOLO детекцій"""
-        
-        # MQTT
-        self.mqtt_client = mqtt.Client()
-        self.mqtt_client.connect(mqtt_host, mqtt_port, 60)
+    def __init__(self, mqtt_host="mqtt", mqtt_port=1883, source=FRAME_SOURCE, sink=DETECTION_SINK,
+                 timer_history=300, verbose=True, realtime=True):
+        """
+        YOLOv8 детектор (або емуляція без моделі); source/sink - специфікації
+        sources/sinks, realtime=False - офлайн-джерела якнайшвидше (бенчмарк)
+        """
         
-        # Камера
-        self.cap = cv2.VideoCapture("/dev/video0")
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 320)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 240)
-        self.cap.set(cv2.CAP_PROP_FPS, 30)
+        # Джерело кадрів: камера - окремий потік захоплення, детекція бере лише останній кадр
+        self.source = open_source(
+            source,
+            realtime=realtime,
+            device=CAMERA_DEVICE,
+            width=CAMERA_WIDTH,
+            height=CAMERA_HEIGHT,
+            fps=CAMERA_FPS,
+            pixel_format=CAMERA_FORMAT,
+            buffer_size=CAMERA_BUFFERS
+        )
+        # Кільце в /dev/shm: кожен захоплений кадр для запису/калібрування без другого відкриття камери
+        self.ring = FrameRing(FRAME_RING, FRAME_RING_SLOTS) if FRAME_RING else None
+        if self.ring is not None:
+            self.source.subscribe(self.ring.write_frame)
         
         self.running = True
+        self.verbose = verbose
+        self.timer = StageTimer(STAGES, history=timer_history)
+        
+        # Трекер
+        self.tracker = SortTracker(
+            iou_threshold=TRACK_IOU,
+            max_age=TRACK_MAX_AGE,
+            min_hits=TRACK_MIN_HITS,
+            max_tracks=MAX_DETECTIONS * 2
+        ) if TRACKER else None
+        self.detections = np.zeros(1, dtype=DETECTION_RECORD)
+        # Емуляція: бокс 0.1x0.1 навколо центру, що повільно блукає - трекер його зіставляє
+        self.detections["w"] = self.detections["h"] = EMULATE_BOX
+        self._emulated_center = np.array([0.5, 0.5])
         
-        logger.info("🎥 Simple Detector ініціалізовано")
+        # Калібрування: точки детекцій → стіл (м), схема v3
+        self.mapper = self.load_mapper()
+        if self.mapper is not None:
+            record = WORLD_RECORD
+        else:
+            record = TRACK_RECORD if TRACKER else DETECTION_RECORD
+        self.class_names = CLASS_NAMES
+        
+        # Модель
+        self.engine = self.load_engine()
+        self.roi_engine = None
+        if self.engine is not None:
+            self.class_names = self.engine.class_names
+            self.roi_engine = self.load_roi_engine()
+        
+        # Адаптивний інференс
+        self.gate = MotionGate(min_fraction=MOTION_THRESHOLD, max_skip_s=MOTION_MAX_SKIP_S) if MOTION_GATE else None
+        self.roi = RoiTracker(refresh_s=ROI_REFRESH_S)
+        self.budget = BudgetController(TARGET_DPS, roi=ROI_MODE if self.roi_engine else "off")
+        self.last_detections = None
+        self.window = None  # нормована область останнього інференсу (ROI) або None
+        
+        # Приймач детекцій
+        self.sink = open_sink(
+            sink,
+            fmt=DETECTION_FORMAT,
+            record=record,
+            max_detections=MAX_DETECTIONS,
+            class_names=self.class_names,
+            host=mqtt_host,
+            port=mqtt_port,
+            policy=PUBLISH_POLICY,
+            qos=PUBLISH_QOS,
+            deadband=PUBLISH_DEADBAND,
+            heartbeat_s=PUBLISH_HEARTBEAT_S,
+            retain_topic=RETAIN_TOPIC,
+            retain_s=RETAIN_S
+        )
+        
+        self.debug = DebugStream(
+            DEBUG_STREAM_PORT,
+            max_fps=DEBUG_STREAM_FPS,
+            class_names=self.class_names
+        ) if DEBUG_STREAM_PORT else None
+        
+        mode = "YOLOv8 TFLite" if self.engine else "емуляція"
+        if self.mapper is not None:
+            mode += f", стіл {self.mapper.anchor}"
+        adaptive = f"gate={'on' if self.gate else 'off'}, roi={self.budget.roi}, {TARGET_DPS:g} дет/с"
+        logger.info(f"🎥 Detector ініціалізовано: {mode} (формат: {DETECTION_FORMAT}, {adaptive})")
     
-    def detect_loop(self):
-        """Основний цикл (емуляція детекцій)"""
-        self.mqtt_client.loop_start()
+    def load_mapper(self):
+        """WorkspaceMapper з CALIBRATION або None (детекції лише в координатах кадру)"""
+        if not CALIBRATION or not os.path.exists(CALIBRATION):
+            logger.info("📐 Калібрування камери немає - детекції без wx, wy (calibrate.py)")
+            return None
+        try:
+            calibration = Calibration.load(CALIBRATION)
+            mapper = WorkspaceMapper(calibration, step=CALIB_LUT_STEP, anchor=CALIB_ANCHOR,
+                                     max_detections=MAX_DETECTIONS * 2)
+        except (ValueError, KeyError, OSError) as e:
+            logger.warning(f"⚠️ Калібрування {CALIBRATION} не застосовано: {e}")
+            return None
+        logger.info(f"📐 Калібрування {CALIBRATION}: RMS {calibration.rms:.2f} px, "
+                    f"стіл {calibration.homography_error * 1000:.1f} мм")
+        return mapper
+    
+    def load_engine(self):
+        """YoloEngine або None (емуляція); у режимі tflite помилка завантаження фатальна"""
+        if YOLO_BACKEND == "emulate":
+            return None
+        engine = YoloEngine(
+            YOLO_MODEL,
+            num_threads=YOLO_THREADS,
+            conf_threshold=YOLO_CONF,
+            iou_threshold=YOLO_IOU,
+            max_detections=MAX_DETECTIONS,
+            classes=YOLO_CLASSES or None
+        )
+        try:
+            engine.load()
+        except Exception as e:
+            if YOLO_BACKEND == "tflite":
+                raise
+            # У репозиторії models/yolov8n.tflite - заглушка: покладіть справжній експорт ultralytics
+            logger.warning(f"⚠️ YOLO модель не завантажено ({YOLO_MODEL}: {e}) - емуляція детекцій")
+            return None
+        return engine
+    
+    def load_roi_engine(self):
+        """Менший вхід для вирізок ROI; None - ROI вимкнено"""
+        if ROI_MODE == "off":
+            return None
+        if not ROI_MODEL and min(self.engine.input_size) <= ROI_SIZE:
+            return None  # модель і так маленька - вирізка не економить
+        engine = YoloEngine(
+            ROI_MODEL or YOLO_MODEL,
+            num_threads=YOLO_THREADS,
+            conf_threshold=YOLO_CONF,
+            iou_threshold=YOLO_IOU,
+            max_detections=MAX_DETECTIONS,
+            classes=YOLO_CLASSES or None,
+            input_size=None if ROI_MODEL else (ROI_SIZE, ROI_SIZE)
+        )
+        try:
+            engine.load()
+        except Exception as e:
+            # Не кожен експорт дозволяє змінити вхід - тоді потрібен ROI_MODEL
+            logger.warning(f"⚠️ ROI модель не завантажено ({e}) - лише повний кадр")
+            return None
+        return engine
+    
+    def infer(self, frame: np.ndarray) -> np.ndarray:
+        """Детекції кадру: YOLOv8 або емуляція (один об'єкт, що повільно рухається)"""
+        if self.engine is not None:
+            return self.engine.detect(frame)
+        
+        # ЕМУЛЯЦІЯ детекції: випадкове блукання центру в межах 0.3..0.7
+        center = self._emulated_center
+        center += np.random.normal(0.0, EMULATE_STEP, 2)
+        np.clip(center, 0.3, 0.7, out=center)
+        detections = self.detections
+        detections["x"], detections["y"] = center
+        detections["confidence"] = np.random.uniform(0.7, 0.95)
+        return detections
+    
+    def run(self, image: np.ndarray, mode: str) -> np.ndarray:
+        self.window = None
+        if mode == "roi":
+            x0, y0, x1, y1 = window = self.roi.window(image.shape)
+            detections = self.roi_engine.detect(image[y0:y1, x0:x1])
+            RoiTracker.to_frame(detections, window, image.shape)
+            fh, fw = image.shape[:2]
+            self.window = (x0 / fw, y0 / fh, x1 / fw, y1 / fh)
+            return detections
+        return self.infer(image)
+    
+    def process(self, image: np.ndarray) -> tuple:
+        """
+        Один слот бюджету: (детекції, режим). Статична сцена - попередній
+        результат без інференсу; ціль загублено у ROI - повний кадр одразу.
+        """
+        now = time.monotonic()
+        changed = self.gate.changed(image, now) if self.gate else True
+        if not changed and self.last_detections is not None:
+            self.budget.record("gated", time.monotonic() - now)
+            return self.last_detections, "gated"
+        
+        mode = self.budget.choose(self.roi.tracking, self.roi.full_due(now))
+        detections = self.run(image, mode)
+        self.roi.update(detections, mode, now)
+        if mode == "roi" and len(detections) == 0:
+            self.budget.record(mode, time.monotonic() - now)
+            now = time.monotonic()
+            mode = "full"
+            detections = self.run(image, mode)
+            self.roi.update(detections, mode, now)
         
-        logger.info("🚀 Детекція запущена (емуляція)")
+        if self.gate:
+            self.gate.update_reference(now)
+        self.last_detections = detections
+        self.budget.record(mode, time.monotonic() - now)
+        return detections, mode
+    
+    def detect_loop(self, max_frames: int = 0, close: bool = True):
+        """
+        Основний цикл: кадр → детекції → приймач. max_frames - зупинка для
+        бенчмарку; close=False лишає джерело і приймач відкритими (прогрів) -
+        наступний виклик продовжує з того ж джерела, не запускаючи його вдруге
+        """
+        if not self.source.running:
+            self.source.start()
+        if self.debug is not None and not self.debug.running:
+            self.debug.start()
+        
+        logger.info("🚀 Детекція запущена")
+        next_stats = time.monotonic() + STATS_LOG_S
+        last_seq = 0
+        frame_age = 0.0
+        frames = 0
         
         try:
-            while self.running:
-                ret, frame = self.cap.read()
-                if not ret:
-                    logger.warning("⚠️ Не вдалося прочитати кадр")
-                    time.sleep(0.1)
+            while self.running and (not max_frames or frames < max_frames):
+                # Слот бюджету: до нього спимо, потім беремо найсвіжіший кадр
+                delay = self.budget.delay(time.monotonic())
+                if delay:
+                    time.sleep(delay)
+                frame = self.source.latest(last_seq, timeout=1.0)
+                if frame is None:
+                    if getattr(self.source, "exhausted", False):
+                        logger.info("🏁 Джерело кадрів вичерпано")
+                        break
+                    logger.warning("⚠️ Немає нових кадрів з камери")
                     continue
+                last_seq = frame.seq
+                frames += 1
                 
                 start_time = time.time()
+                t0 = time.perf_counter()
+                self.budget.begin(time.monotonic())
+                detections, mode = self.process(frame.image)
+                t1 = time.perf_counter()
+                if self.tracker is not None:
+                    # Статична сцена теж оновлює треки: вік росте, швидкість згасає
+                    detections = self.tracker.update(detections, frame.monotonic, self.window)
+                t2 = time.perf_counter()
+                if self.mapper is not None:
+                    detections = self.mapper.apply(detections)
+                t_map = time.perf_counter()
                 
-                # ЕМУЛЯЦІЯ детекції (випадкові координати)
-                detections = [
-                    {
-                        "class": "object",
-                        "x": np.random.uniform(0.3, 0.7),
-                        "y": np.random.uniform(0.3, 0.7),
-                        "confidence": np.random.uniform(0.7, 0.95)
-                    }
-                ]
-                
-                # MQTT публікація
-                payload = {
-                    "timestamp": time.time(),
-                    "objects": detections,
-                    "inference_time_ms": (time.time() - start_time) * 1000
-                }
+                # Публікація; timestamp - момент захоплення кадру
+                inference_ms = (time.time() - start_time) * 1000
+                frame_age = 0.9 * frame_age + 0.1 * frame.age if frame_age else frame.age
+                self.sink.offer(detections, frame.timestamp, inference_ms)
+                t3 = time.perf_counter()
+                if self.debug is not None and self.debug.watched:
+                    self.debug.offer(frame.image, detections, mode, self.window,
+                                     f"{mode} | {len(detections)} об'єктів | вік {frame.age * 1000:.0f} ms")
                 
-                self.mqtt_client.publish(
-                    "arm/vision/objects",
-                    json.dumps(payload),
-                    qos=1
-                )
+                self.timer.record("decode", frame.decode_s)
+                self.timer.record("detect", t1 - t0)
+                self.timer.record("track", t2 - t1)
+                self.timer.record("map", t_map - t2)
+                self.timer.record("publish", t3 - t_map)
+                self.timer.record("total", frame.decode_s + t3 - t0)
                 
-                print(f"📷 {len(detections)} об'єктів | " +
-                      f"FPS: {1.0/(time.time()-start_time):.1f}", 
-                      end='\r')
+                if self.verbose:
+                    print(f"📷 {len(detections)} об'єктів ({mode}) | " +
+                          f"FPS: {1.0/(time.time()-start_time):.1f}", 
+                          end='\r')
                 
-                time.sleep(0.033)  # ~30 FPS
+                # Темп задають камера (останній кадр) та інференс
+                if time.monotonic() >= next_stats:
+                    capture = self.source.stats()
+                    logger.info(f"📸 камера {capture['capture_fps']} FPS | кадрів {capture['captured']}, "
+                                f"пропущено {capture['dropped']}, помилок {capture['failures']} | "
+                                f"вік кадру при публікації {frame_age * 1000:.1f} ms")
+                    logger.info(f"🎯 {self.budget.summary(time.monotonic())}")
+                    if self.tracker is not None:
+                        tracks = self.tracker.stats()
+                        logger.info(f"🧭 треків {tracks['tracks']} (підтверджених {tracks['confirmed']}), "
+                                    f"створено {tracks['created']}, видалено {tracks['removed']}")
+                    logger.info(f"📤 {self.sink.summary()}")
+                    if self.debug is not None and self.debug.watched:
+                        debug = self.debug.stats()
+                        logger.info(f"👀 debug-потік: клієнтів {debug['clients']}, "
+                                    f"кадрів {debug['encoded']}, кодування {debug['encode_ms']} ms")
+                    logger.info(f"⏱️ {self.engine.timer.summary() if self.engine else self.timer.summary()}")
+                    next_stats = time.monotonic() + STATS_LOG_S
         
         except KeyboardInterrupt:
             logger.info("🛑 Зупинка...")
         finally:
             self.running = False
-            self.cap.release()
-            self.mqtt_client.loop_stop()
+            if close:
+                self.source.stop()
+                self.sink.close()
+                if self.ring is not None:
+                    self.ring.close(unlink=True)
+                if self.debug is not None:
+                    self.debug.stop()
+        return frames
 
 if __name__ == "__main__":
     mqtt_host = os.getenv("MQTT_HOST", "mqtt")
+    mqtt_port = int(os.getenv("MQTT_PORT", 1883))
     
-    detector = SimpleDetector(mqtt_host=mqtt_host)
+    detector = SimpleDetector(mqtt_host=mqtt_host, mqtt_port=mqtt_port)
     detector.detect_loop()
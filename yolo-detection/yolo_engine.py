@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+YOLOv8 TFLite рушій детекції: letterbox у попередньо виділений вхідний
+буфер, invoke і повністю векторизований постпроцесинг (декодування
+боксів, поріг впевненості, class-aware NMS) - без циклів Python по якорях.
+"""
+
+import time
+import logging
+from collections import deque
+from typing import Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Записи детекцій (розкладка = DETECTION_RECORD у yolo_detector.py / app/detection_schema.py)
+DETECTION_RECORD = np.dtype([
+    ("x", "<f4"),
+    ("y", "<f4"),
+    ("w", "<f4"),
+    ("h", "<f4"),
+    ("confidence", "<f4"),
+    ("class_id", "<u2"),
+    ("reserved", "<u2"),
+])
+
+COCO_CLASSES = (
+    "person", "bicycle", "car", "motorcycle", "airplane", "bus", "train", "truck", "boat",
+    "traffic light", "fire hydrant", "stop sign", "parking meter", "bench", "bird", "cat", "dog",
+    "horse", "sheep", "cow", "elephant", "bear", "zebra", "giraffe", "backpack", "umbrella",
+    "handbag", "tie", "suitcase", "frisbee", "skis", "snowboard", "sports ball", "kite",
+    "baseball bat", "baseball glove", "skateboard", "surfboard", "tennis racket", "bottle",
+    "wine glass", "cup", "fork", "knife", "spoon", "bowl", "banana", "apple", "sandwich", "orange",
+    "broccoli", "carrot", "hot dog", "pizza", "donut", "cake", "chair", "couch", "potted plant",
+    "bed", "dining table", "toilet", "tv", "laptop", "mouse", "remote", "keyboard", "cell phone",
+    "microwave", "oven", "toaster", "sink", "refrigerator", "book", "clock", "vase", "scissors",
+    "teddy bear", "hair drier", "toothbrush",
+)
+
+STAGES = ("preprocess", "inference", "postprocess")
+LETTERBOX_FILL = 114
+
+
+class StageTimer:
+    """Латентність стадій за останні N кадрів (history=None - усі)"""
+
+    def __init__(self, stages=STAGES, history: Optional[int] = 300):
+        self.last = {stage: 0.0 for stage in stages}
+        self._history = {stage: deque(maxlen=history) for stage in stages}
+
+    def record(self, stage: str, seconds: float):
+        ms = seconds * 1000
+        self.last[stage] = ms
+        self._history[stage].append(ms)
+
+    def percentiles(self) -> dict:
+        out = {}
+        for stage, values in self._history.items():
+            if values:
+                arr = np.fromiter(values, dtype=np.float64)
+                p50, p90, p99 = np.percentile(arr, (50, 90, 99))
+                out[stage] = {"p50_ms": float(p50), "p90_ms": float(p90), "p99_ms": float(p99),
+                              "mean_ms": float(arr.mean()), "count": len(arr)}
+        return out
+
+    def summary(self) -> str:
+        return " | ".join(
+            f"{stage} {p['p50_ms']:.1f}/{p['p99_ms']:.1f} ms" for stage, p in self.percentiles().items()
+        ) + " (p50/p99)"
+
+
+def greedy_nms(boxes: np.ndarray, iou_threshold: float, max_keep: int = 0,
+               matrix_limit: int = 96) -> np.ndarray:
+    """
+    Точний жадібний NMS: бокс відкидається, якщо IoU з уже залишеним
+    впевненішим боксом вище порогу (пригнічений бокс інших не пригнічує -
+    сусідні предмети на столі не губляться). Бокси (K, 4) x1y1x2y2,
+    відсортовані за спаданням впевненості; max_keep - зупинка після стількох
+    залишених. До matrix_limit боксів матриця пригнічення K x K рахується
+    одразу і цикл лише читає її рядки; більше - IoU рядками тільки для
+    залишених боксів. Повертає індекси залишених.
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    area = (x2 - x1) * (y2 - y1)
+    suppress = None
+    if len(boxes) <= matrix_limit:
+        w = np.clip(np.minimum(x2[:, None], x2[None]) - np.maximum(x1[:, None], x1[None]), 0, None)
+        h = np.clip(np.minimum(y2[:, None], y2[None]) - np.maximum(y1[:, None], y1[None]), 0, None)
+        inter = w * h
+        suppress = inter / (area[:, None] + area[None] - inter + 1e-9) > iou_threshold
+
+    alive = np.ones(len(boxes), dtype=bool)
+    keep = []
+    for i in range(len(boxes)):
+        if not alive[i]:
+            continue
+        keep.append(i)
+        if len(keep) == max_keep:
+            break
+        rest = slice(i + 1, None)
+        if suppress is not None:
+            alive[rest] &= ~suppress[i, rest]
+            continue
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        alive[rest] &= inter / (area[i] + area[rest] - inter + 1e-9) <= iou_threshold
+    return np.array(keep, dtype=np.intp)
+
+
+def decode_yolov8(pred: np.ndarray, conf_threshold: float, iou_threshold: float,
+                  max_detections: int, max_candidates: int = 300,
+                  classes: Optional[np.ndarray] = None,
+                  quant: tuple = (0.0, 0)) -> tuple:
+    """
+    Вихід YOLOv8 (4 + nc, N): xywh центру і бали класів без objectness.
+    quant - (scale, zero_point) для int8/uint8 виходу: поріг порівнюється
+    в квантованому домені, деквантуються лише кандидати.
+
+    Повертає (бокси x1y1x2y2 у координатах входу моделі, впевненість, клас).
+    """
+    scale, zero_point = quant
+    scores = pred[4:]
+    if classes is not None:
+        scores = scores[classes]
+
+    best = scores.max(axis=0)
+    threshold = conf_threshold / scale + zero_point if scale else conf_threshold
+    candidates = np.flatnonzero(best > threshold)
+    if len(candidates) > max_candidates:
+        top = np.argpartition(best[candidates], -max_candidates)[-max_candidates:]
+        candidates = candidates[top]
+
+    class_id = scores[:, candidates].argmax(axis=0)
+    confidence = best[candidates].astype(np.float32)
+    xywh = pred[:4, candidates].astype(np.float32)
+    if scale:
+        confidence = (confidence - zero_point) * scale
+        xywh = (xywh - zero_point) * scale
+    if classes is not None:
+        class_id = classes[class_id]
+
+    order = np.argsort(-confidence)
+    confidence, class_id, xywh = confidence[order], class_id[order], xywh[:, order]
+    boxes = np.empty((len(order), 4), dtype=np.float32)
+    boxes[:, 0] = xywh[0] - xywh[2] / 2
+    boxes[:, 1] = xywh[1] - xywh[3] / 2
+    boxes[:, 2] = xywh[0] + xywh[2] / 2
+    boxes[:, 3] = xywh[1] + xywh[3] / 2
+
+    if len(boxes) > 1:
+        # Class-aware: бокси різних класів зсунуті так, що не перетинаються
+        offset = class_id.astype(np.float32)[:, None] * (float(np.abs(boxes).max()) + 1.0)
+        keep = greedy_nms(boxes + offset, iou_threshold, max_detections)
+        boxes, confidence, class_id = boxes[keep], confidence[keep], class_id[keep]
+
+    return boxes[:max_detections], confidence[:max_detections], class_id[:max_detections]
+
+
+class YoloEngine:
+    """
+    YOLOv8 на tflite_runtime.
+
+    - letterbox: масштаб зі збереженням пропорцій у заздалегідь виділене
+      полотно (поля заповнюються лише при зміні розміру кадру), BGR→RGB і
+      нормалізація пишуться прямо у вхідний тензор інтерпретатора;
+    - views входу/виходу тримаються постійно, тому invoke викликається
+      напряму (як InferenceEngine в app/inference.py);
+    - detect() повертає view внутрішнього масиву DETECTION_RECORD,
+      дійсний до наступного виклику.
+    """
+
+    def __init__(self, model_path: str, num_threads: int = 2,
+                 conf_threshold: float = 0.25, iou_threshold: float = 0.45,
+                 max_detections: int = 32, classes: Optional[list] = None,
+                 input_size: Optional[tuple] = None):
+        self.model_path = model_path
+        self.requested_size = input_size  # (h, w) замість розміру з моделі
+        self.num_threads = num_threads
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.max_detections = max_detections
+        self.classes = np.asarray(classes, dtype=np.intp) if classes else None
+
+        self.interpreter = None
+        self.input_size = (0, 0)  # (h, w)
+        self.class_names = COCO_CLASSES
+        self.timer = StageTimer()
+        self._detections = np.zeros(max_detections, dtype=DETECTION_RECORD)
+
+        self._canvas = None      # uint8 (h, w, 3) letterbox
+        self._resized = None     # uint8 масштабований кадр
+        self._geometry = None    # (кадр h, w) -> (scale, pad_x, pad_y, nh, nw)
+        self._in_view = None
+        self._lut = None         # uint8 піксель → значення входу (нормалізація/квантизація)
+        self._out_view = None
+        self._out_quant = (0.0, 0)
+        self._transposed = False
+        self._normalized_boxes = True
+        self._invoke = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.interpreter is not None
+
+    def load(self):
+        import tflite_runtime.interpreter as tflite
+
+        interpreter = tflite.Interpreter(model_path=self.model_path, num_threads=self.num_threads)
+        if self.requested_size:
+            index = interpreter.get_input_details()[0]["index"]
+            interpreter.resize_tensor_input(index, [1, *self.requested_size, 3], strict=False)
+        interpreter.allocate_tensors()
+        input_details = interpreter.get_input_details()[0]
+        output_details = interpreter.get_output_details()[0]
+
+        _, h, w, _ = input_details["shape"]
+        self.input_size = (int(h), int(w))
+        self._lut = self._input_lut(input_details["dtype"], input_details["quantization"])
+        self._out_quant = output_details["quantization"]
+        out_shape = tuple(output_details["shape"])
+        # (1, 4+nc, N) у стандартному експорті; (1, N, 4+nc) - транспонований
+        self._transposed = out_shape[1] > out_shape[2]
+        nc = (out_shape[2] if self._transposed else out_shape[1]) - 4
+        if nc != len(COCO_CLASSES):
+            self.class_names = tuple(str(i) for i in range(nc))
+
+        self._canvas = np.full((h, w, 3), LETTERBOX_FILL, dtype=np.uint8)
+        self._in_view = interpreter.tensor(input_details["index"])()[0]
+        self._out_view = interpreter.tensor(output_details["index"])()[0]
+        self._invoke = interpreter._interpreter.Invoke
+        self.interpreter = interpreter
+
+        # Прогрів і визначення масштабу боксів (ultralytics нормалізує xywh до 0..1)
+        self._in_view[...] = 0
+        started = time.perf_counter()
+        self._invoke()
+        warmup_ms = (time.perf_counter() - started) * 1000
+        pred = self._prediction()
+        scale, zero_point = self._out_quant
+        boxes = (pred[:4].astype(np.float32) - zero_point) * scale if scale else pred[:4]
+        self._normalized_boxes = float(np.abs(boxes).max()) <= 2.0
+
+        logger.info(
+            f"✅ YOLO модель: {self.model_path} | in {w}x{h} {input_details['dtype'].__name__} | "
+            f"out {out_shape} ({nc} класів) | threads={self.num_threads} | warmup {warmup_ms:.0f} ms"
+        )
+
+    @staticmethod
+    def _input_lut(dtype, quant: tuple) -> np.ndarray:
+        values = np.arange(256, dtype=np.float64) / 255.0
+        scale, zero_point = quant
+        if np.issubdtype(dtype, np.integer) and scale:
+            info = np.iinfo(dtype)
+            values = np.clip(np.round(values / scale + zero_point), info.min, info.max)
+        elif np.issubdtype(dtype, np.integer):
+            values = np.arange(256)  # вхід 0..255 без квантизації
+        return values.astype(dtype)
+
+    def _prediction(self) -> np.ndarray:
+        """(4 + nc, N) view виходу"""
+        return self._out_view.T if self._transposed else self._out_view
+
+    def letterbox(self, frame: np.ndarray) -> tuple:
+        """Кадр BGR → вхідний тензор; повертає (scale, pad_x, pad_y)"""
+        fh, fw = frame.shape[:2]
+        h, w = self.input_size
+        if self._geometry is None or self._geometry[0] != (fh, fw):
+            scale = min(h / fh, w / fw)
+            nh, nw = int(round(fh * scale)), int(round(fw * scale))
+            pad_y, pad_x = (h - nh) // 2, (w - nw) // 2
+            self._canvas[...] = LETTERBOX_FILL
+            self._resized = np.empty((nh, nw, 3), dtype=np.uint8)
+            self._geometry = ((fh, fw), (scale, pad_x, pad_y, nh, nw))
+        scale, pad_x, pad_y, nh, nw = self._geometry[1]
+
+        cv2.resize(frame, (nw, nh), dst=self._resized, interpolation=cv2.INTER_LINEAR)
+        self._canvas[pad_y:pad_y + nh, pad_x:pad_x + nw] = self._resized
+        # BGR→RGB і нормалізація одним проходом через таблицю на 256 значень
+        np.take(self._lut, self._canvas[..., ::-1], out=self._in_view)
+        return scale, pad_x, pad_y
+
+    def detect(self, frame: np.ndarray) -> np.ndarray:
+        """Детекції з нормалізованими до кадру x, y (центр), w, h"""
+        t0 = time.perf_counter()
+        scale, pad_x, pad_y = self.letterbox(frame)
+        t1 = time.perf_counter()
+        self._invoke()
+        t2 = time.perf_counter()
+
+        boxes, confidence, class_id = decode_yolov8(
+            self._prediction(), self.conf_threshold, self.iou_threshold,
+            self.max_detections, classes=self.classes, quant=self._out_quant
+        )
+        h, w = self.input_size
+        if self._normalized_boxes:
+            boxes *= np.array([w, h, w, h], dtype=np.float32)
+        # Координати входу моделі → кадр → 0..1
+        fh, fw = frame.shape[:2]
+        boxes -= np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)
+        boxes /= np.array([scale * fw, scale * fh, scale * fw, scale * fh], dtype=np.float32)
+        np.clip(boxes, 0.0, 1.0, out=boxes)
+
+        n = len(boxes)
+        out = self._detections[:n]
+        out["x"] = (boxes[:, 0] + boxes[:, 2]) / 2
+        out["y"] = (boxes[:, 1] + boxes[:, 3]) / 2
+        out["w"] = boxes[:, 2] - boxes[:, 0]
+        out["h"] = boxes[:, 3] - boxes[:, 1]
+        out["confidence"] = confidence
+        out["class_id"] = class_id
+        t3 = time.perf_counter()
+
+        self.timer.record("preprocess", t1 - t0)
+        self.timer.record("inference", t2 - t1)
+        self.timer.record("postprocess", t3 - t2)
+        return out